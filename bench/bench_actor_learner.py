@@ -0,0 +1,16 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.rl_snacke.distributed import train_distributed
+
+
+if __name__ == "__main__":
+    # Nombres d'acteurs en arguments ; par défaut jusqu'à un acteur par cœur libre
+    max_actors = max(1, (os.cpu_count() or 2) - 1)  # un cœur pour le learner
+    counts = [int(n) for n in sys.argv[1:]] or [n for n in (1, 2, 4, 8, 16) if n <= max_actors]
+
+    print(f"{'actors':>7} {'env steps/s':>12} {'grad steps/s':>13}")
+    for num_actors in counts:
+        _, stats = train_distributed(num_actors=num_actors, max_seconds=60, report_every=float("inf"))
+        print(f"{num_actors:>7} {stats['env_steps_per_sec']:12.0f} {stats['grad_steps_per_sec']:13.1f}")
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+from core.arena import ArenaConfig
+from core.env import Env
+from core.env_wrapper import ShooterEnvWrapper
+
+ACTION_INDEX = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+
+
+def loop_actions(side):
+    """Tour d'un carré de `side` cases : le serpent tourne sans se mordre tant qu'il est plus court."""
+    return ([ACTION_INDEX["RIGHT"]] * side + [ACTION_INDEX["DOWN"]] * side
+            + [ACTION_INDEX["LEFT"]] * side + [ACTION_INDEX["UP"]] * side)
+
+
+def step_cost(arena, length, episodes=6, steps=300, seed=0):
+    """µs par ShooterEnvWrapper.step (Env.step, état plat, minimap, récompense), serpent de `length` cases."""
+    random.seed(seed)
+    actions = loop_actions(length // 4 + 16)
+    total, count = 0.0, 0
+    # Le premier épisode (non mesuré) construit les tables et caches de l'arène
+    for episode in range(episodes + 1):
+        env = Env(record=False, arena=arena, rng=seed + episode)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        # Fait grandir le serpent jusqu'à `length` sans mesurer
+        t = 0
+        while len(env.snake.body) < length and not env.done:
+            env.snake.grow()
+            env.snake.external_action = env.snake.action_space[actions[t % len(actions)]]
+            env.step()
+            t += 1
+        wrapper.reset()
+        if episode == 0:
+            for _ in range(steps):
+                if wrapper.step(actions[t % len(actions)])[3]:
+                    break
+                t += 1
+            continue
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, _, _, done = wrapper.step(actions[t % len(actions)])
+            t += 1
+            count += 1
+            if done:
+                break
+        total += time.perf_counter() - start
+    return total / count * 1e6
+
+
+if __name__ == "__main__":
+    print("per-step cost (us) vs arena size and target count, snake length 1")
+    sizes = (64, 256, 1024)
+    print(f"{'targets':>8} " + " ".join(f"{f'{s}x{s}':>10}" for s in sizes))
+    for num_targets in (10, 100, 1000):
+        row = [step_cost(ArenaConfig(s, s, num_targets=num_targets), 1) for s in sizes]
+        print(f"{num_targets:>8} " + " ".join(f"{cost:10.1f}" for cost in row))
+
+    print("per-step cost (us) vs arena size and snake length, 100 targets")
+    print(f"{'length':>8} " + " ".join(f"{f'{s}x{s}':>10}" for s in sizes))
+    for length in (1, 50, 200):
+        row = [step_cost(ArenaConfig(s, s, num_targets=100), length) for s in sizes]
+        print(f"{length:>8} " + " ".join(f"{cost:10.1f}" for cost in row))
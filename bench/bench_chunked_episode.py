@@ -0,0 +1,109 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import functools
+import itertools
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from core.chunked_episode import load_index, read_chunk, read_frames, write_chunked
+from core.env import Env
+from core.recorder import StreamRecorder, iter_steps
+from bench.bench_recorder import cycle_policy
+
+
+def long_episode(path, num_steps=120000, max_length=150, seed=0):
+    """Épisode de `num_steps` pas : le serpent suit le cycle hamiltonien et mange
+    jusqu'à `max_length`, puis les cibles ne sont plus mangeables."""
+    random.seed(seed)
+    policy = cycle_policy()
+    env = Env(recorder=StreamRecorder(path), rng=seed)
+    for _ in range(num_steps):
+        if len(env.snake.body) >= max_length and env.targets[0].etype == "target":
+            for target in env.targets:
+                target.etype = "decor"
+        head = env.snake.head()
+        env.snake.external_action = policy[(head.x, head.y)]
+        env.step()
+        if env.done:
+            break
+    env.close()
+    return env.step_count
+
+
+def check_frames(recording, directory, chunk_size, num_steps):
+    """Relecture par blocs == relecture du fichier enregistré, et fenêtres à cheval sur deux blocs.
+
+    Tout est comparé en flux : l'épisode complet ne tient pas en mémoire sous forme de dicts.
+    """
+    steps = iter_steps(recording)
+    for i, chunk in enumerate(load_index(directory)["chunks"]):
+        assert read_chunk(directory, i) == list(itertools.islice(steps, chunk["count"])), f"chunk {i} differs"
+    assert next(steps, None) is None
+    for start in (0, chunk_size - 3, 5 * chunk_size + 17, num_steps - 10):
+        expected = list(itertools.islice(iter_steps(recording), start, start + 20))
+        assert read_frames(directory, start, start + 20) == expected
+
+
+def frames_at(recording, frames):
+    wanted = set(frames)
+    found = {i: step for i, step in enumerate(iter_steps(recording)) if i in wanted}
+    return [found[frame] for frame in frames]
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    chunk_size = 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = os.path.join(tmp, "episode.snkrec")
+        start = time.perf_counter()
+        num_steps = long_episode(recording)
+        print(f"recorded {num_steps} steps in {time.perf_counter() - start:.1f} s")
+
+        directory = os.path.join(tmp, "episode_long")
+        start = time.perf_counter()
+        write_chunked(iter_steps(recording), directory, chunk_size)
+        index = load_index(directory)
+        size = sum(entry.stat().st_size for entry in os.scandir(directory))
+        print(f"chunked export: {len(index['chunks'])} chunks, {size / 1e6:.1f} MB "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        check_frames(recording, directory, chunk_size, num_steps)
+        head = list(itertools.islice(iter_steps(recording), 10000))
+        json_size = len(json.dumps(head, indent=4)) * num_steps / len(head)
+        del head
+        print(f"python reader ok (plain json export would be ~{json_size / 1e6:.0f} MB)")
+
+        server = serve(tmp)
+        url = f"http://127.0.0.1:{server.server_address[1]}/episode_long/"
+        rng = random.Random(0)
+        samples = [rng.randrange(num_steps) for _ in range(20)]
+        script = os.path.join(os.path.dirname(__file__), "viewer_loader_check.js")
+        output = subprocess.run(["node", script, url, ",".join(map(str, samples))],
+                                check=True, capture_output=True, text=True).stdout
+        server.shutdown()
+
+        result = json.loads(output)
+        assert result["num_frames"] == num_steps
+        assert result["frames"] == frames_at(recording, samples), "viewer decoding differs"
+        print(f"viewer loader: first frame {result['first_frame_ms']:.1f} ms, "
+              f"seek mean {result['seek_ms_mean']:.1f} ms / max {result['seek_ms_max']:.1f} ms")
+        print(f"viewer playback: {result['playback_stalls']} stalls over 5000 frames, "
+              f"{result['chunks_in_memory']} chunks in memory, {result['chunks_fetched']} fetched")
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from core.dataset import MinimapDataset, MinimapDatasetWriter
+from core.env import Env
+from core.seeding import RandomStream
+from core.env_wrapper import ShooterEnvWrapper
+
+
+def log_episodes(directory, num_steps, seed=0, initial_capacity=64):
+    """Journalise des épisodes aléatoires via le wrapper ; renvoie les transitions vues."""
+    random.seed(seed)
+    env_rng = RandomStream(seed)
+    transitions = []
+    with MinimapDatasetWriter(directory, initial_capacity=initial_capacity) as writer:
+        while len(transitions) < num_steps:
+            env = Env(record=False, rng=env_rng)
+            wrapper = ShooterEnvWrapper(env, env.snake, dataset=writer)
+            flat_state, minimap = wrapper.reset()
+            for _ in range(200):
+                action = random.randrange(4)
+                next_state, next_minimap, reward, done = wrapper.step(action)
+                transitions.append((flat_state, minimap, action, reward, next_state, next_minimap, done))
+                flat_state, minimap = next_state, next_minimap
+                if done:
+                    break
+            wrapper.close_episode()
+    return transitions
+
+
+def check_round_trip(directory, transitions):
+    dataset = MinimapDataset(directory)
+    assert len(dataset) == len(transitions)
+    assert isinstance(dataset.minimap, np.memmap) and not dataset.minimap.flags.writeable
+
+    rows = dataset.transitions
+    for field, (expected, actual) in enumerate(zip(zip(*transitions), (
+            dataset.flat[rows], dataset.minimap[rows], dataset.action[rows], dataset.reward[rows],
+            dataset.flat[rows + 1], dataset.minimap[rows + 1], dataset.done[rows]))):
+        assert np.array_equal(np.array(expected, dtype=actual.dtype), actual), f"field {field}"
+
+    # Un batch mélangé contient exactement les transitions de ses lignes
+    seen = 0
+    for flat, minimap, action, reward, next_flat, next_minimap, done in dataset.batches(64, seed=0):
+        assert minimap.dtype == np.float32 and action.shape == (64, 1)
+        seen += len(flat)
+    assert seen == len(dataset) // 64 * 64
+    return len(dataset)
+
+
+def bench_npy_files(directory, transitions):
+    """Ancienne approche de Env.step : un fichier .npy par pas."""
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    for i, (_, minimap, *_) in enumerate(transitions):
+        np.save(os.path.join(directory, f"step_{i:05d}.npy"), minimap)
+    write_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(len(transitions)):
+        np.load(os.path.join(directory, f"step_{i:05d}.npy"))
+    return write_s, time.perf_counter() - start
+
+
+def bench_dataset(directory, transitions):
+    start = time.perf_counter()
+    with MinimapDatasetWriter(directory) as writer:
+        for flat_state, minimap, action, reward, _, _, done in transitions:
+            writer.append(flat_state, minimap, action, reward, done)
+        writer.end_episode(transitions[-1][4], transitions[-1][5])
+    write_s = time.perf_counter() - start
+
+    dataset = MinimapDataset(directory)
+    start = time.perf_counter()
+    count = sum(len(batch[0]) for batch in dataset.batches(64, seed=0))
+    return write_s, time.perf_counter() - start, count
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        transitions = log_episodes(os.path.join(tmp, "logged"), 3000)
+        print(f"round trip: {check_round_trip(os.path.join(tmp, 'logged'), transitions)} transitions ok")
+
+        npy_write, npy_read = bench_npy_files(os.path.join(tmp, "npy"), transitions)
+        ds_write, ds_read, count = bench_dataset(os.path.join(tmp, "dataset"), transitions)
+        frame_mb = transitions[0][1].nbytes / 1e6
+        n = len(transitions)
+        print(f"{'':>10} {'write (us/frame)':>17} {'read (us/frame)':>16}")
+        print(f"{'npy files':>10} {npy_write / n * 1e6:17.1f} {npy_read / n * 1e6:16.1f}")
+        print(f"{'memmap':>10} {ds_write / n * 1e6:17.1f} {ds_read / count * 1e6:16.1f}"
+              f"   (shuffled batches of 64 incl. next states, float32 frame = {frame_mb:.3f} MB)")
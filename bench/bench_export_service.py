@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import random
+import tempfile
+import time
+
+from core.env import Env
+from core.export_service import ExportService
+from core.recorder import StreamRecorder
+from bench.bench_recorder import cycle_policy, run_episode
+
+
+def training_loop(tmp, mode, num_episodes=10, max_steps=3000):
+    """Boucle d'épisodes qui exporte chacun : temps mur vu par la boucle.
+
+    La file est assez grande pour ne jamais bloquer ici : ces épisodes sans
+    réseau se terminent bien plus vite qu'un export (voir check_drop).
+    """
+    policy = cycle_policy()
+    service = ExportService(max_pending=num_episodes, workers=2) if mode == "async" else None
+    start = time.perf_counter()
+    for episode in range(num_episodes):
+        random.seed(episode)
+        path = os.path.join(tmp, mode, f"episode_{episode}.json")
+        if mode == "async":
+            env = Env(recorder=StreamRecorder(os.path.join(tmp, "rec", f"episode_{episode}.snkrec")), rng=episode)
+        else:
+            env = Env(record=mode != "none", rng=episode)
+        run_episode(env, policy, max_steps, episode)
+        if mode == "sync":
+            env.export(path)
+        elif mode == "async":
+            service.submit(env, path)
+    loop_seconds = time.perf_counter() - start
+    if service is not None:
+        service.close()
+        print(f"         export stats: {service.stats()}")
+    return loop_seconds, time.perf_counter() - start
+
+
+def check_same_files(tmp, num_episodes=10):
+    for episode in range(num_episodes):
+        with open(os.path.join(tmp, "sync", f"episode_{episode}.json")) as f:
+            expected = json.load(f)
+        with open(os.path.join(tmp, "async", f"episode_{episode}.json")) as f:
+            assert json.load(f) == expected, f"episode {episode} differs"
+
+
+def check_drop(tmp, num_episodes=20):
+    """Avec when_full='drop', la boucle ne bloque jamais et compte les abandons."""
+    policy = cycle_policy()
+    with ExportService(max_pending=1, when_full="drop", use_processes=False) as service:
+        for episode in range(num_episodes):
+            random.seed(episode)
+            env = Env(rng=episode)
+            run_episode(env, policy, 3000, episode)
+            service.submit(env, os.path.join(tmp, "drop", f"episode_{episode}.json"))
+    stats = service.stats()
+    assert stats["written"] + stats["dropped"] == num_episodes
+    return stats
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("none", "sync", "async"):
+            loop_seconds, total_seconds = training_loop(tmp, mode)
+            print(f"{mode:>7}: loop {loop_seconds:6.2f} s  (including drain {total_seconds:6.2f} s)")
+        check_same_files(tmp)
+        print("async export identical to Env.export")
+        print(f"drop policy: {check_drop(tmp)}")
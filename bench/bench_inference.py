@@ -0,0 +1,146 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import copy
+import time
+
+import numpy as np
+import torch
+
+from core.rl_snacke.dqn_model import CombinedDQN
+from core.rl_snacke.inference import DQNInference, configure_threads
+from core.rl_snacke.train_dqn import DQNTrainer
+
+FLAT_DIM = 5*8 + 12
+ACTION_DIM = 4
+TOLERANCE = 1e-4
+
+
+def trained_net(seed=0):
+    """CombinedDQN dont les BatchNorm ont des statistiques et des paramètres non triviaux."""
+    torch.manual_seed(seed)
+    net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+    with torch.no_grad():
+        for block in (net.conv1, net.conv2, net.conv3):
+            block[1].weight.uniform_(0.5, 1.5)
+            block[1].bias.uniform_(-0.2, 0.2)
+        net.train()
+        for _ in range(20):
+            net(torch.rand(64, FLAT_DIM), (torch.rand(64, 4, 64, 64) < 0.05).float())
+    net.eval()
+    return net
+
+
+def inputs(batch_size, seed=1):
+    rng = np.random.default_rng(seed)
+    flat = rng.random((batch_size, FLAT_DIM), dtype=np.float32)
+    minimap = (rng.random((batch_size, 4, 64, 64)) < 0.05).astype(np.float32)
+    return flat, minimap
+
+
+def eager(net, train_mode=False):
+    """Forward d'origine : tensors construits à chaque appel, comme select_action."""
+    def q_values(flat, minimap):
+        net.train(train_mode)
+        with torch.no_grad():
+            return net(torch.FloatTensor(flat), torch.FloatTensor(minimap))
+    return q_values
+
+
+def variants(net):
+    out = {
+        # Ancien select_action. Copie : en mode train, chaque forward modifie les statistiques de la BatchNorm
+        "eager, BatchNorm train": eager(copy.deepcopy(net), train_mode=True),
+        "eager, eval": eager(net),
+        "folded": DQNInference(net, channels_last=False).q_values,
+        "folded + channels_last": DQNInference(net).q_values,
+        "folded + trace": DQNInference(net, compile="trace").q_values,
+    }
+    if hasattr(torch, "compile"):
+        out["folded + torch.compile"] = DQNInference(net, compile="compile").q_values
+    return out
+
+
+def check_close(net, q_values, batch_size=256):
+    flat, minimap = inputs(batch_size)
+    expected = eager(net)(flat, minimap)
+    return (q_values(flat, minimap) - expected).abs().max().item()
+
+
+def check_refresh(net):
+    """Après un pas d'optimiseur (BatchNorm en mode train), la copie d'inférence suit le réseau."""
+    inference = DQNInference(net, compile="trace")
+    flat, minimap = inputs(8)
+    inference.q_values(flat, minimap)
+    optimizer = torch.optim.Adam(net.parameters(), lr=1e-2)
+    net.train()
+    loss = net(torch.rand(32, FLAT_DIM), (torch.rand(32, 4, 64, 64) < 0.05).float()).pow(2).mean()
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    net.eval()
+    inference.stale = True
+    return check_close(net, inference.q_values)
+
+
+def check_select_action(net, count=32):
+    """select_action (batch 1, eager) choisit les actions de select_actions, réseau en mode train
+    comme pendant l'entraînement, sans toucher aux statistiques de la BatchNorm."""
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=0)
+    trainer.q_net.load_state_dict(net.state_dict())
+    trainer.q_net.train()
+    stats = copy.deepcopy(trainer.q_net.state_dict())
+    flat, minimap = inputs(count)
+    actions = []
+    for i in range(count):
+        trainer.epsilon = 0.0  # select_action remonte epsilon à epsilon_min après chaque appel
+        actions.append(trainer.select_action(flat[i], minimap[i]))
+    assert actions == trainer.select_actions(flat, minimap, epsilons=0.0).tolist()
+    assert trainer.q_net.training
+    assert all(torch.equal(stats[k], v) for k, v in trainer.q_net.state_dict().items())
+    return count
+
+
+def latency_us(q_values, repeat=300):
+    flat, minimap = inputs(1)
+    for _ in range(20):
+        q_values(flat, minimap)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        q_values(flat, minimap)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e6
+
+
+def throughput(q_values, batch_size=256, repeat=20):
+    flat, minimap = inputs(batch_size)
+    for _ in range(3):
+        q_values(flat, minimap)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        q_values(flat, minimap)
+    return batch_size * repeat / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # Le modèle est séquentiel : un seul thread inter-op (à fixer avant tout calcul)
+    configure_threads(num_interop_threads=1)
+    net = trained_net()
+    print(f"refresh after an optimizer step: max |dQ| {check_refresh(net):.2e}")
+    print(f"select_action == select_actions, BatchNorm untouched: {check_select_action(net)} states")
+
+    for num_threads in sorted({1, os.cpu_count() or 1}):
+        configure_threads(num_threads)
+        print(f"intra-op threads: {num_threads}")
+        print(f"{'':>26} {'batch 1 (us)':>13} {'batch 256 (/s)':>15} {'max |dQ|':>10}")
+        for name, q_values in variants(net).items():
+            try:
+                error = check_close(net, q_values)
+            except Exception as exc:  # torch.compile demande un compilateur C++ sur CPU
+                print(f"{name:>26}   unavailable: {type(exc).__name__}: {exc}".splitlines()[0])
+                continue
+            if name != "eager, BatchNorm train":
+                assert error < TOLERANCE, (name, error)
+            print(f"{name:>26} {latency_us(q_values):13.0f} {throughput(q_values):15.0f} {error:10.2e}")
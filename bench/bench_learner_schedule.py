@@ -0,0 +1,150 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import copy
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from core.dataset import MinimapDataset
+from core.env import Env
+from core.env_wrapper import ShooterEnvWrapper
+from core.seeding import RandomStream, spawn_seeds
+from core.rl_snacke.train_dqn import DQNTrainer, LearnerSchedule
+from bench.bench_dataset import log_episodes
+
+FLAT_DIM = 5*8 + 12
+ACTION_DIM = 4
+
+
+def check_soft_update():
+    """tau = 1 redonne une copie exacte ; tau = 0 ne change rien."""
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=0)
+    with torch.no_grad():
+        for param in trainer.q_net.parameters():
+            param.add_(1.0)
+    before = copy.deepcopy(trainer.target_net.state_dict())
+    trainer.soft_update_target(0.0)
+    assert all(torch.equal(before[k], v) for k, v in trainer.target_net.state_dict().items())
+    trainer.soft_update_target(1.0)
+    source = trainer.q_net.state_dict()
+    assert all(torch.equal(source[k], v) for k, v in trainer.target_net.state_dict().items())
+
+
+def check_credit(replay_ratio, updates_per_sample, env_steps=1000, batch_size=8):
+    """observe fait floor(ratio × pas) pas de gradient, par paquets de K, une fois le warmup passé."""
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=0,
+                         schedule=LearnerSchedule(replay_ratio, updates_per_sample, warmup=100))
+    trainer.batch_size = batch_size
+    trainer.train_steps = lambda k: None  # seul le rythme est vérifié ici
+    rng = np.random.default_rng(0)
+    minimap = np.zeros((4, 64, 64), dtype=np.float32)
+    steps = []
+    for _ in range(env_steps):
+        flat = rng.random(FLAT_DIM, dtype=np.float32)
+        trainer.replay_buffer.push(flat, minimap, 0, 0.0, flat, minimap, True)
+        steps.append(trainer.observe())
+    learning = env_steps - (max(100, updates_per_sample * batch_size) - 1)
+    expected = int(learning * replay_ratio) // updates_per_sample * updates_per_sample
+    assert sum(steps) == expected, (replay_ratio, updates_per_sample, sum(steps), expected)
+    assert all(n % updates_per_sample == 0 for n in steps)
+
+
+def check_pretrain_schedule(num_steps=300, batch_size=16):
+    """pretrain compte ses pas dans grad_steps et met à jour le réseau cible selon le schéma."""
+    with tempfile.TemporaryDirectory() as directory:
+        log_episodes(directory, num_steps)
+        dataset = MinimapDataset(directory)
+        for schedule, synced in ((LearnerSchedule(target_period=4), lambda steps: steps % 4 == 0),
+                                 (LearnerSchedule(target_update="soft", tau=1.0), lambda steps: True)):
+            trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=0, schedule=schedule)
+            seen = []
+
+            def learn(*batch):
+                with torch.no_grad():
+                    for param in trainer.q_net.parameters():
+                        param.add_(1.0)
+                seen.append(None)
+
+            def after_update(original=trainer._after_update):
+                original()
+                target, source = trainer.target_net.state_dict(), trainer.q_net.state_dict()
+                same = all(torch.equal(target[k], source[k]) for k in source)
+                assert same == synced(len(seen)), (schedule.target_update, len(seen))
+
+            trainer._learn, trainer._after_update = learn, after_update
+            steps = trainer.pretrain(dataset, batch_size=batch_size)
+            assert steps == trainer.grad_steps == len(seen) == len(dataset) // batch_size
+
+
+def run(schedule, env_steps=30000, seed=0, batch_size=64):
+    """Boucle de train_dqn sur `env_steps` pas : débit et courbe d'apprentissage (longueur par épisode)."""
+    trainer_seed, env_seed = spawn_seeds(seed, 2)
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=trainer_seed, schedule=schedule)
+    trainer.batch_size = batch_size
+    env_rng = RandomStream(env_seed)
+    curve = []  # (pas d'environnement en fin d'épisode, longueur)
+    learn_seconds = 0.0
+    start = time.perf_counter()
+    episode = 0
+    while trainer.env_steps < env_steps:
+        env = Env(record=False, rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        flat_state, minimap = wrapper.reset()
+        for _ in range(5000):
+            action = trainer.select_action(flat_state, minimap, epoche=episode)
+            next_state, next_minimap, reward, done = wrapper.step(action)
+            trainer.replay_buffer.push(flat_state, minimap, action, reward, next_state, next_minimap, done)
+            learn_start = time.perf_counter()
+            trainer.observe()
+            learn_seconds += time.perf_counter() - learn_start
+            flat_state, minimap = next_state, next_minimap
+            if done or trainer.env_steps >= env_steps:
+                break
+        episode += 1
+        curve.append((trainer.env_steps, len(env.snake.body)))
+    elapsed = time.perf_counter() - start
+    return trainer, curve, elapsed, learn_seconds
+
+
+def curve_quality(curve, env_steps, parts=4):
+    """Longueur moyenne des épisodes finis dans chaque quart des pas d'environnement."""
+    steps = np.array([s for s, _ in curve])
+    lengths = np.array([n for _, n in curve], dtype=np.float64)
+    bounds = np.linspace(0, env_steps, parts + 1)
+    means = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        inside = (steps > low) & (steps <= high)
+        means.append(lengths[inside].mean() if inside.any() else float("nan"))
+    return means
+
+
+if __name__ == "__main__":
+    check_soft_update()
+    for ratio, k in ((0.25, 1), (1.0, 1), (1.0, 4), (2.0, 4)):
+        check_credit(ratio, k)
+    check_pretrain_schedule()
+    print("soft target update, replay-ratio credit and pretrain target updates ok")
+
+    # Arguments optionnels : pas d'environnement par schéma (30000) et taille de batch (64) ; warmup au plus 1/10
+    env_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    warmup = min(1000, env_steps // 10)
+    print(f"{env_steps} env steps per schedule, batch {batch_size}, warmup {warmup}")
+    print(f"{'schedule':>30} {'env steps/s':>12} {'grad steps':>11} {'learn %':>8}   mean length per quarter")
+    schedules = [
+        ("ratio 0.25, hard/1000", LearnerSchedule(0.25, warmup=warmup)),
+        ("ratio 0.5, hard/1000", LearnerSchedule(0.5, warmup=warmup)),
+        ("ratio 1, hard/1000", LearnerSchedule(1.0, warmup=warmup)),
+        ("ratio 1, K=4, hard/1000", LearnerSchedule(1.0, updates_per_sample=4, warmup=warmup)),
+        ("ratio 1, soft 0.005", LearnerSchedule(1.0, warmup=warmup, target_update="soft")),
+        ("ratio 2, K=4, soft 0.005", LearnerSchedule(2.0, updates_per_sample=4, warmup=warmup, target_update="soft")),
+    ]
+    for name, schedule in schedules:
+        trainer, curve, elapsed, learn_seconds = run(schedule, env_steps, batch_size=batch_size)
+        quarters = " ".join(f"{m:5.2f}" for m in curve_quality(curve, env_steps))
+        print(f"{name:>30} {trainer.env_steps / elapsed:12.0f} {trainer.grad_steps:11d} "
+              f"{learn_seconds / elapsed:8.0%}   {quarters}", flush=True)
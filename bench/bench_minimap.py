@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math
+import random
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from config import GRID_WIDTH, GRID_HEIGHT
+from core.arena import ArenaConfig, DEFAULT_ARENA
+from core.env import Env
+from core.minimap import get_rasterizer, wall_cache_stats
+from core.point import Point
+from core.snack import Snake
+from core.target import Target
+from core.utils import extract_minimap_batch, extract_minimap_tensor, extract_minimap_tensor_reference
+
+HEADINGS = [0.0] + [math.atan2(dy, dx) for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0))]
+
+
+def random_agent(rng, x, y, angle, length):
+    agent = Snake(start=Point(x, y), cell_size=1)
+    agent.body = deque([Point(x, y)] + [
+        Point(rng.randint(-1, GRID_WIDTH), rng.randint(-1, GRID_HEIGHT)) for _ in range(length - 1)
+    ])
+    agent.facing_angle = angle
+    return agent
+
+
+def check_pixel_equality(seed=0):
+    """Compare la version vectorisée à la version en boucles, pixel à pixel."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    checked = 0
+
+    # Toutes les positions de tête (y compris juste hors de l'arène) et tous les caps
+    for x in range(-1, GRID_WIDTH + 1):
+        for y in range(-1, GRID_HEIGHT + 1):
+            for angle in HEADINGS:
+                agent = random_agent(rng, x, y, angle, length=rng.randint(1, 60))
+                env = SimpleNamespace(targets=[Target() for _ in range(10)], arena=DEFAULT_ARENA)
+                expected = extract_minimap_tensor_reference(agent, env)
+                assert np.array_equal(extract_minimap_tensor(agent, env), expected), (x, y, angle)
+                checked += 1
+
+    # Épisodes réels
+    for _ in range(20):
+        env = Env()
+        while not env.done:
+            env.snake.external_action = random.choice(env.snake.action_space)
+            env.step()
+            reference = extract_minimap_tensor_reference(env.snake, env)
+            assert np.array_equal(extract_minimap_tensor(env.snake, env), reference)
+            checked += 1
+
+    # Autres tailles d'arène dans le même processus (murs propres à chaque arène)
+    for arena in (ArenaConfig(37, 23), ArenaConfig(5, 9), ArenaConfig(200, 200)):
+        for _ in range(300):
+            x, y = rng.randint(-1, arena.width), rng.randint(-1, arena.height)
+            agent = random_agent(rng, x, y, rng.choice(HEADINGS), length=rng.randint(1, 30))
+            env = SimpleNamespace(targets=[Target(arena=arena) for _ in range(10)], arena=arena)
+            expected = extract_minimap_tensor_reference(agent, env)
+            assert np.array_equal(extract_minimap_tensor(agent, env), expected), (arena, x, y)
+            checked += 1
+
+    # Variante batch
+    agents = [random_agent(rng, rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT),
+                           rng.choice(HEADINGS), rng.randint(1, 30)) for _ in range(64)]
+    envs = [SimpleNamespace(targets=[Target() for _ in range(10)], arena=DEFAULT_ARENA) for _ in agents]
+    batch = extract_minimap_batch(agents, envs)
+    for i, (agent, env) in enumerate(zip(agents, envs)):
+        assert np.array_equal(batch[i], extract_minimap_tensor_reference(agent, env))
+    return checked
+
+
+def bench(fn, repeat=2000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    print(f"pixel-for-pixel: {check_pixel_equality()} minimaps ok")
+
+    rng = random.Random(1)
+    agent = random_agent(rng, 5, 7, HEADINGS[3], length=30)
+    env = SimpleNamespace(targets=[Target() for _ in range(10)], arena=DEFAULT_ARENA)
+    out = np.zeros((4, 64, 64), dtype=np.float32)
+    print(f"loops      : {bench(lambda: extract_minimap_tensor_reference(agent, env)):8.1f} us/minimap")
+    print(f"vectorized : {bench(lambda: extract_minimap_tensor(agent, env, out=out)):8.1f} us/minimap")
+
+    for n in (16, 256):
+        agents = [random_agent(rng, rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT),
+                               rng.choice(HEADINGS), 30) for _ in range(n)]
+        envs = [env] * n
+        batch_out = np.zeros((n, 4, 64, 64), dtype=np.float32)
+        per_agent = bench(lambda: extract_minimap_batch(agents, envs, out=batch_out), repeat=200) / n
+        print(f"batch({n:>3}) : {per_agent:8.1f} us/minimap")
+
+    for key, stats in wall_cache_stats().items():
+        print(f"wall cache {key}: {stats['entries']} entries, "
+              f"{stats['memory_bytes'] / 2**20:.1f} MiB, hit rate {stats['hit_rate']:.1%}")
+
+    # Cache construit d'avance pour toute l'arène
+    rasterizer = get_rasterizer(agent.range, agent.fov, 64)
+    start = time.perf_counter()
+    rasterizer.preload_walls(HEADINGS)
+    print(f"preload_walls: {(time.perf_counter() - start) * 1e3:.1f} ms, "
+          f"{rasterizer.wall_cache_stats()['memory_bytes'] / 2**20:.1f} MiB")
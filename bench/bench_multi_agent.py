@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+import numpy as np
+
+from core.arena import ArenaConfig
+from core.env import Env
+from core.seeding import spawn_seeds
+from core.env_wrapper import MultiAgentEnvWrapper, ShooterEnvWrapper
+from core.snack import ACTION
+from core.utils import extract_minimap_tensor_reference
+
+ARENA = ArenaConfig(64, 64, num_targets=64)
+
+
+def safe_action(agent, env, rng):
+    """Action au hasard parmi celles qui ne tuent pas tout de suite (sinon au hasard)."""
+    head = agent.head()
+    safe = [i for i, name in enumerate(agent.action_space)
+            if env.arena.contains(head.x + ACTION[name][0], head.y + ACTION[name][1])
+            and not env.occupancy.is_occupied(head.x + ACTION[name][0], head.y + ACTION[name][1])]
+    return rng.choice(safe) if safe else rng.randrange(len(agent.action_space))
+
+
+def check_states(num_snakes=16, steps=400, seed=0):
+    """Chaque ligne du batch = état plat et minimap de référence de l'agent correspondant."""
+    rng = random.Random(seed)
+    env = Env(record=False, arena=ARENA, num_snakes=num_snakes, rng=seed)
+    wrapper = MultiAgentEnvWrapper(env)
+    wrapper.reset()
+    checked = collisions = 0
+    for _ in range(steps):
+        # Recalculé : l'état renvoyé par step précède les morts par temps écoulé (comme ShooterEnvWrapper)
+        flats, minimaps = wrapper.get_state()
+        for k, agent in enumerate(wrapper.agents):
+            assert np.array_equal(flats[k], ShooterEnvWrapper(env, agent).flat_state_reference()), k
+            assert np.array_equal(minimaps[k], extract_minimap_tensor_reference(agent, env)), k
+            checked += 1
+        # Une action sur trois au hasard : provoque des collisions entre serpents
+        actions = [safe_action(agent, env, rng) if rng.random() < 0.66 else rng.randrange(4)
+                   for agent in wrapper.agents]
+        alive_before = sum(agent.alive for agent in wrapper.agents)
+        _, _, rewards, dones = wrapper.step(actions)
+        collisions += alive_before - sum(agent.alive for agent in wrapper.agents)
+        assert dones.shape == rewards.shape == (num_snakes,)
+        if env.done:
+            break
+    # La grille partagée compte exactement les corps des serpents vivants
+    expected = {}
+    for agent in wrapper.agents:
+        if agent.alive:
+            for p in agent.body:
+                expected[(p.x, p.y)] = expected.get((p.x, p.y), 0) + 1
+    for x in range(ARENA.width):
+        for y in range(ARENA.height):
+            assert env.occupancy.count(x, y) == expected.get((x, y), 0), (x, y)
+    return checked, collisions
+
+
+def bench_separate(num_agents, steps, seed=1):
+    rng = random.Random(seed)
+    envs = [Env(record=False, arena=ARENA, rng=s) for s in spawn_seeds(seed, num_agents)]
+    wrappers = [ShooterEnvWrapper(env, env.snake) for env in envs]
+    for wrapper in wrappers:
+        wrapper.reset()
+    agent_steps, elapsed = 0, 0.0
+    for _ in range(steps):
+        actions = [safe_action(env.snake, env, rng) for env in envs]
+        start = time.perf_counter()
+        for wrapper, action in zip(wrappers, actions):
+            wrapper.step(action)
+        elapsed += time.perf_counter() - start
+        agent_steps += num_agents
+        for i, env in enumerate(envs):
+            if env.done:
+                envs[i] = Env(record=False, arena=ARENA, rng=env.rng)
+                wrappers[i] = ShooterEnvWrapper(envs[i], envs[i].snake)
+                wrappers[i].reset()
+    return elapsed / agent_steps * 1e6
+
+
+def bench_shared(num_agents, steps, seed=1):
+    rng = random.Random(seed)
+    env = Env(record=False, arena=ARENA, num_snakes=num_agents, rng=seed)
+    wrapper = MultiAgentEnvWrapper(env)
+    wrapper.reset()
+    agent_steps, elapsed = 0, 0.0
+    for _ in range(steps):
+        actions = [safe_action(agent, env, rng) for agent in wrapper.agents]
+        alive = sum(agent.alive for agent in wrapper.agents)
+        start = time.perf_counter()
+        wrapper.step(actions)
+        elapsed += time.perf_counter() - start
+        agent_steps += alive
+        if env.done:
+            env = Env(record=False, arena=ARENA, num_snakes=num_agents, rng=env.rng)
+            wrapper = MultiAgentEnvWrapper(env)
+            wrapper.reset()
+    return elapsed / agent_steps * 1e6
+
+
+if __name__ == "__main__":
+    checked, collisions = check_states()
+    print(f"batched states == per-agent reference: {checked} agent states, {collisions} deaths")
+    print(f"cost per agent step on a {ARENA.width}x{ARENA.height} arena (step + flat state + minimap + reward)")
+    for k in (1, 8, 32):
+        separate = bench_separate(k, 300)
+        shared = bench_shared(k, 300)
+        print(f"  {k:>3} agents: {k} separate Env {separate:7.1f} us, one Env with {k} snakes {shared:7.1f} us "
+              f"({separate / shared:.1f}x)")
@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+import numpy as np
+
+from core.arena import ArenaConfig
+from core.env import Env
+from core.seeding import RandomStream
+from core.env_wrapper import ShooterEnvWrapper
+from bench.bench_recorder import cycle_policy
+
+
+def episodes(num_episodes, seed=0, arena=None):
+    """Épisodes aléatoires et épisodes longs sur le cycle hamiltonien (beaucoup de réapparitions).
+
+    Le cycle ne couvre que l'arène par défaut : ailleurs, tous les épisodes sont aléatoires.
+    """
+    random.seed(seed)
+    env_rng = RandomStream(seed)
+    policy = cycle_policy() if arena is None else None
+    for episode in range(num_episodes):
+        env = Env(record=False, arena=arena, rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        wrapper.reset()
+        yield wrapper
+        for _ in range(2000):
+            if episode % 2 and policy is not None:
+                head = env.snake.head()
+                env.snake.external_action = policy[(head.x, head.y)]
+            else:
+                env.snake.external_action = random.choice(env.snake.action_space)
+            env.step()
+            yield wrapper
+            if env.done:
+                break
+
+
+def check_equivalence(num_episodes=40, arena=None):
+    states = 0
+    for wrapper in episodes(num_episodes, arena=arena):
+        expected = wrapper.flat_state_reference()
+        actual = wrapper.observation.build(wrapper.agent, wrapper.env)
+        assert actual.dtype == np.float32 and np.array_equal(actual, expected), \
+            f"state {states}: {actual} != {expected}"
+        states += 1
+    return states
+
+
+def bench(num_episodes=10):
+    # Mesure en situation : un état par pas, cibles et angle changent comme à l'entraînement
+    reference = builder = 0.0
+    count = 0
+    for wrapper in episodes(num_episodes, seed=1):
+        start = time.perf_counter()
+        wrapper.flat_state_reference()
+        reference += time.perf_counter() - start
+        start = time.perf_counter()
+        wrapper.observation.build(wrapper.agent, wrapper.env)
+        builder += time.perf_counter() - start
+        count += 1
+    return reference / count * 1e6, builder / count * 1e6
+
+
+if __name__ == "__main__":
+    print(f"equivalence: {check_equivalence()} states identical")
+    # Masques sur une petite arène non carrée, index spatial sur une grande
+    for arena in (ArenaConfig(37, 23, num_targets=40), ArenaConfig(200, 200, num_targets=2000)):
+        print(f"equivalence {arena}: {check_equivalence(10, arena)} states identical")
+    reference_us, builder_us = bench()
+    print(f"flat state: reference {reference_us:.2f} us, ObservationBuilder {builder_us:.2f} us "
+          f"({reference_us / builder_us:.1f}x)")
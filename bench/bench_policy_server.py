@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from core.rl_snacke.dqn_model import CombinedDQN
+from core.rl_snacke.inference import DQNInference
+from core.rl_snacke.policy_server import PolicyServer
+from bench.bench_inference import ACTION_DIM, FLAT_DIM, trained_net
+
+
+def observations(count, seed=1):
+    """Observations d'acteur : minimap binaire (le serveur la transporte en bits)."""
+    rng = np.random.default_rng(seed)
+    flat = rng.random((count, FLAT_DIM), dtype=np.float32)
+    minimap = (rng.random((count, 4, 64, 64)) < 0.05).astype(np.float32)
+    return flat, minimap
+
+
+def check_actions(count=200):
+    """Les actions du serveur == DQNInference local, avant et après `publish`."""
+    flat, minimap = observations(count)
+    nets = [trained_net(0), trained_net(1)]
+    with PolicyServer(nets[0], num_clients=1) as server:
+        client = server.client(0)
+        for k, net in enumerate(nets):
+            if k:
+                server.publish(net)
+            expected = DQNInference(net).act(flat, minimap)
+            actions = np.array([client.act(flat[i], minimap[i]) for i in range(count)])
+            assert (actions == expected).all(), (k, int((actions != expected).sum()))
+        return server.stats()
+
+
+def own_model_worker(num_requests, seconds):
+    """Un processus, sa copie de CombinedDQN, un forward batch 1 par action (acteur actuel)."""
+    torch.set_num_threads(1)
+    net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+    net.eval()
+    flat, minimap = observations(1)
+    flat, minimap = torch.from_numpy(flat), torch.from_numpy(minimap)
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        with torch.no_grad():
+            net(flat, minimap).argmax().item()
+    seconds.value = time.perf_counter() - start
+
+
+def client_worker(client, num_requests, seconds):
+    flat, minimap = observations(1)
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        client.act(flat[0], minimap[0])
+    seconds.value = time.perf_counter() - start
+
+
+def actions_per_sec(num_processes, num_requests, server=None):
+    """Actions/s cumulées de `num_processes` processus, avec leur propre modèle ou via `server`."""
+    ctx = mp.get_context("spawn")
+    seconds = [ctx.RawValue("d", 0.0) for _ in range(num_processes)]
+    processes = [
+        ctx.Process(target=own_model_worker, args=(num_requests, seconds[i])) if server is None
+        else ctx.Process(target=client_worker, args=(server.client(i), num_requests, seconds[i]))
+        for i in range(num_processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return num_processes * num_requests / max(s.value for s in seconds)
+
+
+if __name__ == "__main__":
+    stats = check_actions()
+    print(f"server actions == DQNInference, before and after publish ({stats['weight_swaps']} swaps)")
+
+    net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+    model_mb = sum(p.numel() * p.element_size() for p in net.parameters()) / 1e6
+    max_processes = max(1, (os.cpu_count() or 2) - 1)  # un cœur pour le serveur
+    counts = [n for n in (1, 4, 16, 32) if n <= 4 * max_processes]
+
+    print(f"{'procs':>6} {'own model /s':>13} {'server /s':>10} {'p50 us':>8} {'p99 us':>8} "
+          f"{'mean batch':>11} {'weights MB':>16}")
+    for num_processes in counts:
+        own = actions_per_sec(num_processes, 300)
+        with PolicyServer(net, num_clients=num_processes, max_batch=64, max_latency=0.001) as server:
+            served = actions_per_sec(num_processes, 300, server)
+            stats = server.stats()
+        print(f"{num_processes:>6} {own:13.0f} {served:10.0f} {stats['p50_us']:8.0f} {stats['p99_us']:8.0f} "
+              f"{stats['mean_batch']:11.1f} {num_processes * model_mb:7.1f} -> {model_mb:5.1f}")
+        print(f"       batch sizes: {stats['batch_histogram']}")
@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from collections import deque
+
+import numpy as np
+
+from core.env import Env
+from core.seeding import RandomStream, spawn_seeds
+from core.env_wrapper import ShooterEnvWrapper
+from core.observation import FLAT_DIM
+from core.rl_snacke.replay_buffer import SumTree
+
+
+def check_sum_tree(capacity=1000, num_draws=200000, seed=0):
+    """Les fréquences de tirage doivent suivre les priorités."""
+    rng = np.random.default_rng(seed)
+    tree = SumTree(capacity)
+    priorities = rng.random(capacity)
+    tree.update(np.arange(capacity), priorities)
+    assert np.isclose(tree.total(), priorities.sum())
+
+    leaves = tree.find(rng.random(num_draws) * tree.total())
+    frequencies = np.bincount(leaves, minlength=capacity) / num_draws
+    expected = priorities / priorities.sum()
+    return np.abs(frequencies - expected).max()
+
+
+def check_zero_priorities(num_trees=300, capacity=64, seed=0):
+    """Aucun tirage ne tombe sur une feuille de priorité nulle (slots vides ou évincés),
+    même pour des valeurs aux bornes des sommes cumulées et des priorités d'ordres de grandeur très différents."""
+    rng = np.random.default_rng(seed)
+    for _ in range(num_trees):
+        tree = SumTree(capacity)
+        priorities = 10.0 ** rng.uniform(-6, 3, capacity)
+        priorities[rng.random(capacity) < 0.5] = 0.0
+        tree.update(np.arange(capacity), priorities)
+        bounds = np.cumsum(priorities)
+        values = np.concatenate([bounds, np.nextafter(bounds, 0), np.nextafter(bounds, np.inf)])
+        assert (tree.get(tree.find(values)) > 0).all()
+    return num_trees
+
+
+def bench_sum_tree(capacity=1000000, batch_size=64, repeat=1000):
+    rng = np.random.default_rng(0)
+    tree = SumTree(capacity)
+    tree.update(np.arange(capacity), rng.random(capacity))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        slots = tree.find(rng.random(batch_size) * tree.total())
+        tree.update(slots, rng.random(batch_size))
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def steps_to_length(prioritized, target_length=5, window=20, max_env_steps=300000, seed=0, batch_size=64,
+                    replay_ratio=1.0):
+    """Pas d'environnement avant que la longueur moyenne sur `window` épisodes atteigne `target_length`.
+
+    Par défaut un pas de gradient de 64 transitions par pas d'environnement
+    (train_step) ; `batch_size` et `replay_ratio` réduisent le coût de la
+    comparaison sur une petite machine, à réglages égaux pour les deux buffers.
+    """
+    # import local : les vérifications du sum-tree n'ont pas besoin de torch
+    from core.rl_snacke.train_dqn import DQNTrainer, LearnerSchedule
+
+    trainer_seed, env_seed = spawn_seeds(seed, 2)
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=4, prioritized=prioritized, rng=trainer_seed,
+                         schedule=LearnerSchedule(replay_ratio))
+    trainer.batch_size = batch_size
+    env_rng = RandomStream(env_seed)
+    lengths = deque(maxlen=window)
+    env_steps = 0
+    episode = 0
+    while env_steps < max_env_steps:
+        env = Env(rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        flat_state, minimap = wrapper.reset()
+        for _ in range(5000):
+            action = trainer.select_action(flat_state, minimap, epoche=episode)
+            next_state, next_minimap, reward, done = wrapper.step(action)
+            trainer.replay_buffer.push(flat_state, minimap, action, reward, next_state, next_minimap, done)
+            trainer.observe()
+            flat_state, minimap = next_state, next_minimap
+            env_steps += 1
+            if done:
+                break
+        episode += 1
+        lengths.append(len(env.snake.body))
+        if len(lengths) == window and np.mean(lengths) >= target_length:
+            return env_steps
+    return None
+
+
+if __name__ == "__main__":
+    print(f"sum-tree max frequency error: {check_sum_tree():.4f}")
+    print(f"sum-tree never lands on a zero priority: {check_zero_priorities()} trees")
+    print(f"sum-tree sample+update (1M leaves, batch 64): {bench_sum_tree():.1f} us")
+
+    # Arguments optionnels : budget de pas d'environnement (300000), longueur visée (5),
+    # taille de batch (64), replay ratio (1) et nombre de graines (1)
+    max_env_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    target_length = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    replay_ratio = float(sys.argv[4]) if len(sys.argv) > 4 else 1.0
+    num_seeds = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+    print(f"mean length over 20 episodes >= {target_length:g}, batch {batch_size}, replay ratio {replay_ratio:g}")
+    for seed in range(num_seeds):
+        for prioritized in (False, True):
+            name = "PrioritizedReplayBuffer" if prioritized else "ReplayBuffer"
+            steps = steps_to_length(prioritized, target_length=target_length, max_env_steps=max_env_steps,
+                                    seed=seed, batch_size=batch_size, replay_ratio=replay_ratio)
+            result = f"{steps} env steps" if steps is not None else f"not reached in {max_env_steps}"
+            print(f"{name:>24}, seed {seed}: {result}", flush=True)
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from core.env import Env
+from core.env_wrapper import ShooterEnvWrapper
+from core.seeding import RandomStream, spawn_seeds
+from core.rl_snacke.inference import DQNInference, configure_threads
+from core.rl_snacke.quantize import action_agreement, export_actor, model_bytes, quantize_actor, replay_states
+from core.rl_snacke.train_dqn import DQNTrainer, LearnerSchedule
+
+FLAT_DIM = 5*8 + 12
+ACTION_DIM = 4
+
+
+def trained_trainer(env_steps=20000, seed=0, replay_ratio=1.0):
+    """DQNTrainer après `env_steps` pas de la boucle d'entraînement : poids, BatchNorm et buffer réalistes."""
+    trainer_seed, env_seed = spawn_seeds(seed, 2)
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=trainer_seed,
+                         schedule=LearnerSchedule(replay_ratio))
+    env_rng = RandomStream(env_seed)
+    steps = episode = 0
+    while steps < env_steps:
+        env = Env(record=False, rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        flat_state, minimap = wrapper.reset()
+        for _ in range(5000):
+            action = trainer.select_action(flat_state, minimap, epoche=episode)
+            next_state, next_minimap, reward, done = wrapper.step(action)
+            trainer.replay_buffer.push(flat_state, minimap, action, reward, next_state, next_minimap, done)
+            trainer.observe()
+            flat_state, minimap = next_state, next_minimap
+            steps += 1
+            if done or steps >= env_steps:
+                break
+        episode += 1
+    trainer.q_net.eval()
+    return trainer
+
+
+def latency_us(act, flat, minimap, repeat=500):
+    """Médiane d'un choix d'action batch 1, comme dans un acteur."""
+    for _ in range(20):
+        act(flat[:1], minimap[:1])
+    times = []
+    for i in range(repeat):
+        row = slice(i % len(flat), i % len(flat) + 1)
+        start = time.perf_counter()
+        act(flat[row], minimap[row])
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e6
+
+
+def eager_act(net):
+    def act(flat, minimap):
+        with torch.no_grad():
+            return net(torch.from_numpy(flat), torch.from_numpy(minimap)).argmax(1).numpy()
+    return act
+
+
+def check_export(quantized, flat, minimap):
+    """Le modèle TorchScript exporté redonne les actions du QuantizedDQN."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "actor_int8.pt")
+        export_actor(quantized, path, flat[:1], minimap[:1])
+        loaded = torch.jit.load(path)
+        with torch.no_grad():
+            actions = loaded(torch.from_numpy(flat), torch.from_numpy(minimap)).argmax(1).numpy()
+        size = os.path.getsize(path)
+    assert (actions == quantized.act(flat, minimap)).all()
+    return size
+
+
+if __name__ == "__main__":
+    configure_threads(1)  # un acteur = un cœur
+    # Arguments optionnels : pas d'environnement (20000) et replay ratio (1) de l'entraînement préalable
+    env_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    replay_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    trainer = trained_trainer(env_steps, replay_ratio=replay_ratio)
+    net = trainer.q_net
+    (_, calibration), (flat, minimap) = replay_states(trainer.replay_buffer, 512, held_out_size=4000)
+
+    quantized = quantize_actor(net, calibration)
+    print(f"backend {torch.backends.quantized.engine}, calibration 512 minimaps, {len(flat)} held-out states")
+    print(f"exported TorchScript actor: {check_export(quantized, flat[:64], minimap[:64]) / 1e6:.2f} MB, same actions")
+
+    print(f"{'':>22} {'agreement':>10} {'batch 1 (us)':>13} {'size (MB)':>10}")
+    inference = DQNInference(net)
+    rows = [
+        ("fp32 eager", eager_act(net), net),
+        ("fp32 DQNInference", inference.act, net),
+        ("int8 actor", quantized.act, quantized),
+    ]
+    for name, act, module in rows:
+        agreement = 1.0 if module is net else action_agreement(net, quantized, flat, minimap)
+        print(f"{name:>22} {agreement:10.2%} {latency_us(act, flat, minimap):13.0f} "
+              f"{model_bytes(module) / 1e6:10.2f}")
+
+    # Calibration plus courte : sensibilité de l'accord au nombre de minimaps
+    for size in (16, 64):
+        agreement = action_agreement(net, quantize_actor(net, calibration[:size]), flat, minimap)
+        print(f"calibration {size:>4} minimaps: agreement {agreement:.2%}")
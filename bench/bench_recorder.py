@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import random
+import tempfile
+import time
+
+from core.env import Env
+from core.recorder import StreamRecorder, read_steps
+from bench.bench_snake_collision import hamiltonian_cycle, cycle_directions
+
+
+def cycle_policy():
+    """Suit le cycle hamiltonien : épisodes longs, le serpent mange souvent."""
+    cycle = hamiltonian_cycle()
+    return dict(zip(cycle, cycle_directions(cycle)))
+
+
+def run_episode(env, policy, max_steps, seed):
+    random.seed(seed)
+    for _ in range(max_steps):
+        head = env.snake.head()
+        if policy is None:
+            env.snake.external_action = random.choice(env.snake.action_space)
+        else:
+            env.snake.external_action = policy[(head.x, head.y)]
+        env.step()
+        if env.done:
+            break
+    env.close()
+
+
+def check_round_trip(path, num_episodes=20, max_steps=3000, chunk_steps=256):
+    """Le fichier relu doit redonner exactement les `steps` de l'enregistrement mémoire."""
+    policy = cycle_policy()
+    for episode in range(num_episodes):
+        ep_policy = None if episode % 2 else policy
+        seed = 1000 + episode
+
+        env = Env(rng=seed)
+        run_episode(env, ep_policy, max_steps, seed)
+
+        streamed = Env(recorder=StreamRecorder(path, chunk_steps=chunk_steps), rng=seed)
+        run_episode(streamed, ep_policy, max_steps, seed)
+
+        assert read_steps(path) == env.steps, f"episode {episode} differs"
+        assert json.dumps(read_steps(path)) == json.dumps(env.steps)
+    return num_episodes
+
+
+def bench(path, mode, num_steps=20000):
+    random.seed(0)
+    if mode == "off":
+        env = Env(record=False, rng=0)
+    elif mode == "stream":
+        env = Env(recorder=StreamRecorder(path), rng=0)
+    else:
+        env = Env(rng=0)
+    start = time.perf_counter()
+    run_episode(env, cycle_policy(), num_steps, 0)
+    elapsed = time.perf_counter() - start
+    return env, elapsed / env.step_count * 1e6
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "episode.snkrec")
+        print(f"round trip ok on {check_round_trip(path)} episodes")
+
+        for mode in ("off", "stream", "memory"):
+            env, us = bench(path, mode)
+            print(f"{mode:>7}: {us:6.1f} us/step over {env.step_count} steps")
+
+        env, _ = bench(path, "memory")
+        json_path = os.path.join(tmp, "episode.json")
+        start = time.perf_counter()
+        env.export(json_path)
+        export_ms = (time.perf_counter() - start) * 1e3
+        print(f"json export: {os.path.getsize(json_path) / 1e6:.1f} MB in {export_ms:.0f} ms")
+        _, _ = bench(path, "stream")
+        print(f"stream file: {os.path.getsize(path) / 1e3:.1f} kB")
@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+import numpy as np
+
+from core.env import Env
+from core.seeding import RandomStream
+from core.env_wrapper import ShooterEnvWrapper
+from core.rl_snacke.replay_buffer import ReplayBuffer
+
+
+def collect(num_steps, seed=0):
+    """Transitions d'épisodes aléatoires, avec le même chaînage d'objets que sim/main.py."""
+    random.seed(seed)
+    env_rng = RandomStream(seed)
+    transitions = []
+    while len(transitions) < num_steps:
+        env = Env(rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        flat_state, minimap = wrapper.reset()
+        for _ in range(200):
+            action = random.randrange(4)
+            next_state, next_minimap, reward, done = wrapper.step(action)
+            transitions.append((flat_state, minimap, action, reward, next_state, next_minimap, done))
+            flat_state, minimap = next_state, next_minimap
+            if done:
+                break
+    return transitions[:num_steps]
+
+
+def check_round_trip(transitions, capacity):
+    buffer = ReplayBuffer(capacity=capacity)
+    for t in transitions:
+        buffer.push(*t)
+    kept = transitions[-len(buffer):]
+    slots = (buffer._start + np.arange(len(buffer))) % buffer.capacity
+    stored = buffer._gather(slots)
+    for field, (expected, actual) in enumerate(zip(zip(*kept), stored)):
+        assert np.array_equal(np.array(expected, dtype=actual.dtype), actual), f"field {field}"
+    return len(buffer)
+
+
+def check_lagging_stream(capacity=8):
+    """Deux flux entrelacés : A pousse une transition, B en pousse `capacity`, puis A reprend.
+
+    L'état en attente de A a alors exactement `frame_capacity` frames : il ne
+    doit pas être réutilisé, l'écriture de son état suivant l'écraserait.
+    """
+    states = [(np.full(3, value, dtype=np.float32), np.zeros((1, 2, 4), dtype=np.float32))
+              for value in range(capacity + 1)]
+    a = [(np.full(3, value, dtype=np.float32), np.zeros((1, 2, 4), dtype=np.float32))
+         for value in (1000.0, 1001.0, 1002.0)]
+    transitions = [(*a[0], 0, 0.0, *a[1], False)]
+    transitions += [(*states[i], 0, 0.0, *states[i + 1], False) for i in range(capacity)]
+    transitions.append((*a[1], 0, 0.0, *a[2], False))
+    return check_round_trip(transitions, capacity)
+
+
+def naive_bytes(transition):
+    flat, minimap, _, _, next_flat, next_minimap, _ = transition
+    return flat.nbytes + minimap.nbytes + next_flat.nbytes + next_minimap.nbytes
+
+
+if __name__ == "__main__":
+    transitions = collect(5000)
+    for capacity in (5000, 1000, 37):
+        print(f"round trip (capacity {capacity}): {check_round_trip(transitions, capacity)} transitions ok")
+    print(f"round trip (stream lagging by a full frame ring): {check_lagging_stream()} transitions ok")
+
+    buffer = ReplayBuffer(capacity=50000)
+    start = time.perf_counter()
+    for t in transitions:
+        buffer.push(*t)
+    push_us = (time.perf_counter() - start) / len(transitions) * 1e6
+    start = time.perf_counter()
+    for _ in range(200):
+        buffer.sample(64)
+    sample_ms = (time.perf_counter() - start) / 200 * 1e3
+    print(f"push: {push_us:.1f} us, sample(64): {sample_ms:.2f} ms")
+
+    per_transition = naive_bytes(transitions[0])
+    for capacity in (50000, 1000000):
+        big = ReplayBuffer(capacity=capacity)
+        big.push(*transitions[0])
+        print(f"capacity {capacity:>8}: {big.memory_bytes() / 2**30:6.2f} GiB "
+              f"(tuple deque: {per_transition * capacity / 2**30:6.2f} GiB)")
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from core.rl_snacke.replay_buffer import ReplayBuffer
+
+
+class DequeReplayBuffer:
+    """Ancien replay buffer (deque de tuples), pour comparaison."""
+
+    def __init__(self, capacity):
+        self.buffer = deque(maxlen=capacity)
+
+    def push(self, *transition):
+        self.buffer.append(transition)
+
+    def sample(self, batch_size):
+        samples = random.sample(self.buffer, batch_size)
+        return tuple(np.array(field) for field in zip(*samples))
+
+
+def fill(buffer, num_transitions, seed=0):
+    rng = np.random.default_rng(seed)
+    flat = rng.random(52, dtype=np.float32)
+    minimap = (rng.random((4, 64, 64)) < 0.05).astype(np.float32)
+    for i in range(num_transitions):
+        next_flat = rng.random(52, dtype=np.float32)
+        next_minimap = (rng.random((4, 64, 64)) < 0.05).astype(np.float32)
+        done = i % 50 == 49
+        buffer.push(flat, minimap, int(rng.integers(4)), float(rng.random()), next_flat, next_minimap, done)
+        flat, minimap = next_flat, next_minimap
+
+
+def to_tensors(batch):
+    """Conversion faite par l'ancien DQNTrainer.train_step."""
+    flat, minimap, a, r, flat2, minimap2, d = batch
+    return (
+        torch.FloatTensor(flat), torch.FloatTensor(minimap),
+        torch.LongTensor(a).unsqueeze(1), torch.FloatTensor(r).unsqueeze(1),
+        torch.FloatTensor(flat2), torch.FloatTensor(minimap2),
+        torch.FloatTensor(d).unsqueeze(1),
+    )
+
+
+def check_reuse(buffer, batch_size=64):
+    """Même taille de batch : mêmes tenseurs, réécrits en place ; clone() garde le premier tirage."""
+    first = buffer.sample_tensors(batch_size)
+    kept = tuple(tensor.clone() for tensor in first)
+    second = buffer.sample_tensors(batch_size)
+    assert all(a is b for a, b in zip(first, second))
+    assert not torch.equal(kept[0], first[0])  # le premier batch a été écrasé par le second
+    assert all(torch.equal(a, b) for a, b in zip(first, second))
+
+
+def latency_ms(fn, repeat=50):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+if __name__ == "__main__":
+    num_transitions = 5000
+    legacy = DequeReplayBuffer(capacity=50000)
+    buffer = ReplayBuffer(capacity=50000)
+    fill(legacy, num_transitions)
+    fill(buffer, num_transitions)
+
+    check_reuse(buffer)
+    print("sample_tensors reuses its output tensors across calls (clone() to keep a batch)")
+
+    print(f"{'batch':>6} {'deque+FloatTensor':>18} {'sample+FloatTensor':>19} {'sample_tensors':>15}  (ms)")
+    for batch_size in (64, 256, 1024):
+        old = latency_ms(lambda: to_tensors(legacy.sample(batch_size)))
+        copy = latency_ms(lambda: to_tensors(buffer.sample(batch_size)))
+        zero_copy = latency_ms(lambda: buffer.sample_tensors(batch_size))
+        print(f"{batch_size:>6} {old:18.2f} {copy:19.2f} {zero_copy:15.2f}")
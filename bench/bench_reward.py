@@ -0,0 +1,226 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+from core.arena import ArenaConfig
+from core.env import Env
+from core.env_wrapper import MultiAgentEnvWrapper, MultiEnvWrapper, ShooterEnvWrapper, shaped_reward_reference
+from core.reward import RewardKernel
+from bench.bench_recorder import cycle_policy
+from bench.bench_snake_collision import cycle_directions, hamiltonian_cycle
+
+ACTION_INDEX = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+
+
+def nearest(env, agent):
+    head = agent.head()
+    return env.spatial.nearest(head.x, head.y, etype='target')[1]
+
+
+def check_single(num_episodes=30, seed=0):
+    """ShooterEnvWrapper.step == shaped_reward_reference à chaque pas.
+
+    Épisodes aléatoires (morts précoces) et épisodes sur le cycle hamiltonien
+    (serpents longs, faim, temps écoulé, bonus posthume).
+    """
+    rng = random.Random(seed)
+    policy = cycle_policy()
+    steps = ends = 0
+    for episode in range(num_episodes):
+        env = Env(record=False, rng=seed + episode)
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        wrapper.reset()
+        agent = env.snake
+        while True:
+            head = agent.head()
+            if episode % 2:
+                action = ACTION_INDEX[policy[(head.x, head.y)]]
+            else:
+                action = rng.randrange(4)
+            prev = (nearest(env, agent), len(agent.body), agent.head())
+            _, _, reward, done = wrapper.step(action)
+            # Env.kill est idempotent : la référence voit le même état que le kernel
+            expected = shaped_reward_reference(env, agent, *prev, env.appelSignal, nearest(env, agent))
+            assert (reward, done) == expected, (episode, env.step_count, reward, done, expected)
+            steps += 1
+            if done:
+                ends += 1
+                break
+    return steps, ends
+
+
+def check_multi(num_snakes=16, steps=600, seed=0):
+    """MultiAgentEnvWrapper.step == shaped_reward_reference pour chaque agent vivant."""
+    rng = random.Random(seed)
+    env = Env(record=False, arena=ArenaConfig(64, 64, num_targets=64), num_snakes=num_snakes, rng=seed)
+    wrapper = MultiAgentEnvWrapper(env)
+    wrapper.reset()
+    checked = 0
+    for _ in range(steps):
+        active = [agent.alive for agent in wrapper.agents]
+        prev = [(nearest(env, agent), len(agent.body), agent.head()) if alive else None
+                for agent, alive in zip(wrapper.agents, active)]
+        _, _, rewards, dones = wrapper.step([rng.randrange(4) for _ in wrapper.agents])
+        for k, agent in enumerate(wrapper.agents):
+            if not active[k]:
+                assert rewards[k] == 0.0 and dones[k]
+                continue
+            expected = shaped_reward_reference(env, agent, *prev[k], env.ate[k], nearest(env, agent))
+            assert (rewards[k], dones[k]) == expected, (k, env.step_count)
+            checked += 1
+        if env.done:
+            break
+    return checked
+
+
+def check_envs(num_envs=16, steps=600, seed=0):
+    """MultiEnvWrapper.step == shaped_reward_reference pour chacun des N Env, Env remplacés en fin d'épisode."""
+    rng = random.Random(seed)
+    envs = MultiEnvWrapper(Env(record=False, rng=seed + i) for i in range(num_envs))
+    envs.reset()
+    checked = ends = 0
+    for _ in range(steps):
+        prev = [(nearest(env, env.snake), len(env.snake.body), env.snake.head()) for env in envs.envs]
+        _, rewards, dones = envs.step([rng.randrange(4) for _ in range(num_envs)])
+        for i, env in enumerate(list(envs.envs)):
+            expected = shaped_reward_reference(env, env.snake, *prev[i], env.appelSignal, nearest(env, env.snake))
+            assert (rewards[i], dones[i]) == expected, (i, env.step_count)
+            checked += 1
+            if dones[i]:
+                ends += 1
+                envs.replace(i, Env(record=False, rng=env.rng))
+    return checked, ends
+
+
+def grown_env(length, seed=0):
+    """Env 64x64 dont le serpent fait `length` cases, sur un cycle hamiltonien (pas de collision)."""
+    arena = ArenaConfig(64, 64)
+    cycle = hamiltonian_cycle(arena.width, arena.height)
+    policy = dict(zip(cycle, cycle_directions(cycle)))
+    env = Env(record=False, arena=arena, rng=seed)
+    while len(env.snake.body) < length:
+        env.snake.grow()
+        head = env.snake.head()
+        env.snake.external_action = policy[(head.x, head.y)]
+        env.step()
+        env.step_count = 0
+    env.snake.grow_next = False
+    return env, policy
+
+
+def reward_cost(length, steps=3000):
+    """µs de récompense par pas (hors Env.step et état) : référence puis RewardKernel."""
+    costs = []
+    for use_kernel in (False, True):
+        env, policy = grown_env(length)
+        agent = env.snake
+        kernel = RewardKernel(env, [agent])
+        elapsed = 0.0
+        for _ in range(steps):
+            head = agent.head()
+            agent.external_action = policy[(head.x, head.y)]
+            # Le temps alloué ne s'écoule pas : le serpent reste à `length` cases
+            env.step_count = 0
+            start = time.perf_counter()
+            if use_kernel:
+                before = kernel.begin()
+            else:
+                prev = (nearest(env, agent), len(agent.body), agent.head())
+            elapsed += time.perf_counter() - start
+            env.step()
+            agent.grow_next = False
+            start = time.perf_counter()
+            if use_kernel:
+                kernel.finish_one(before)
+            else:
+                shaped_reward_reference(env, agent, *prev, env.appelSignal, nearest(env, agent))
+            elapsed += time.perf_counter() - start
+        assert agent.alive and len(agent.body) == length
+        costs.append(elapsed / steps * 1e6)
+    return costs
+
+
+def batch_cost(num_snakes, steps=400):
+    """µs de récompense par agent et par pas pour K agents d'un Env : K références puis une passe du kernel."""
+    arena = ArenaConfig(128, 128, num_targets=64)
+    loop = ["RIGHT"] * 8 + ["DOWN"] * 8 + ["LEFT"] * 8 + ["UP"] * 8  # carrés disjoints autour des départs
+    costs = []
+    for use_kernel in (False, True):
+        env = Env(record=False, arena=arena, num_snakes=num_snakes, rng=0)
+        kernel = RewardKernel(env, env.snakes, skip_dead=True)
+        elapsed = 0.0
+        for t in range(steps):
+            env.step_count = 0
+            for agent in env.snakes:
+                agent.external_action = loop[t % len(loop)]
+            start = time.perf_counter()
+            if use_kernel:
+                before = kernel.begin()
+            else:
+                prev = [(nearest(env, agent), len(agent.body), agent.head()) for agent in env.snakes]
+            elapsed += time.perf_counter() - start
+            env.step()
+            start = time.perf_counter()
+            if use_kernel:
+                kernel.finish(before)
+            else:
+                for k, agent in enumerate(env.snakes):
+                    shaped_reward_reference(env, agent, *prev[k], env.ate[k], nearest(env, agent))
+            elapsed += time.perf_counter() - start
+        assert not env.done
+        costs.append(elapsed / steps / num_snakes * 1e6)
+    return costs
+
+
+def envs_cost(num_envs, steps=400):
+    """µs de récompense par Env et par pas pour N Env d'un serpent : N kernels (finish_one) puis un seul kernel."""
+    loop = ["RIGHT"] * 8 + ["DOWN"] * 8 + ["LEFT"] * 8 + ["UP"] * 8  # carré autour du départ
+    costs = []
+    for shared in (False, True):
+        envs = [Env(record=False, rng=i) for i in range(num_envs)]
+        agents = [env.snake for env in envs]
+        kernels = [RewardKernel(envs, agents)] if shared else [RewardKernel(env, [env.snake]) for env in envs]
+        elapsed = 0.0
+        for t in range(steps):
+            for env in envs:
+                env.step_count = 0
+                env.snake.external_action = loop[t % len(loop)]
+            start = time.perf_counter()
+            befores = [kernel.begin() for kernel in kernels]
+            elapsed += time.perf_counter() - start
+            for env in envs:
+                env.step()
+            start = time.perf_counter()
+            for kernel, before in zip(kernels, befores):
+                kernel.finish(before) if shared else kernel.finish_one(before)
+            elapsed += time.perf_counter() - start
+        assert all(env.snake.alive for env in envs)
+        costs.append(elapsed / steps / num_envs * 1e6)
+    return costs
+
+
+if __name__ == "__main__":
+    steps, ends = check_single()
+    print(f"ShooterEnvWrapper rewards == reference: {steps} steps, {ends} episode ends")
+    print(f"MultiAgentEnvWrapper rewards == reference: {check_multi()} agent steps")
+    checked, ends = check_envs()
+    print(f"MultiEnvWrapper rewards == reference: {checked} env steps, {ends} episode ends")
+
+    print("reward cost per step (us), one agent")
+    print(f"{'length':>8} {'reference':>10} {'kernel':>10}")
+    for length in (1, 50, 400):
+        reference, kernel = reward_cost(length)
+        print(f"{length:>8} {reference:10.2f} {kernel:10.2f} ({reference / kernel:.1f}x)")
+
+    print("reward cost per agent step (us), K agents in one Env")
+    for k in (8, 32):
+        reference, kernel = batch_cost(k)
+        print(f"{k:>8} {reference:10.2f} {kernel:10.2f} ({reference / kernel:.1f}x)")
+
+    print("reward cost per env step (us), N Envs of one snake: N kernels vs one kernel")
+    for n in (16, 64):
+        separate, shared = envs_cost(n)
+        print(f"{n:>8} {separate:10.2f} {shared:10.2f} ({separate / shared:.1f}x)")
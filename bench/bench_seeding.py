@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+import numpy as np
+
+from core.env import Env
+from core.seeding import RandomStream, spawn_seeds
+from core.vec_env import VecEnv
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+
+def trajectory(env_rng, actions, episodes=20):
+    """Positions de la tête et des cibles pas à pas, sur une suite d'Env partageant `env_rng`."""
+    out = []
+    env = Env(record=False, rng=env_rng)
+    a = 0
+    for _ in range(episodes):
+        while not env.done:
+            env.snake.external_action = ACTIONS[actions[a % len(actions)]]
+            a += 1
+            env.step()
+            head = env.snake.head()
+            out.append((head.x, head.y, tuple((t.position.x, t.position.y) for t in env.targets)))
+        env = Env(record=False, rng=env.rng)
+    return out
+
+
+def check_reproducible(seed=0):
+    actions = np.random.default_rng(seed).integers(0, 4, size=5000).tolist()
+    random.seed(1)
+    first = trajectory(seed, actions)
+    # L'état global de `random` / `np.random` n'intervient plus
+    random.seed(2)
+    np.random.seed(2)
+    assert trajectory(seed, actions) == first
+    # Deux flux dérivés de la même racine sont indépendants
+    a, b = spawn_seeds(seed, 2)
+    assert trajectory(a, actions) != trajectory(b, actions)
+
+    vec_a, vec_b = VecEnv(64, seed=seed), VecEnv(64, seed=seed)
+    batch = np.random.default_rng(seed).integers(0, 4, size=(500, 64))
+    for step in batch:
+        assert all(np.array_equal(x, y) for x, y in zip(vec_a.step(step), vec_b.step(step)))
+    assert np.array_equal(vec_a.target_x, vec_b.target_x) and np.array_equal(vec_a.body_x, vec_b.body_x)
+    return len(first)
+
+
+def draw_cost(n=200000):
+    stream = RandomStream(0)
+    generator = np.random.default_rng(0)
+    costs = {}
+    start = time.perf_counter()
+    for _ in range(n):
+        random.randrange(4096)
+    costs["random.randrange"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        generator.integers(4096)
+    costs["Generator.integers"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        stream.randbelow(4096)
+    costs["RandomStream.randbelow"] = time.perf_counter() - start
+    return {name: seconds / n * 1e6 for name, seconds in costs.items()}
+
+
+if __name__ == "__main__":
+    steps = check_reproducible()
+    print(f"same seed -> same trajectory over {steps} steps, spawned streams differ, VecEnv(seed=...) reproducible")
+    for name, cost in draw_cost().items():
+        print(f"{name:>24} : {cost:5.2f} us/draw")
@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import numpy as np
+import torch
+
+from core.rl_snacke.train_dqn import DQNTrainer
+
+
+def per_env_us(fn, num_envs, repeat=20):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat / num_envs * 1e6
+
+
+if __name__ == "__main__":
+    torch.set_num_threads(os.cpu_count() or 1)
+    trainer = DQNTrainer(state_dim=5*8 + 12, action_dim=4)
+    rng = np.random.default_rng(0)
+
+    print(f"{'envs':>5} {'epsilon':>8} {'select_action':>14} {'select_actions':>15}  (us / env step)")
+    for num_envs in (16, 64, 256):
+        flat = rng.random((num_envs, 52), dtype=np.float32)
+        minimap = (rng.random((num_envs, 4, 64, 64)) < 0.05).astype(np.float32)
+        for epsilon in (0.0, 0.5):
+            def one_by_one():
+                for i in range(num_envs):
+                    trainer.epsilon = epsilon
+                    trainer.select_action(flat[i], minimap[i])
+
+            batched = lambda: trainer.select_actions(flat, minimap, np.full(num_envs, epsilon))
+            print(f"{num_envs:>5} {epsilon:>8.1f} {per_env_us(one_by_one, num_envs):14.1f} "
+                  f"{per_env_us(batched, num_envs):15.1f}")
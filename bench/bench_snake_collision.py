@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+from config import GRID_WIDTH, GRID_HEIGHT
+from core.point import Point
+from core.snack import Snake
+
+DIRECTIONS = {(0, -1): "UP", (0, 1): "DOWN", (-1, 0): "LEFT", (1, 0): "RIGHT"}
+
+
+def hamiltonian_cycle(width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Cycle qui passe par toutes les cases : le serpent peut y tourner sans se mordre."""
+    cycle = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 == 1 else range(1, width)
+        cycle += [(x, y) for x in xs]
+    cycle += [(0, y) for y in range(height - 1, 0, -1)]
+    return cycle
+
+
+def cycle_directions(cycle):
+    return [
+        DIRECTIONS[(nx - x, ny - y)]
+        for (x, y), (nx, ny) in zip(cycle, cycle[1:] + cycle[:1])
+    ]
+
+
+def snake_of_length(length, directions):
+    snake = Snake(start=Point(0, 0), cell_size=1)
+    for i in range(length - 1):
+        snake.grow()
+        snake.set_direction(directions[i % len(directions)])
+        snake.move()
+    # Consomme le dernier grow en attente
+    snake.set_direction(directions[(length - 1) % len(directions)])
+    snake.move()
+    return snake, length
+
+
+def bench(length, directions, num_steps=20000, legacy=False):
+    snake, offset = snake_of_length(length, directions)
+    n = len(directions)
+    start = time.perf_counter()
+    for i in range(offset, offset + num_steps):
+        snake.set_direction(directions[i % n])
+        snake.move()
+        if legacy:
+            collided = snake.head() in list(snake.body)[1:]
+        else:
+            collided = snake.is_collision()
+        assert not collided
+    return (time.perf_counter() - start) / num_steps * 1e6
+
+
+if __name__ == "__main__":
+    directions = cycle_directions(hamiltonian_cycle())
+    print(f"{'length':>8} {'occupancy (us)':>16} {'list scan (us)':>16}")
+    for length in (1, 10, 50, 100, 200, 400):
+        print(f"{length:>8} {bench(length, directions):16.2f} {bench(length, directions, legacy=True):16.2f}")
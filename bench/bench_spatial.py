@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math
+import random
+import time
+from collections import deque
+
+from core.point import Point
+from core.snack import Snake, ACTION
+from core.spatial import SpatialIndex
+from core.target import Target
+
+WIDTH = HEIGHT = 200
+
+
+def make_world(num_targets, seed):
+    """Cibles uniformes sur une arène WIDTH x HEIGHT, indexées comme dans Env."""
+    rng = random.Random(seed)
+    index = SpatialIndex(WIDTH, HEIGHT)
+    targets = []
+    for _ in range(num_targets):
+        target = Target()
+        target.position = Point(rng.randrange(WIDTH), rng.randrange(HEIGHT))
+        index.insert(target)
+        target.spatial_index = index
+        targets.append(target)
+    snake = Snake(start=Point(WIDTH // 2, HEIGHT // 2), cell_size=1)
+    return rng, index, targets, snake
+
+
+def walk(snake, rng):
+    """Marche aléatoire de la tête, sans sortir de l'arène."""
+    head = snake.head()
+    while True:
+        direction = rng.choice(list(ACTION))
+        dx, dy = ACTION[direction]
+        if 0 <= head.x + dx < WIDTH and 0 <= head.y + dy < HEIGHT:
+            break
+    snake.facing_angle = math.atan2(dy, dx)
+    snake.body = deque([Point(head.x + dx, head.y + dy)])
+
+
+def respawn(target, rng):
+    target.position = Point(rng.randrange(WIDTH), rng.randrange(HEIGHT))
+    if target.spatial_index is not None:
+        target.spatial_index.update(target)
+
+
+def step_linear(snake, targets, rng):
+    """Travail d'un pas avant l'index : cibles mangées (Env.step), vision et plus proche cible."""
+    head = snake.head()
+    for target in targets:
+        if target.etype == 'target' and head == target.position:
+            respawn(target, rng)
+    vision = snake.get_vision(targets)
+    nearest = min((head.distance_to(t.position) for t in targets if t.alive), default=math.inf)
+    return vision, nearest
+
+
+def step_indexed(snake, index, rng):
+    head = snake.head()
+    for target in index.at(head.x, head.y, etype='target'):
+        respawn(target, rng)
+    vision = snake.get_vision(index)
+    _, nearest = index.nearest(head.x, head.y, etype='target')
+    return vision, nearest
+
+
+def check_equivalence(num_targets, steps=2000, seed=0):
+    rng, index, targets, snake = make_world(num_targets, seed)
+    # Quelques cibles mortes et des cibles superposées
+    for target in targets[::7]:
+        target.alive = False
+    for target in targets[1::11]:
+        respawn(target, rng)
+        target.position = targets[0].position
+        index.update(target)
+    for _ in range(steps):
+        walk(snake, rng)
+        head = snake.head()
+        x, y = head.x, head.y
+        assert index.in_cone(x, y, snake.range, snake.facing_angle, snake.fov) == snake.get_vision(targets)
+        radius = rng.uniform(0, 30)
+        assert index.within_radius(x, y, radius) == [
+            t for t in targets if t.alive and head.distance_to(t.position) <= radius]
+        alive = [t for t in targets if t.alive]
+        expected = min(alive, key=lambda t: head.distance_to(t.position), default=None)
+        best, distance = index.nearest(x, y)
+        assert best is expected, (x, y, best, expected)
+        assert distance == (head.distance_to(expected.position) if expected else math.inf)
+        assert index.at(x, y) == [t for t in alive if t.position == head]
+        # Déplace une cible au hasard
+        respawn(rng.choice(targets), rng)
+
+
+def bench(num_targets, steps, seed=1):
+    results = {}
+    for name in ("linear", "indexed"):
+        rng, index, targets, snake = make_world(num_targets, seed)
+        start = time.perf_counter()
+        for _ in range(steps):
+            walk(snake, rng)
+            if name == "linear":
+                step_linear(snake, targets, rng)
+            else:
+                step_indexed(snake, index, rng)
+        results[name] = (time.perf_counter() - start) / steps * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    for n in (10, 100, 1000, 10000):
+        check_equivalence(n, steps=300 if n >= 10000 else 2000)
+    print("equivalence: in_cone / within_radius / nearest / at identical to linear scans")
+    print(f"per-step cost on a {WIDTH}x{HEIGHT} arena (eat check + vision + nearest target)")
+    for n in (10, 100, 1000, 10000):
+        steps = max(200, 200000 // n)
+        r = bench(n, steps)
+        print(f"  {n:>6} targets: linear {r['linear']:9.1f} us, indexed {r['indexed']:7.1f} us "
+              f"({r['linear'] / r['indexed']:.1f}x)")
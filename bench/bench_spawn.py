@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+from core.arena import ArenaConfig
+from core.occupancy import OccupancyGrid
+from core.target import Target
+
+
+def filled_grid(arena, fill, seed=0):
+    """Grille dont une fraction `fill` des cases est occupée (cases tirées au hasard)."""
+    rng = random.Random(seed)
+    grid = OccupancyGrid(arena.width, arena.height)
+    cells = rng.sample(range(arena.area), int(fill * arena.area))
+    for i in cells:
+        grid.add(i % arena.width, i // arena.width)
+    return grid
+
+
+def rejection_generate(arena, occupancy):
+    """Ancien Target.generate : tirage uniforme recommencé tant que la case est occupée."""
+    x, y = random.randint(0, arena.width - 1), random.randint(0, arena.height - 1)
+    if not occupancy.is_full():
+        while occupancy.is_occupied(x, y):
+            x, y = random.randint(0, arena.width - 1), random.randint(0, arena.height - 1)
+    return x, y
+
+
+def check_free_list(arena, steps=20000, seed=0):
+    """La liste libre suit exactement les cases à 0 pendant des ajouts/retraits au hasard."""
+    rng = random.Random(seed)
+    grid = OccupancyGrid(arena.width, arena.height)
+    for _ in range(steps):
+        x, y = rng.randrange(arena.width), rng.randrange(arena.height)
+        if grid.is_occupied(x, y) and rng.random() < 0.5:
+            grid.remove(x, y)
+        else:
+            grid.add(x, y)
+    free = sorted(grid.free)
+    assert free == [i for i, c in enumerate(grid.counts) if c == 0]
+    assert all(grid.free_pos[i] == p for p, i in enumerate(grid.free))
+
+
+def check_uniform(arena, fill, draws=200000, seed=0):
+    """Chaque case libre est tirée, aucune case occupée ; écart relatif max aux effectifs attendus."""
+    grid = filled_grid(arena, fill, seed)
+    target = Target(arena=arena, rng=seed)
+    hits = {}
+    for _ in range(draws):
+        p = target.generate(grid)
+        assert not grid.is_occupied(p.x, p.y)
+        hits[(p.x, p.y)] = hits.get((p.x, p.y), 0) + 1
+    assert len(hits) == len(grid.free)
+    expected = draws / len(grid.free)
+    return max(abs(n - expected) for n in hits.values()) / expected
+
+
+def spawn_cost(arena, fill, generate, draws=20000):
+    grid = filled_grid(arena, fill)
+    random.seed(1)
+    start = time.perf_counter()
+    for _ in range(draws):
+        generate(grid)
+    return (time.perf_counter() - start) / draws * 1e6
+
+
+def move_cost(arena, fill, moves=200000):
+    """add + remove d'une case (avancée d'un serpent) : entretien de la liste libre compris."""
+    grid = filled_grid(arena, fill)
+    rng = random.Random(2)
+    cells = [(x, y) for x, y in ((i % arena.width, i // arena.width) for i in rng.sample(range(arena.area), 512))]
+    start = time.perf_counter()
+    for k in range(moves):
+        x, y = cells[k & 511]
+        grid.add(x, y)
+        grid.remove(x, y)
+    return (time.perf_counter() - start) / moves * 1e6
+
+
+if __name__ == "__main__":
+    arena = ArenaConfig(64, 64)
+    check_free_list(arena)
+    print("free list == empty cells : ok")
+    for fill in (0.1, 0.9):
+        print(f"uniform draw at {fill:.0%} fill: max deviation {check_uniform(ArenaConfig(16, 16), fill):.1%}")
+
+    for arena in (ArenaConfig(64, 64), ArenaConfig(256, 256)):
+        target = Target(arena=arena, rng=0)
+        print(f"respawn cost (us) on a {arena.width}x{arena.height} arena")
+        print(f"{'fill':>6} {'rejection':>10} {'free list':>10} {'add+remove':>11}")
+        for fill in (0.1, 0.5, 0.9, 0.99):
+            rejection = spawn_cost(arena, fill, lambda grid: rejection_generate(arena, grid))
+            free_list = spawn_cost(arena, fill, target.generate)
+            print(f"{fill:>6.0%} {rejection:10.2f} {free_list:10.2f} {move_cost(arena, fill):11.2f}")
@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cProfile
+import pstats
+import random
+import time
+
+from core.env import Env
+from core.env_wrapper import ShooterEnvWrapper
+
+
+def run(num_steps, seed=0):
+    random.seed(seed)
+    env = Env(rng=seed)
+    wrapper = ShooterEnvWrapper(env, env.snake)
+    wrapper.reset()
+    for _ in range(num_steps):
+        wrapper.agent.external_action = random.choice(wrapper.agent.action_space)
+        env.step()
+        wrapper.get_state()
+        if env.done:
+            env = Env(rng=env.rng)
+            wrapper = ShooterEnvWrapper(env, env.snake)
+            wrapper.reset()
+
+
+def profile(num_steps=2000):
+    profiler = cProfile.Profile()
+    profiler.runcall(run, num_steps)
+    stats = pstats.Stats(profiler).stats
+
+    total_calls = sum(ncalls for _, ncalls, _, _, _ in stats.values())
+    point_allocs = sum(
+        ncalls for (filename, _, name), (_, ncalls, _, _, _) in stats.items()
+        if filename.endswith("point.py") and name == "__init__"
+    )
+    # Chaque appel numpy sur des scalaires alloue au moins un tableau temporaire
+    numpy_calls = sum(
+        ncalls for (filename, _, name), (_, ncalls, _, _, _) in stats.items()
+        if "numpy" in filename or "numpy" in name
+    )
+    return total_calls / num_steps, point_allocs / num_steps, numpy_calls / num_steps
+
+
+if __name__ == "__main__":
+    num_steps = 5000
+    start = time.perf_counter()
+    run(num_steps)
+    per_step = (time.perf_counter() - start) / num_steps * 1e6
+
+    calls, points, numpy_calls = profile()
+    print(f"Env.step + get_state : {per_step:8.1f} us/step")
+    print(f"function calls       : {calls:8.1f} /step")
+    print(f"Point allocations    : {points:8.1f} /step")
+    print(f"numpy calls          : {numpy_calls:8.1f} /step")
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import numpy as np
+
+from core.env import Env
+from core.vec_env import VecEnv
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+
+def check_equivalence(seed=0, num_steps=5000):
+    """Compare pas à pas VecEnv(1) avec la suite d'Env partageant le flux de la graine `seed`."""
+    action_rng = np.random.default_rng(seed)
+    actions = action_rng.integers(0, 4, size=num_steps)
+
+    env = Env(rng=seed)
+    vec = VecEnv(1, seeds=[seed])
+
+    for t, a in enumerate(actions.tolist()):
+        env.snake.external_action = ACTIONS[a]
+        env.step()
+        ate, done = vec.step(np.array([a]))
+
+        body = [(p.x, p.y) for p in env.snake.body]
+        targets = [(tg.position.x, tg.position.y) for tg in env.targets]
+        assert ate[0] == env.appelSignal, f"step {t}: appelSignal"
+        assert done[0] == env.done, f"step {t}: done"
+        if env.done:
+            env = Env(rng=env.rng)
+            body = [(p.x, p.y) for p in env.snake.body]
+            targets = [(tg.position.x, tg.position.y) for tg in env.targets]
+        assert vec.body(0) == body, f"step {t}: body"
+        assert vec.targets(0) == targets, f"step {t}: targets"
+
+
+def bench_env(num_steps=20000):
+    env = Env()
+    actions = np.random.randint(0, 4, size=num_steps).tolist()
+    start = time.perf_counter()
+    for a in actions:
+        env.snake.external_action = ACTIONS[a]
+        env.step()
+        if env.done:
+            env = Env(rng=env.rng)
+    return num_steps / (time.perf_counter() - start)
+
+
+def bench_vec_env(num_envs, num_steps=200):
+    vec = VecEnv(num_envs, seeds=range(num_envs))
+    actions = np.random.randint(0, 4, size=(num_steps, num_envs))
+    start = time.perf_counter()
+    for a in actions:
+        vec.step(a)
+    return num_envs * num_steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    print("VecEnv(1) == Env : ok")
+
+    print(f"{'Env':>12} : {bench_env():12.0f} steps/s")
+    for n in (1, 64, 1024, 8192):
+        print(f"{f'VecEnv({n})':>12} : {bench_vec_env(n):12.0f} steps/s")
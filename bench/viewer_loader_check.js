@@ -0,0 +1,51 @@
+// Lancé par bench_chunked_episode.py : exerce viewer/episode_loader.js contre un serveur HTTP local.
+// Usage : node viewer_loader_check.js <url du dossier> <frames à renvoyer, séparées par des virgules>
+const { EpisodeLoader } = require("../viewer/episode_loader.js");
+
+async function main() {
+    const [baseUrl, sampleArg] = process.argv.slice(2);
+    const samples = sampleArg.split(",").map(Number);
+    const result = {};
+
+    let t0 = performance.now();
+    const episode = await EpisodeLoader.open(baseUrl, { maxChunks: 8, prefetchAhead: 2 });
+    await episode.ensure(0);
+    result.first_frame_ms = performance.now() - t0;
+    result.num_frames = episode.length;
+
+    // Déplacements directs (blocs froids)
+    const seeks = [];
+    result.frames = [];
+    for (const frame of samples) {
+        t0 = performance.now();
+        await episode.ensure(frame);
+        seeks.push(performance.now() - t0);
+        result.frames.push(episode.getFrame(frame));
+    }
+    result.seek_ms_max = Math.max(...seeks);
+    result.seek_ms_mean = seeks.reduce((a, b) => a + b, 0) / seeks.length;
+
+    // Lecture continue : une frame toutes les 2 ms, on compte les frames pas encore chargées
+    let stalls = 0;
+    const start = samples[0];
+    await episode.ensure(start);
+    for (let frame = start; frame < Math.min(start + 5000, episode.length); frame++) {
+        if (!episode.getFrame(frame)) {
+            stalls++;
+            await episode.ensure(frame);
+        } else {
+            episode.ensure(frame);
+        }
+        await new Promise(resolve => setTimeout(resolve, 2));
+    }
+    result.playback_stalls = stalls;
+    result.chunks_in_memory = episode.chunks.size;
+    result.chunks_fetched = episode.fetchCount;
+
+    process.stdout.write(JSON.stringify(result));
+}
+
+main().catch(error => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,64 @@
+import math
+
+from config import CELL_SIZE, GRID_WIDTH, GRID_HEIGHT
+
+
+class ArenaConfig:
+    """Dimensions d'une arène, passées à Env, Snake, Target, au wrapper et à la minimap.
+
+    Remplace les constantes de `config.py` (qui restent les valeurs par défaut) :
+    plusieurs arènes de tailles différentes peuvent tourner dans le même
+    processus. Les structures dimensionnées par l'arène (grille d'occupation,
+    index spatial, caches de murs et tables d'observation) sont allouées par
+    arène ; les caches partagés sont indexés par `key`.
+    """
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, cell_size=CELL_SIZE, num_targets=10, bucket_size=None):
+        if width < 1 or height < 1:
+            raise ValueError(f"arena must be at least 1x1, got {width}x{height}")
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.num_targets = num_targets
+        # Taille des seaux de SpatialIndex (None : choisie selon la densité, voir spatial_bucket_size)
+        self.bucket_size = bucket_size
+
+    @classmethod
+    def parse(cls, text, **kwargs):
+        """ArenaConfig depuis "LARGEURxHAUTEUR" (p. ex. "200x200")."""
+        width, _, height = text.lower().partition("x")
+        return cls(int(width), int(height or width), **kwargs)
+
+    @property
+    def key(self):
+        """Ce dont dépend la géométrie (murs, normalisations) : clé des caches partagés."""
+        return (self.width, self.height, self.cell_size)
+
+    @property
+    def area(self):
+        return self.width * self.height
+
+    def spatial_bucket_size(self, num_entities):
+        """Côté des seaux de l'index spatial : environ deux entités par seau."""
+        if self.bucket_size:
+            return self.bucket_size
+        return min(32, max(2, math.isqrt(2 * self.area // max(num_entities, 1))))
+
+    def center(self):
+        return self.width // 2, self.height // 2
+
+    def contains(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def __eq__(self, other):
+        return (isinstance(other, ArenaConfig) and self.key == other.key
+                and self.num_targets == other.num_targets and self.bucket_size == other.bucket_size)
+
+    def __hash__(self):
+        return hash((self.key, self.num_targets, self.bucket_size))
+
+    def __repr__(self):
+        return f"ArenaConfig({self.width}x{self.height}, cell_size={self.cell_size}, num_targets={self.num_targets})"
+
+
+DEFAULT_ARENA = ArenaConfig()
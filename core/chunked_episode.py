@@ -0,0 +1,161 @@
+import json
+import os
+
+FORMAT = "snake-chunked"
+VERSION = 1
+INDEX_FILE = "index.json"
+
+
+def chunk_file(chunk):
+    return f"chunk_{chunk:05d}.json"
+
+
+def _frame_delta(prev, frame):
+    """Différence entre deux frames consécutives, ou None si elle n'est pas exprimable.
+
+    Un delta donne la nouvelle tête et la longueur du corps (le reste du corps
+    est le début du corps précédent), l'action, l'angle s'il change, les cibles
+    qui ont bougé et `done` seulement quand il est vrai.
+    """
+    snake, prev_snake = frame["snake"], prev["snake"]
+    length = len(snake)
+    if not snake or set(snake[0]) != {"x", "y"} or length > len(prev_snake) + 1:
+        return None
+    if snake[1:] != prev_snake[:length - 1]:
+        return None
+    facing, prev_facing = frame["facing"], prev["facing"]
+    if facing["range"] != prev_facing["range"] or facing["fov"] != prev_facing["fov"]:
+        return None
+    targets, prev_targets = frame["targets"], prev["targets"]
+    if len(targets) != len(prev_targets) or frame["objects"] != prev["objects"]:
+        return None
+    if any(set(t) != {"x", "y"} for t in targets):
+        return None
+
+    delta = {"h": [snake[0]["x"], snake[0]["y"]], "l": length, "a": frame["action"]}
+    if facing["facing_angle"] != prev_facing["facing_angle"]:
+        delta["f"] = facing["facing_angle"]
+    moved = [[i, t["x"], t["y"]] for i, (t, p) in enumerate(zip(targets, prev_targets)) if t != p]
+    if moved:
+        delta["t"] = moved
+    if frame["done"]:
+        delta["d"] = True
+    return delta
+
+
+def _apply_delta(prev, delta):
+    if "k" in delta:
+        return delta["k"]
+    x, y = delta["h"]
+    facing = dict(prev["facing"])
+    if "f" in delta:
+        facing["facing_angle"] = delta["f"]
+    targets = [dict(t) for t in prev["targets"]]
+    for i, tx, ty in delta.get("t", ()):
+        targets[i] = {"x": tx, "y": ty}
+    return {
+        "snake": [{"x": x, "y": y}] + [dict(p) for p in prev["snake"][:delta["l"] - 1]],
+        "facing": facing,
+        "targets": targets,
+        "objects": [dict(obj) for obj in prev["objects"]],
+        "done": delta.get("d", False),
+        "action": delta["a"],
+    }
+
+
+class ChunkedEpisodeWriter:
+    """Écrit un épisode en blocs de `chunk_size` frames dans un dossier.
+
+    `index.json` contient la table des blocs (première frame, nombre de frames,
+    fichier) ; chaque bloc commence par une keyframe complète suivie de deltas,
+    il se décode donc seul. Les frames arrivent une par une : l'épisode n'est
+    jamais entièrement en mémoire.
+    """
+
+    def __init__(self, directory, chunk_size=1000):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.num_frames = 0
+        self._keyframe = None
+        self._deltas = []
+        self._prev = None
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, frame):
+        if self._keyframe is None:
+            self._keyframe = frame
+        else:
+            delta = _frame_delta(self._prev, frame)
+            self._deltas.append({"k": frame} if delta is None else delta)
+        self._prev = frame
+        self.num_frames += 1
+        if len(self._deltas) + 1 >= self.chunk_size:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        if self._keyframe is None:
+            return
+        chunk = len(self.chunks)
+        count = len(self._deltas) + 1
+        start = self.num_frames - count
+        with open(os.path.join(self.directory, chunk_file(chunk)), "w") as f:
+            json.dump({"start": start, "keyframe": self._keyframe, "deltas": self._deltas}, f,
+                      separators=(",", ":"))
+        self.chunks.append({"start": start, "count": count, "file": chunk_file(chunk)})
+        self._keyframe = None
+        self._deltas = []
+
+    def close(self):
+        self._flush_chunk()
+        with open(os.path.join(self.directory, INDEX_FILE), "w") as f:
+            json.dump({
+                "format": FORMAT,
+                "version": VERSION,
+                "num_frames": self.num_frames,
+                "chunk_size": self.chunk_size,
+                "chunks": self.chunks,
+            }, f, indent=1)
+
+
+def write_chunked(steps, directory, chunk_size=1000):
+    """Écrit une liste (ou un itérable, p. ex. `iter_steps`) de frames au format découpé."""
+    writer = ChunkedEpisodeWriter(directory, chunk_size)
+    for frame in steps:
+        writer.append(frame)
+    writer.close()
+    return writer.num_frames
+
+
+def load_index(directory):
+    with open(os.path.join(directory, INDEX_FILE)) as f:
+        index = json.load(f)
+    if index.get("format") != FORMAT:
+        raise ValueError(f"{directory} is not a chunked episode")
+    return index
+
+
+def decode_chunk(chunk):
+    frames = [chunk["keyframe"]]
+    for delta in chunk["deltas"]:
+        frames.append(_apply_delta(frames[-1], delta))
+    return frames
+
+
+def read_chunk(directory, chunk):
+    with open(os.path.join(directory, chunk_file(chunk))) as f:
+        return decode_chunk(json.load(f))
+
+
+def read_frames(directory, start=0, stop=None):
+    """Frames [start, stop) en ne lisant que les blocs nécessaires."""
+    index = load_index(directory)
+    stop = index["num_frames"] if stop is None else min(stop, index["num_frames"])
+    frames = []
+    for i, chunk in enumerate(index["chunks"]):
+        first, count = chunk["start"], chunk["count"]
+        if first + count <= start or first >= stop:
+            continue
+        decoded = read_chunk(directory, i)
+        frames.extend(decoded[max(start - first, 0):stop - first])
+    return frames
@@ -0,0 +1,185 @@
+import json
+import os
+
+import numpy as np
+
+from core.observation import FLAT_DIM, MINIMAP_SHAPE
+
+INDEX_FILE = "index.json"
+
+
+def _columns(flat_dim, minimap_shape):
+    # nom -> (dtype, forme d'une ligne) ; une ligne par observation
+    return {
+        "flat": (np.float32, (flat_dim,)),
+        "minimap": (np.uint8, tuple(minimap_shape)),
+        "action": (np.int8, ()),
+        "reward": (np.float32, ()),
+        "done": (np.bool_, ()),
+    }
+
+
+class MinimapDatasetWriter:
+    """Journal d'observations sur disque, dans des tableaux memmap préalloués.
+
+    Une ligne par observation : (flat, minimap, action, reward, done), où
+    action/reward/done sont ceux du pas joué depuis cette observation. La
+    transition t a donc pour état suivant la ligne t + 1. En fin d'épisode,
+    l'observation terminale est ajoutée avec `action = -1` : elle sert d'état
+    suivant et n'est jamais échantillonnée comme transition.
+    Les fichiers doublent de taille quand ils sont pleins ; `index.json`
+    garde le nombre de lignes valides.
+    """
+
+    def __init__(self, directory, flat_dim=FLAT_DIM, minimap_shape=MINIMAP_SHAPE, initial_capacity=65536):
+        self.directory = directory
+        self.columns = _columns(flat_dim, minimap_shape)
+        self.flat_dim = flat_dim
+        self.minimap_shape = tuple(minimap_shape)
+        os.makedirs(directory, exist_ok=True)
+
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            # Reprise d'un journal existant : on ajoute à la suite
+            with open(index_path) as f:
+                index = json.load(f)
+            if index["flat_dim"] != flat_dim or tuple(index["minimap_shape"]) != self.minimap_shape:
+                raise ValueError(f"{directory} holds a dataset with other shapes")
+            self.size = index["num_rows"]
+            self.episodes = index["episodes"]
+            self.capacity = max(index["capacity"], 1)
+        else:
+            self.size = 0
+            self.episodes = 0
+            self.capacity = initial_capacity
+        self.arrays = {}
+        self._open(self.capacity)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.dat")
+
+    def _open(self, capacity):
+        for name, (dtype, shape) in self.columns.items():
+            path = self._path(name)
+            nbytes = capacity * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            # Agrandit le fichier sans le réécrire (les nouveaux octets sont des zéros)
+            with open(path, "ab") as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            self.arrays[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,) + shape)
+        self.capacity = capacity
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        self._open(capacity)
+
+    def append(self, flat_state, minimap, action, reward, done):
+        if self.size >= self.capacity:
+            self._grow(self.size + 1)
+        row = self.size
+        self.arrays["flat"][row] = flat_state
+        self.arrays["minimap"][row] = minimap
+        self.arrays["action"][row] = action
+        self.arrays["reward"][row] = reward
+        self.arrays["done"][row] = done
+        self.size += 1
+
+    def end_episode(self, flat_state, minimap):
+        """Ajoute l'observation terminale (état suivant de la dernière transition)."""
+        self.append(flat_state, minimap, -1, 0.0, True)
+        self.episodes += 1
+
+    def flush(self):
+        for array in self.arrays.values():
+            array.flush()
+        with open(os.path.join(self.directory, INDEX_FILE), "w") as f:
+            json.dump({
+                "version": 1,
+                "num_rows": self.size,
+                "capacity": self.capacity,
+                "episodes": self.episodes,
+                "flat_dim": self.flat_dim,
+                "minimap_shape": list(self.minimap_shape),
+                "columns": {name: np.dtype(dtype).str for name, (dtype, _) in self.columns.items()},
+            }, f, indent=4)
+
+    def close(self):
+        self.flush()
+        self.arrays = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MinimapDataset:
+    """Lecture d'un journal écrit par `MinimapDatasetWriter`.
+
+    `flat`, `minimap`, `action`, `reward` et `done` sont des vues memmap en
+    lecture seule (aucune copie) limitées aux lignes valides. `transitions`
+    donne les lignes qui ont un état suivant (action >= 0).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.num_rows = self.index["num_rows"]
+        columns = _columns(self.index["flat_dim"], self.index["minimap_shape"])
+        for name, (dtype, shape) in columns.items():
+            if self.num_rows:
+                array = np.memmap(os.path.join(directory, f"{name}.dat"), dtype=dtype, mode="r",
+                                  shape=(self.num_rows,) + shape)
+            else:
+                array = np.zeros((0,) + shape, dtype=dtype)
+            setattr(self, name, array)
+        # La dernière ligne n'a pas d'état suivant même si l'épisode n'a pas été fermé
+        self.transitions = np.flatnonzero(self.action[:-1] >= 0)
+
+    def __len__(self):
+        return len(self.transitions)
+
+    def _allocate(self, batch_size):
+        flat_dim = self.flat.shape[1:]
+        minimap_shape = self.minimap.shape[1:]
+        return (
+            np.empty((batch_size,) + flat_dim, dtype=np.float32),
+            np.empty((batch_size,) + minimap_shape, dtype=np.float32),
+            np.empty((batch_size, 1), dtype=np.int64),
+            np.empty((batch_size, 1), dtype=np.float32),
+            np.empty((batch_size,) + flat_dim, dtype=np.float32),
+            np.empty((batch_size,) + minimap_shape, dtype=np.float32),
+            np.empty((batch_size, 1), dtype=np.float32),
+        )
+
+    def batches(self, batch_size, shuffle=True, seed=None, drop_last=True):
+        """Mini-batchs (flat, minimap, action, reward, next_flat, next_minimap, done).
+
+        Mêmes formes et dtypes que `ReplayBuffer.sample`. Les tableaux renvoyés
+        sont réutilisés d'un batch à l'autre : les copier pour les garder.
+        Les indices d'un batch sont triés pour lire le disque dans l'ordre.
+        """
+        order = self.transitions
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(order)
+        buffers = self._allocate(batch_size)
+        stop = len(order) - batch_size + 1 if drop_last else len(order)
+        for start in range(0, max(stop, 0), batch_size):
+            rows = np.sort(order[start:start + batch_size])
+            n = len(rows)
+            flat, minimap, action, reward, next_flat, next_minimap, done = (b[:n] for b in buffers)
+            np.take(self.flat, rows, axis=0, out=flat)
+            minimap[...] = self.minimap[rows]
+            action[:, 0] = self.action[rows]
+            reward[:, 0] = self.reward[rows]
+            np.take(self.flat, rows + 1, axis=0, out=next_flat)
+            next_minimap[...] = self.minimap[rows + 1]
+            done[:, 0] = self.done[rows]
+            yield flat, minimap, action, reward, next_flat, next_minimap, done
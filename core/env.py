@@ -1,80 +1,185 @@
 import json
+import math
 import os
 
 import numpy as np
 from core.snack import Snake
 from core.target import Target
 from core.point import Point
-from config import GRID_WIDTH, GRID_HEIGHT
-from core.utils import extract_minimap_tensor
+from core.arena import DEFAULT_ARENA
+from core.occupancy import OccupancyGrid
 from core.rl_snacke.RLSnake import RLSnacke
+from core.recorder import MemoryRecorder
+from core.spatial import SpatialIndex
+from core.seeding import as_stream
 
 class Env:
-    def __init__(self):
-        self.snake = RLSnacke(start=Point(GRID_WIDTH//2, GRID_HEIGHT//2), cell_size=1)
-        # self.snake = Snake(start=Point(GRID_WIDTH//2, GRID_HEIGHT//2), cell_size=1)
+    def __init__(self, record=True, recorder=None, num_targets=None, arena=None, num_snakes=1, rng=None):
+        """`recorder` : où vont les pas enregistrés (par défaut `MemoryRecorder`,
+        ou un `StreamRecorder` pour écrire au fil de l'eau). `record=False`
+        désactive complètement l'enregistrement.
+        `arena` (ArenaConfig) fixe la taille de l'arène et le nombre de cibles
+        (`num_targets` le remplace s'il est donné).
+        Cibles et objets sont indexés dans `self.spatial` (SpatialIndex).
+        `num_snakes` serpents partagent l'arène, les cibles et une grille
+        d'occupation (collisions entre serpents) ; `self.snake` est le premier,
+        c'est lui que suit l'enregistrement.
+        `rng` (graine, SeedSequence, Generator ou RandomStream) : flux de tous
+        les tirages de l'Env. Passer le `rng` d'un Env terminé au suivant
+        continue le même flux, comme VecEnv d'un épisode à l'autre."""
+        self.arena = arena = arena or DEFAULT_ARENA
+        self.rng = as_stream(rng)
+        if num_targets is None:
+            num_targets = arena.num_targets
+        self.occupancy = OccupancyGrid(arena.width, arena.height)
+        self.snakes = [
+            RLSnacke(start=Point(x, y), cell_size=1, arena=arena, occupancy=self.occupancy, rng=self.rng)
+            for x, y in self._start_positions(num_snakes)
+        ]
+        self.snake = self.snakes[0]
+        # self.snake = Snake(start=Point(start_x, start_y), cell_size=1, arena=arena)
         self.done = False
-        self.steps = []
-        self.targets = [Target() for _ in range(10)]
+        # Les cibles apparaissent sur des cases libres (hors des corps des serpents)
+        self.targets = [Target(arena=arena, occupancy=self.occupancy, rng=self.rng) for _ in range(num_targets)]
+        # Incrémenté à chaque réapparition : permet de ne recalculer que ce qui dépend des cibles
+        self.targets_version = 0
+        self.last_respawned = []  # indices des cibles réapparues au dernier changement de version
+        self._positions = None
+        self._positions_version = None
         self.objects = []
+        self.spatial = SpatialIndex(arena.width, arena.height, arena.spatial_bucket_size(num_targets))
+        self._target_slots = {}
+        for i, target in enumerate(self.targets):
+            self._add_to_index(target)
+            self._target_slots[target] = i
+
+        if recorder is None and record:
+            recorder = MemoryRecorder()
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.start(self)
         
         self.step_count = 0
-        self.minimap_save_path = "data/minimap_logs"
         
         self.appelSignal = False
+        self.ate = [False] * num_snakes  # appelSignal par serpent
+
+    def _start_positions(self, num_snakes):
+        """Un seul serpent au centre, sinon un quadrillage régulier de l'arène."""
+        arena = self.arena
+        if num_snakes == 1:
+            return [arena.center()]
+        cols = math.ceil(math.sqrt(num_snakes))
+        rows = math.ceil(num_snakes / cols)
+        if cols > arena.width or rows > arena.height:
+            raise ValueError(f"{num_snakes} snakes do not fit in a {arena.width}x{arena.height} arena")
+        return [((2 * (k % cols) + 1) * arena.width // (2 * cols), (2 * (k // cols) + 1) * arena.height // (2 * rows))
+                for k in range(num_snakes)]
 
     def step(self, direction=None):
+        """Avance tous les serpents vivants d'un pas (action : `external_action` ou `decide_action`).
+
+        Les déplacements sont simultanés : les collisions sont testées une fois
+        tous les serpents déplacés, puis les serpents survivants mangent.
+        """
         self.appelSignal = False
         
         if self.done:
             return
         
-        if hasattr(self.snake, "external_action") and self.snake.external_action is not None:
-            action = self.snake.external_action
-            self.snake.external_action = None
-        else:
-            action = self.snake.decide_action()
-
-        self.snake.set_direction(action)
-        self.snake.move()
-        
-        # minimap = extract_minimap_tensor(self.snake, self, grid_size=64)
-        # # === Sauvegarde du minimap ===
-        # os.makedirs(self.minimap_save_path, exist_ok=True)
-        # filename = f"step_{self.step_count:05d}.npy"
-        # filepath = os.path.join(self.minimap_save_path, filename)
-        # np.save(filepath, minimap)
-
-        if self.snake.is_collision() or self._is_out_of_bounds():
-            self.snake.alive = False
-            self.done = True
-        else:
-            for target in self.targets:
-                if target.etype =='target' and self.snake.head() == target.position:
+        recorded = self.snake.alive
+        moving = []
+        action = None
+        for snake in self.snakes:
+            if not snake.alive:
+                continue
+            if hasattr(snake, "external_action") and snake.external_action is not None:
+                snake_action = snake.external_action
+                snake.external_action = None
+            else:
+                snake_action = snake.decide_action()
+            if snake is self.snake:
+                action = snake_action
+
+            snake.set_direction(snake_action)
+            snake.move()
+            moving.append(snake)
+
+        # Tête sur une case occupée par un corps (le sien ou un autre) ou hors de l'arène
+        dead = [snake for snake in moving if snake.is_collision() or self._is_out_of_bounds(snake)]
+        for snake in dead:
+            self.kill(snake)
+
+        respawned = []
+        for k, snake in enumerate(self.snakes):
+            self.ate[k] = False
+            if not snake.alive:
+                continue
+            head = snake.head()
+            # Seules les cibles de la case de la tête peuvent être mangées
+            for target in self.spatial.at(head.x, head.y, etype='target'):
+                if target in self._target_slots:
                     self.appelSignal = True
-                    self.snake.grow()
-                    target.respawn()
+                    self.ate[k] = True
+                    snake.grow()
+                    target.respawn(self.occupancy)
+                    respawned.append(self._target_slots[target])
                     
                 
 
-        self._record_state(action)
+        if respawned:
+            self.targets_version += 1
+            self.last_respawned = respawned
+        # L'enregistrement suit self.snake jusqu'à sa mort
+        if self.recorder is not None and recorded:
+            self.recorder.record(self, action, respawned)
         self.step_count += 1
 
-    def _is_out_of_bounds(self):
-        head = self.snake.head()
-        return not (0 <= head.x < GRID_WIDTH and 0 <= head.y < GRID_HEIGHT)
-
-    def _record_state(self,action):
-        self.steps.append({
-            "snake": self.snake.to_dict(),
-            "facing": self.snake.facing(),
-            "targets": [target.to_dict() for target in self.targets],
-            "objects": [obj.to_dict() for obj in self.objects],
-            "done": self.done,
-            "action":action,
-        })
-
-    
+    def target_positions(self):
+        """Positions (T, 2) int64 des cibles, dans l'ordre de `self.targets`.
+
+        Relues seulement quand `targets_version` change : un seul tableau par
+        pas pour tous les agents (minimaps, distance à la cible la plus proche).
+        """
+        if self._positions_version != self.targets_version:
+            self._positions = np.array([(t.position.x, t.position.y) for t in self.targets if t.alive],
+                                       dtype=np.int64).reshape(-1, 2)
+            self._positions_version = self.targets_version
+        return self._positions
+
+    def kill(self, snake):
+        """Met fin au serpent : son corps quitte la grille d'occupation."""
+        if not snake.alive:
+            return
+        snake.alive = False
+        for part in snake.body:
+            self.occupancy.remove(part.x, part.y)
+        self.done = not any(s.alive for s in self.snakes)
+
+    def _add_to_index(self, entity):
+        self.spatial.insert(entity)
+        entity.spatial_index = self.spatial
+
+    def add_object(self, obj):
+        """Ajoute un objet (position, alive, etype) à l'arène et à l'index spatial."""
+        self.objects.append(obj)
+        self._add_to_index(obj)
+
+    def _is_out_of_bounds(self, snake=None):
+        head = (snake or self.snake).head()
+        return not self.arena.contains(head.x, head.y)
+
+    @property
+    def steps(self):
+        if self.recorder is None:
+            return []
+        return self.recorder.steps
+
+    def close(self):
+        """Termine l'enregistrement (vide le dernier bloc d'un `StreamRecorder`)."""
+        if self.recorder is not None:
+            self.recorder.close()
+
     def export(self, path="../data/episode_001.json"):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, 'w') as f:
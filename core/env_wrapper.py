@@ -1,26 +1,42 @@
 # core/rl/env_wrapper.py
 import numpy as np
 
-from config import GRID_HEIGHT, GRID_WIDTH
 from core.env import Env
+from core.observation import MAX_TARGETS, MINIMAP_SIZE, ObservationBuilder
 from core.point import Point
-from core.utils import danger_position, extract_minimap_tensor
-MAX_TARGETS = 5
+from core.reward import RewardKernel
+from core.utils import danger_position, extract_minimap_batch, extract_minimap_tensor
 
 
 class ShooterEnvWrapper:
-    def __init__(self, env: Env, agent):
+    def __init__(self, env: Env, agent, dataset=None):
         self.env = env
         self.agent = agent
+        # MinimapDatasetWriter optionnel : chaque transition y est journalisée
+        self.dataset = dataset
+        self._state = None
+        self.observation = ObservationBuilder()
+        self.rewards = RewardKernel(env, [agent])
         
 
     def reset(self):
-        self.agent = self.env.snake  # à adapter si plusieurs agents
-        return self.get_state()
+        self.agent = self.env.snake  # plusieurs agents : MultiAgentEnvWrapper
+        self.rewards = RewardKernel(self.env, [self.agent])
+        self._state = self.get_state()
+        return self._state
 
     
 
     def get_state(self):
+        flat_state = self.observation.build(self.agent, self.env)
+
+        # Minimap tensor (vue partielle 2D)
+        minimap_tensor = extract_minimap_tensor(self.agent, self.env, grid_size=MINIMAP_SIZE)
+
+        return flat_state, minimap_tensor
+
+    def flat_state_reference(self):
+        """Construction d'origine de l'état plat, gardée pour vérifier ObservationBuilder."""
         head = self.agent.head()
         facing = self.agent.facing()
 
@@ -29,7 +45,7 @@ class ShooterEnvWrapper:
         # Trier les cibles selon leur distance à l'agent
         visible_objects = sorted(
             visible_objects, 
-            key=lambda t: self.agent.head().distance_to(t.position)
+            key=lambda t: head.distance_to(t.position)
         )
         
         # Pour chaque cible (jusqu'à MAX_TARGETS), ajouter un vecteur directionnel 8 directions
@@ -56,15 +72,16 @@ class ShooterEnvWrapper:
         else:
             fist_body = Point(x=0,y=0)
             
-        up,down,right,left = danger_position(head)
+        arena = self.env.arena
+        up,down,right,left = danger_position(head, arena)
             
         self_stat = [
-            head.x / GRID_WIDTH,
-            head.y / GRID_HEIGHT,
+            head.x / arena.width,
+            head.y / arena.height,
             head.x - fist_body.x,
             head.y - fist_body.y,
             facing["facing_angle"],           # devrait être normalisé entre -π et π
-            facing["range"] / GRID_WIDTH,     # range normalisé
+            facing["range"] / arena.width,    # range normalisé
             facing["fov"] / (2 * np.pi),       # normaliser le fov entre 0 et 1
             
             
@@ -72,22 +89,11 @@ class ShooterEnvWrapper:
         ]
 
         # État tabulaire concaténé
-        flat_state = np.array(self_stat + rel_vector, dtype=np.float32)
-
-        # Minimap tensor (vue partielle 2D)
-        minimap_tensor = extract_minimap_tensor(self.agent, self.env, grid_size=64)
-
-        return flat_state, minimap_tensor
+        return np.array(self_stat + rel_vector, dtype=np.float32)
 
     
     def _nearest_target_distance(self):
-        head = self.agent.head()
-        min_dist = float('inf')
-        for target in self.env.targets:
-            if target.alive:
-                dist = np.linalg.norm([head.x - target.position.x, head.y - target.position.y])
-                min_dist = min(min_dist, dist)
-        return min_dist
+        return self.rewards.nearest_distance(0)
 
     # def step(self, action_idx):
     #     action = self.agent.action_space[action_idx]
@@ -137,9 +143,7 @@ class ShooterEnvWrapper:
         self.agent.external_action = action
 
         # États avant action
-        prev_distance = self._nearest_target_distance()
-        prev_length = len(self.agent.body)
-        prev_head_pos = self.agent.head()
+        before = self.rewards.begin()
 
         # Exécution de l'action dans l'environnement
         self.env.step()
@@ -147,75 +151,184 @@ class ShooterEnvWrapper:
         # Nouvel état
         next_flat, next_minimap = self.get_state()
 
-        reward = 0.0
-        current_length = len(self.agent.body)
-        done = False
-
-        # Paramètres durée de vie dynamique
-        BASE_LIFESPAN = 150
-        LIFESPAN_PER_SEGMENT = 30
-        HUNGER_THRESHOLD = 0.7
-
-        allowed_steps = BASE_LIFESPAN + (current_length * LIFESPAN_PER_SEGMENT)
-        time_ratio = self.env.step_count / allowed_steps
-
-        # ===== Récompenses =====
+        reward, done = self.rewards.finish_one(before)
 
-        # 1. Récompense pour survie (plus petit quand serpent plus grand)
-        survival_reward = 0.5 / (current_length ** 0.5) if current_length > 0 else 0.0
-        reward += survival_reward
+        if self.dataset is not None:
+            self._log_transition(action_idx, reward, done, next_flat, next_minimap)
 
-        # 2. Bonus croissance (quand le serpent grandit)
-        if current_length > prev_length:
-            growth_bonus = 15.0 + (5.0 * current_length)
-            reward += growth_bonus
+        return next_flat, next_minimap, reward, done
 
-        # 3. Pénalité si serpent reste trop longtemps sans manger (faim)
-        if time_ratio > HUNGER_THRESHOLD:
-            hunger_penalty = (time_ratio - HUNGER_THRESHOLD) * 2.0
-            reward -= hunger_penalty
+    def _log_transition(self, action_idx, reward, done, next_flat, next_minimap):
+        self.dataset.append(self._state[0], self._state[1], action_idx, reward, done)
+        if done:
+            self.dataset.end_episode(next_flat, next_minimap)
+            self._state = None
+        else:
+            self._state = (next_flat, next_minimap)
 
-        # 4. Récompense pour se rapprocher des cibles
-        new_distance = self._nearest_target_distance()
-        distance_diff = prev_distance - new_distance
-        reward += np.clip(distance_diff * 0.3, -0.15, 0.3)
+    def close_episode(self):
+        """Termine l'épisode dans le dataset quand la boucle l'arrête avant `done`."""
+        if self.dataset is not None and self._state is not None:
+            self.dataset.end_episode(*self._state)
+            self._state = None
 
-        # 5. Bonus pour avoir mangé une cible (appelSignal)
-        if self.env.appelSignal:
-            reward += 15.0
 
-        # ===== Fin de partie =====
-        time_expired = time_ratio >= 1.0
-        done = not self.agent.alive or time_expired
+class MultiEnvWrapper:
+    """N ShooterEnvWrapper (un Env et un serpent chacun) avancés ensemble.
 
-        if time_expired:
-            overtime = self.env.step_count - allowed_steps
-            reward -= min(5.0 + (overtime * 0.01), 10.0)
-            self.agent.alive = False
-            self.env.done = True
+    Les états restent construits Env par Env (ObservationBuilder et minimap de
+    chaque ShooterEnvWrapper) ; les récompenses des N agents sont calculées
+    en une passe par un seul RewardKernel sur les N paires (Env, agent), avec
+    le même résultat que ShooterEnvWrapper.step.
+    """
 
-        if not self.agent.alive:
-            # Pénalité de mort réduite pour les grands serpents
-            death_penalty = -20.0 / (current_length ** 0.7) if current_length > 0 else -20.0
-            reward += max(death_penalty, -30.0)
+    def __init__(self, envs):
+        self.envs = list(envs)
+        self.wrappers = [ShooterEnvWrapper(env, env.snake) for env in self.envs]
+        self.rewards = RewardKernel(self.envs, [wrapper.agent for wrapper in self.wrappers])
 
-            # Bonus posthume pour longue survie
-            if self.env.step_count > BASE_LIFESPAN * 2:
-                reward += min(current_length, 10.0)
+    def reset(self):
+        states = [wrapper.reset() for wrapper in self.wrappers]
+        self.rewards = RewardKernel(self.envs, [wrapper.agent for wrapper in self.wrappers])
+        return states
+
+    def replace(self, i, env):
+        """Nouvel Env à la place `i` (fin d'épisode) ; renvoie son état initial."""
+        self.envs[i] = env
+        self.wrappers[i] = ShooterEnvWrapper(env, env.snake)
+        state = self.wrappers[i].reset()
+        self.rewards.replace(i, env, self.wrappers[i].agent)
+        return state
+
+    def step(self, actions):
+        """Un pas de chaque Env : ([(flat, minimap)] × N, récompenses (N,), fins d'épisode (N,))."""
+        for wrapper, action_idx in zip(self.wrappers, actions):
+            wrapper.agent.external_action = wrapper.agent.action_space[int(action_idx)]
+        before = self.rewards.begin()
+        for env in self.envs:
+            env.step()
+        states = [wrapper.get_state() for wrapper in self.wrappers]
+        rewards, dones = self.rewards.finish(before)
+        return states, rewards, dones
+
+
+class MultiAgentEnvWrapper:
+    """Équivalent de ShooterEnvWrapper pour tous les serpents d'un Env (`Env(num_snakes=K)`).
+
+    Les K agents jouent dans une seule simulation ; états plats (K, 52) et
+    minimaps (K, 4, 64, 64) sont construits en une passe (ObservationBuilder.
+    build_batch, extract_minimap_batch). Ce qui ne dépend pas de l'agent est
+    fait une fois par pas : positions des cibles (Env.target_positions) et
+    cases des serpents, comparées ensuite à toutes les têtes en une passe
+    NumPy (minimaps, distance à la cible la plus proche). Chaque agent a la
+    récompense de ShooterEnvWrapper ; un agent mort reste `done` avec une récompense nulle
+    jusqu'à la fin de l'Env (tous les serpents morts).
+    """
+
+    def __init__(self, env: Env, grid_size=MINIMAP_SIZE):
+        self.env = env
+        self.agents = env.snakes
+        self.grid_size = grid_size
+        self.observation = ObservationBuilder()
+        self.rewards = RewardKernel(env, self.agents, skip_dead=True)
 
-        # ===== Encouragements supplémentaires =====
-        # Petite pénalité si la tête ne bouge pas (évite cycles)
-        if self.agent.head() == prev_head_pos:
-            reward -= 0.2
+    def reset(self):
+        self.agents = self.env.snakes
+        self.rewards = RewardKernel(self.env, self.agents, skip_dead=True)
+        return self.get_state()
 
-        # Optionnel : petit bonus pour explorer de nouvelles zones
-        unique_positions = len(set((p.x, p.y) for p in self.agent.body))
-        reward += unique_positions * 0.005
+    def get_state(self):
+        flat_states = self.observation.build_batch(self.agents, self.env)
+        minimaps = extract_minimap_batch(self.agents, self.env, grid_size=self.grid_size)
+        return flat_states, minimaps
 
-        # print(f"{reward:.3f}")
-        
-        
-        reward = np.clip(reward, -10.0, 30.0)
+    def step(self, actions):
+        """`actions` : un indice d'action par agent (ignoré pour les agents morts)."""
+        for agent, action_idx in zip(self.agents, actions):
+            if agent.alive:
+                agent.external_action = agent.action_space[int(action_idx)]
 
+        before = self.rewards.begin()
+        self.env.step()
+        next_flat, next_minimap = self.get_state()
+        rewards, dones = self.rewards.finish(before)
+        return next_flat, next_minimap, rewards, dones
+
+
+def shaped_reward_reference(env, agent, prev_distance, prev_length, prev_head_pos, ate, new_distance):
+    """Calcul d'origine de la récompense d'un pas de `agent` et de sa fin d'épisode,
+    gardé pour vérifier RewardKernel.
+
+    `ate` : l'agent a mangé à ce pas (Env.appelSignal, ou Env.ate[k] avec
+    plusieurs serpents). Quand le temps alloué est dépassé, l'agent est retiré
+    de l'arène (Env.kill).
+    """
+    reward = 0.0
+    current_length = len(agent.body)
+    done = False
+
+    # Paramètres durée de vie dynamique
+    BASE_LIFESPAN = 150
+    LIFESPAN_PER_SEGMENT = 30
+    HUNGER_THRESHOLD = 0.7
+
+    allowed_steps = BASE_LIFESPAN + (current_length * LIFESPAN_PER_SEGMENT)
+    time_ratio = env.step_count / allowed_steps
+
+    # ===== Récompenses =====
+
+    # 1. Récompense pour survie (plus petit quand serpent plus grand)
+    survival_reward = 0.5 / (current_length ** 0.5) if current_length > 0 else 0.0
+    reward += survival_reward
+
+    # 2. Bonus croissance (quand le serpent grandit)
+    if current_length > prev_length:
+        growth_bonus = 15.0 + (5.0 * current_length)
+        reward += growth_bonus
+
+    # 3. Pénalité si serpent reste trop longtemps sans manger (faim)
+    if time_ratio > HUNGER_THRESHOLD:
+        hunger_penalty = (time_ratio - HUNGER_THRESHOLD) * 2.0
+        reward -= hunger_penalty
+
+    # 4. Récompense pour se rapprocher des cibles
+    distance_diff = prev_distance - new_distance
+    reward += np.clip(distance_diff * 0.3, -0.15, 0.3)
+
+    # 5. Bonus pour avoir mangé une cible (appelSignal)
+    if ate:
+        reward += 15.0
+
+    # ===== Fin de partie =====
+    time_expired = time_ratio >= 1.0
+    done = not agent.alive or time_expired
+
+    if time_expired:
+        overtime = env.step_count - allowed_steps
+        reward -= min(5.0 + (overtime * 0.01), 10.0)
+        env.kill(agent)
+
+    if not agent.alive:
+        # Pénalité de mort réduite pour les grands serpents
+        death_penalty = -20.0 / (current_length ** 0.7) if current_length > 0 else -20.0
+        reward += max(death_penalty, -30.0)
+
+        # Bonus posthume pour longue survie
+        if env.step_count > BASE_LIFESPAN * 2:
+            reward += min(current_length, 10.0)
+
+    # ===== Encouragements supplémentaires =====
+    # Petite pénalité si la tête ne bouge pas (évite cycles)
+    if agent.head() == prev_head_pos:
+        reward -= 0.2
+
+    # Optionnel : petit bonus pour explorer de nouvelles zones
+    unique_positions = len(set((p.x, p.y) for p in agent.body))
+    reward += unique_positions * 0.005
+
+    # print(f"{reward:.3f}")
+    
+    
+    reward = np.clip(reward, -10.0, 30.0)
 
-        return next_flat, next_minimap, reward, done
+    return reward, done
@@ -0,0 +1,131 @@
+import gzip
+import json
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.chunked_episode import write_chunked
+from core.recorder import MemoryRecorder, StreamRecorder, iter_steps, read_steps
+
+
+def _write_episode(source, path, compress, indent, remove_source, chunk_size):
+    """Sérialise un épisode ; tourne dans le worker. Renvoie le nombre d'octets écrits."""
+    if chunk_size:
+        # Format découpé : `path` est un dossier, les frames y sont écrites au fil de la relecture
+        write_chunked(iter_steps(source) if isinstance(source, str) else source, path, chunk_size)
+        if remove_source and isinstance(source, str):
+            os.remove(source)
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+
+    steps = read_steps(source) if isinstance(source, str) else source
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = json.dumps(steps, indent=indent).encode()
+    if compress:
+        data = gzip.compress(data, compresslevel=6)
+    with open(path, "wb") as f:
+        f.write(data)
+    if remove_source and isinstance(source, str):
+        os.remove(source)
+    return len(data)
+
+
+class ExportService:
+    """Export d'épisodes en arrière-plan, avec une file bornée.
+
+    `submit` accepte un `Env` terminé, une liste `steps` ou le chemin d'un
+    fichier `StreamRecorder`. Avec un `StreamRecorder`, seul le chemin traverse
+    la file : la relecture et la sérialisation JSON se font dans le worker.
+    Quand `max_pending` exports sont en attente, `submit` bloque
+    (`when_full="block"`, back-pressure) ou abandonne l'épisode (`"drop"`).
+    `use_processes=True` sort la sérialisation du GIL du processus d'entraînement.
+    Avec `chunk_size`, les épisodes sont écrits au format découpé du viewer
+    (`core.chunked_episode`) et `path` désigne un dossier.
+    """
+
+    def __init__(self, max_pending=8, workers=1, when_full="block", use_processes=True,
+                 compress=False, indent=4, chunk_size=None):
+        if when_full not in ("block", "drop"):
+            raise ValueError(f"when_full must be 'block' or 'drop', got {when_full!r}")
+        self.when_full = when_full
+        self.compress = compress
+        self.indent = indent
+        self.chunk_size = chunk_size
+
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self.errors = []
+
+    def submit(self, episode, path, remove_source=True):
+        """Met un épisode en file d'export ; renvoie False s'il a été abandonné."""
+        source = episode
+        if hasattr(episode, "recorder"):
+            recorder = episode.recorder
+            if isinstance(recorder, StreamRecorder):
+                episode.close()
+                source = recorder.path
+            elif isinstance(recorder, MemoryRecorder):
+                source = recorder.steps
+            else:
+                raise ValueError("episode has no recording to export")
+
+        if not self._slots.acquire(blocking=self.when_full == "block"):
+            with self._lock:
+                self.dropped += 1
+            if remove_source and isinstance(source, str):
+                os.remove(source)
+            return False
+
+        with self._lock:
+            self.submitted += 1
+        future = self._executor.submit(_write_episode, source, path, self.compress, self.indent,
+                                       remove_source, self.chunk_size)
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future):
+        self._slots.release()
+        with self._lock:
+            error = future.exception()
+            if error is None:
+                self.written += 1
+                self.bytes_written += future.result()
+            else:
+                self.failed += 1
+                self.errors.append(error)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self.submitted - self.written - self.failed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self.submitted - self.written - self.failed,
+                "bytes_written": self.bytes_written,
+            }
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,288 @@
+import math
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+
+from core.arena import DEFAULT_ARENA
+
+channels = {
+    "agent": 0,
+    "target": 1,
+    "wall": 2,
+    "facing": 3,
+}
+
+channel_names = [
+    "Agent", "target", "wall", "facing"
+]
+
+
+class MinimapRasterizer:
+    """Rasterise la minimap d'un agent à partir de masques précalculés.
+
+    Tout ce qui ne dépend que de (range, fov, grid_size) et de l'angle de vue est
+    calculé une seule fois : pixel de chaque décalage entier autour de la tête,
+    cône de vision et rayon de direction. Un rendu ne fait plus que de
+    l'indexation NumPy, avec exactement le même résultat que la version en boucles.
+    Les murs dépendent de l'arène : un rasterizer (et son cache de murs) par arène.
+    """
+
+    def __init__(self, vision_range, fov, grid_size=64, wall_cache_size=4096, arena=None):
+        self.arena = arena or DEFAULT_ARENA
+        self.range = vision_range
+        self.fov = fov
+        self.grid_size = grid_size
+        self.cell_size = (2 * vision_range) / grid_size  # world units per pixel
+
+        # Un décalage entier au-delà de `r` est forcément hors de portée
+        self._r = int(math.floor(vision_range))
+        self._coord = np.array(
+            [round((d + vision_range) / self.cell_size) for d in range(-self._r, self._r + 1)],
+            dtype=np.int64,
+        )
+        self._in_grid = (self._coord >= 0) & (self._coord < grid_size)
+        self._coord_list = self._coord.tolist()
+
+        self._angle_slots = {}
+        self._vision = np.zeros((0, 2 * self._r + 1, 2 * self._r + 1), dtype=bool)
+        self._rays = np.zeros((0, grid_size, grid_size), dtype=np.float32)
+        # Par angle : décalages visibles (triés) de chaque ligne et de chaque colonne du cône, pour les murs
+        self._visible_rows = []
+        self._visible_cols = []
+
+        # Couche murs par (tête x, tête y, angle) : les murs ne bougent jamais.
+        # None = aucun mur visible depuis cette position.
+        self.wall_cache_size = wall_cache_size
+        self._walls = OrderedDict()
+        self._wall_hits = 0
+        self._wall_misses = 0
+
+    def _within_vision(self, dx, dy, angle):
+        if math.hypot(dx, dy) > self.range:
+            return False
+        direction = math.atan2(dy, dx)
+        delta = (direction - angle + math.pi) % (2 * math.pi) - math.pi
+        return abs(delta) <= self.fov / 2
+
+    def _angle_slot(self, angle):
+        slot = self._angle_slots.get(angle)
+        if slot is not None:
+            return slot
+
+        r = self._r
+        offsets = range(-r, r + 1)
+        vision = np.array(
+            [[self._within_vision(dx, dy, angle) for dx in offsets] for dy in offsets],
+            dtype=bool,
+        )
+        # visible ET dans la grille, indexé par [dy + r, dx + r]
+        vision &= self._in_grid[:, None] & self._in_grid[None, :]
+
+        # Rayon de direction, tête à l'origine
+        ray = np.zeros((self.grid_size, self.grid_size), dtype=np.float32)
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        for step in range(1, self.grid_size // 2):
+            px = cos_a * step * self.cell_size
+            py = sin_a * step * self.cell_size
+            if not self._within_vision(px, py, angle):
+                break
+            gx = round((px + self.range) / self.cell_size)
+            gy = round((py + self.range) / self.cell_size)
+            if 0 <= gx < self.grid_size and 0 <= gy < self.grid_size:
+                ray[gy, gx] = 1.0
+
+        slot = len(self._angle_slots)
+        self._angle_slots[angle] = slot
+        self._vision = np.concatenate([self._vision, vision[None]])
+        self._rays = np.concatenate([self._rays, ray[None]])
+        self._visible_rows.append([np.flatnonzero(row).tolist() for row in vision])
+        self._visible_cols.append([np.flatnonzero(col).tolist() for col in vision.T])
+        return slot
+
+    def _plot(self, out, owner, channel, dx, dy, slots):
+        """Allume les pixels visibles des décalages (dx, dy) ; `owner` indexe `out`."""
+        r = self._r
+        keep = (np.abs(dx) <= r) & (np.abs(dy) <= r)
+        owner, dx, dy = owner[keep], dx[keep] + r, dy[keep] + r
+        visible = self._vision[slots[owner], dy, dx]
+        out[owner[visible], channel, self._coord[dy[visible]], self._coord[dx[visible]]] = 1.0
+
+    def _draw_walls(self, wall, ax, ay, slot):
+        """Bordures de l'arène : chaque bord visible est un segment continu.
+
+        Les points d'un bord ont tous la même ligne (ou colonne) de pixels, et la
+        version d'origine relie les points visibles consécutifs par Bresenham :
+        le résultat est le segment entre le premier et le dernier point visible.
+        Renvoie True si au moins un segment a été tracé.
+        """
+        r = self._r
+        coord = self._coord_list
+        width, height = self.arena.width, self.arena.height
+        drawn = False
+
+        x0, x1 = max(0, ax - r), min(width - 1, ax + r)
+        if x0 <= x1:
+            for y in (0, height - 1):
+                dy = y - ay
+                if abs(dy) > r:
+                    continue
+                # Premier et dernier décalage visible de la ligne entre x0 et x1
+                visible = self._visible_rows[slot][dy + r]
+                first = bisect_left(visible, x0 - ax + r)
+                last = bisect_right(visible, x1 - ax + r) - 1
+                if first <= last:
+                    wall[coord[dy + r], coord[visible[first]]:coord[visible[last]] + 1] = 1.0
+                    drawn = True
+
+        y0, y1 = max(0, ay - r), min(height - 1, ay + r)
+        if y0 <= y1:
+            for x in (0, width - 1):
+                dx = x - ax
+                if abs(dx) > r:
+                    continue
+                visible = self._visible_cols[slot][dx + r]
+                first = bisect_left(visible, y0 - ay + r)
+                last = bisect_right(visible, y1 - ay + r) - 1
+                if first <= last:
+                    wall[coord[visible[first]]:coord[visible[last]] + 1, coord[dx + r]] = 1.0
+                    drawn = True
+        return drawn
+
+    def _wall_layer(self, ax, ay, slot):
+        key = (ax, ay, slot)
+        layer = self._walls.get(key, False)
+        if layer is not False:
+            self._wall_hits += 1
+            self._walls.move_to_end(key)
+            return layer
+
+        self._wall_misses += 1
+        layer = np.zeros((self.grid_size, self.grid_size), dtype=np.float32)
+        if not self._draw_walls(layer, ax, ay, slot):
+            layer = None
+        self._walls[key] = layer
+        if len(self._walls) > self.wall_cache_size:
+            self._walls.popitem(last=False)
+        return layer
+
+    def preload_walls(self, angles):
+        """Remplit le cache pour toutes les positions de tête (y compris juste hors de l'arène)."""
+        for angle in angles:
+            slot = self._angle_slot(angle)
+            for ax in range(-1, self.arena.width + 1):
+                for ay in range(-1, self.arena.height + 1):
+                    self._wall_layer(ax, ay, slot)
+
+    def wall_cache_stats(self):
+        lookups = self._wall_hits + self._wall_misses
+        return {
+            "hits": self._wall_hits,
+            "misses": self._wall_misses,
+            "hit_rate": self._wall_hits / lookups if lookups else 0.0,
+            "entries": len(self._walls),
+            "memory_bytes": sum(layer.nbytes for layer in self._walls.values() if layer is not None),
+        }
+
+    def _plot_cells(self, out, rows, channel, cells, hx, hy, slots, exclude=None):
+        """Allume, pour chacun des agents `rows`, les cases `cells` (M, 2 ou 3) visibles
+        depuis sa tête : une seule comparaison (agents × cases) pour tout un Env.
+        `exclude` (len(rows),) : numéro de serpent (colonne 2) ignoré par chaque agent."""
+        r = self._r
+        dx = cells[:, 0] - hx[rows, None] + r
+        dy = cells[:, 1] - hy[rows, None] + r
+        keep = (dx >= 0) & (dx <= 2 * r) & (dy >= 0) & (dy <= 2 * r)
+        if exclude is not None:
+            keep &= cells[:, 2] != exclude[:, None]
+        owner, col = np.nonzero(keep)
+        dx, dy, owner = dx[owner, col], dy[owner, col], rows[owner]
+        visible = self._vision[slots[owner], dy, dx]
+        out[owner[visible], channel, self._coord[dy[visible]], self._coord[dx[visible]]] = 1.0
+
+    @staticmethod
+    def _target_cells(env):
+        positions = getattr(env, "target_positions", None)
+        if positions is not None:
+            return positions()
+        return np.array([(t.position.x, t.position.y) for t in env.targets if t.alive], dtype=np.int64).reshape(-1, 2)
+
+    @staticmethod
+    def _snake_cells(env):
+        """(x, y, numéro du serpent) de toutes les cases des serpents vivants, et numéro de chaque serpent."""
+        snakes = env.snakes
+        parts = [(p.x, p.y, j) for j, snake in enumerate(snakes) if snake.alive for p in snake.body]
+        return np.array(parts, dtype=np.int64).reshape(-1, 3), {id(snake): j for j, snake in enumerate(snakes)}
+
+    def render(self, agent, env, out=None):
+        out = self.render_batch([agent], [env], None if out is None else out[None])
+        return out[0]
+
+    def render_batch(self, agents, envs, out=None):
+        """Minimaps de plusieurs agents en une passe, tableau (N, C, G, G)."""
+        n, size = len(agents), self.grid_size
+        if out is None:
+            out = np.zeros((n, len(channel_names), size, size), dtype=np.float32)
+        else:
+            out.fill(0.0)
+
+        slots = np.array([self._angle_slot(agent.facing_angle) for agent in agents], dtype=np.int64)
+        heads = [agent.head() for agent in agents]
+        center = size // 2
+        out[:, channels["agent"], center, center] = 1.0
+
+        # === 1. Corps des agents (sauf la tête) ===
+        owner, dx, dy = [], [], []
+        for i, (agent, head) in enumerate(zip(agents, heads)):
+            for part in islice(agent.body, 1, None):
+                owner.append(i)
+                dx.append(part.x - head.x)
+                dy.append(part.y - head.y)
+        if owner:
+            self._plot(out, np.array(owner), channels["agent"], np.array(dx), np.array(dy), slots)
+
+        # === 2. Autres serpents et cibles, par Env ===
+        # Arène à plusieurs serpents : les autres serpents vivants (tête comprise) vont dans le canal agent
+        hx, hy = np.array([(head.x, head.y) for head in heads], dtype=np.int64).T
+        groups = {}
+        for i, env in enumerate(envs):
+            groups.setdefault(id(env), (env, []))[1].append(i)
+        for env, rows in groups.values():
+            rows = np.array(rows, dtype=np.int64)
+            if len(getattr(env, "snakes", ())) >= 2:
+                cells, numbers = self._snake_cells(env)
+                exclude = np.array([numbers.get(id(agents[i]), -1) for i in rows.tolist()], dtype=np.int64)
+                self._plot_cells(out, rows, channels["agent"], cells, hx, hy, slots, exclude)
+            self._plot_cells(out, rows, channels["target"], self._target_cells(env), hx, hy, slots)
+
+        # === 3. Murs ===
+        # Seules les têtes à moins de `r` cases d'un bord peuvent voir un mur
+        r = self._r
+        right, bottom = self.arena.width - 1 - r, self.arena.height - 1 - r
+        for i, head in enumerate(heads):
+            if r < head.x < right and r < head.y < bottom:
+                continue
+            layer = self._wall_layer(head.x, head.y, int(slots[i]))
+            if layer is not None:
+                out[i, channels["wall"]] = layer
+
+        # === 4. Facing direction ===
+        out[:, channels["facing"]] = self._rays[slots]
+        return out
+
+
+_rasterizers = {}
+
+
+def get_rasterizer(vision_range, fov, grid_size=64, arena=None):
+    arena = arena or DEFAULT_ARENA
+    key = (vision_range, fov, grid_size, arena.key)
+    rasterizer = _rasterizers.get(key)
+    if rasterizer is None:
+        rasterizer = _rasterizers[key] = MinimapRasterizer(vision_range, fov, grid_size, arena=arena)
+    return rasterizer
+
+
+def wall_cache_stats():
+    """Statistiques du cache des murs, par (range, fov, grid_size, arena.key)."""
+    return {key: rasterizer.wall_cache_stats() for key, rasterizer in _rasterizers.items()}
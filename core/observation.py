@@ -0,0 +1,210 @@
+import math
+import struct
+
+import numpy as np
+
+from core.arena import DEFAULT_ARENA
+from core.minimap import channels
+
+MAX_TARGETS = 5
+SELF_FEATURES = 12
+FLAT_DIM = SELF_FEATURES + MAX_TARGETS * 8
+# Minimap de ShooterEnvWrapper : un canal par entrée de core.minimap.channels
+MINIMAP_SIZE = 64
+MINIMAP_SHAPE = (len(channels), MINIMAP_SIZE, MINIMAP_SIZE)
+
+# Ordre des 8 directions dans l'état (clés de Snake.relative_position)
+DIRECTIONS = ["haut_droite", "droite", "bas_droite", "bas", "bas_gauche", "gauche", "haut_gauche", "haut"]
+
+# Encodage float32 direct des morceaux de l'état (struct arrondit comme un cast float32)
+_SELF_STRUCT = struct.Struct(f"<{SELF_FEATURES}f")
+_ONE_HOT = {slot: struct.pack("<8f", *[float(i == slot) for i in range(8)]) for slot in range(-1, 8)}
+_ZEROS = [bytes(4 * 8 * n) for n in range(MAX_TARGETS + 1)]
+TARGETS_OFFSET = 4 * SELF_FEATURES  # octet de début des one-hot des cibles
+SELF_CACHE_SIZE = 1 << 16  # débuts d'état gardés par tables (tête, cou, angle)
+# Jusque-là, parcourir les positions des cibles coûte moins qu'une requête de cône sur env.spatial
+LINEAR_TARGETS = 64
+
+
+def _direction_slot(dx, dy):
+    """Indice dans DIRECTIONS du one-hot de Snake.relative_position, -1 si aucun."""
+    norm = math.hypot(dx, dy)
+    if norm != 0:
+        dx, dy = dx / norm, dy / norm
+    flags = [
+        dx > 0 and dy > 0,
+        dx > 0 and dy == 0,
+        dx > 0 and dy < 0,
+        dx == 0 and dy < 0,
+        dx < 0 and dy < 0,
+        dx < 0 and dy == 0,
+        dx < 0 and dy > 0,
+        dx == 0 and dy > 0,
+    ]
+    return flags.index(True) if any(flags) else -1
+
+
+class ObservationTables:
+    """Tout ce qui, dans l'état plat, ne dépend que de la géométrie.
+
+    Pour chaque décalage entier (dx, dy) cible - tête à portée de vue :
+    distance (clé du tri), direction one-hot encodée et, par angle de vue,
+    visibilité dans le cône, calculées avec les mêmes expressions que
+    head.distance_to, Snake.relative_position et SpatialIndex.in_cone, donc
+    identiques au bit près. Le début de l'état (tête, cou, angle, dangers)
+    est gardé en cache.
+    """
+
+    def __init__(self, vision_range, fov, arena=None):
+        arena = arena or DEFAULT_ARENA
+        self.range = vision_range
+        self.fov = fov
+        self.arena = arena
+
+        # Décalages à portée : une cible plus loin n'est jamais visible
+        self.r = math.floor(vision_range)
+        self.size = 2 * self.r + 1
+        self.center = self.r * self.size + self.r
+        self._offsets = [(dx, dy) for dx in range(-self.r, self.r + 1) for dy in range(-self.r, self.r + 1)]
+        # head.distance_to(cible) = hypot(hx - tx, hy - ty)
+        self.distance = [math.hypot(-dx, -dy) for dx, dy in self._offsets]
+        self.one_hot = [_ONE_HOT[_direction_slot(dx, dy)] for dx, dy in self._offsets]
+        self._cones = {}
+        self._self_blocks = {}
+
+    def offset_index(self, dx, dy):
+        """Indice dans `distance`/`one_hot` du décalage (dx, dy) cible - tête."""
+        return dx * self.size + dy + self.center
+
+    def cone(self, facing_angle):
+        """Visibilité (bool par décalage) d'une cible pour cet angle de vue."""
+        cone = self._cones.get(facing_angle)
+        if cone is None:
+            cone = self._cones[facing_angle] = [self._within_vision(-dx, -dy, facing_angle)
+                                                for dx, dy in self._offsets]
+        return cone
+
+    def _within_vision(self, vx, vy, facing_angle):
+        # vecteur cible -> tête, comme SpatialIndex.in_cone
+        if math.hypot(vx, vy) > self.range:
+            return False
+        delta = (math.atan2(vy, vx) - facing_angle + math.pi) % (2 * math.pi) - math.pi
+        return abs(delta) <= self.fov / 2
+
+    def self_block(self, hx, hy, bx, by, facing_angle, alive):
+        """Les SELF_FEATURES premiers floats de l'état, encodés en float32."""
+        key = (hx, hy, bx, by, facing_angle, alive)
+        block = self._self_blocks.get(key)
+        if block is not None:
+            return block
+        width, height, cell_size = self.arena.width, self.arena.height, self.arena.cell_size
+        block = _SELF_STRUCT.pack(
+            hx / width,
+            hy / height,
+            hx - bx,
+            hy - by,
+            facing_angle,
+            self.range / width,
+            self.fov / (2 * np.pi),
+            hy <= cell_size,
+            hy >= height - cell_size,
+            hx >= width - cell_size,
+            hx <= cell_size,
+            alive,
+        )
+        if len(self._self_blocks) < SELF_CACHE_SIZE:
+            self._self_blocks[key] = block
+        return block
+
+
+_tables = {}
+
+
+def get_tables(vision_range, fov, arena=None):
+    arena = arena or DEFAULT_ARENA
+    key = (vision_range, fov, arena.key)
+    tables = _tables.get(key)
+    if tables is None:
+        tables = _tables[key] = ObservationTables(vision_range, fov, arena)
+    return tables
+
+
+class ObservationBuilder:
+    """Construit l'état plat (FLAT_DIM,) de ShooterEnvWrapper.get_state.
+
+    Les cibles visibles sont celles de `env.target_positions()` (relues quand
+    `env.targets_version` change) dont le décalage est dans le cône des tables (au-delà de LINEAR_TARGETS cibles : requête de cône
+    sur `env.spatial`), dans l'ordre de `env.targets` comme get_vision ;
+    seules elles sont triées, par la distance des tables (tri stable, mêmes
+    égalités que sorted()). Le début de l'état vient du cache des tables. L'état est
+    assemblé en octets float32 dans un buffer préalloué ; `build` renvoie
+    une copie (le replay buffer garde les états qu'il reçoit) ou l'écrit dans
+    `out`, un buffer float32 (FLAT_DIM,) préalloué.
+    """
+
+    def __init__(self):
+        self._tables = None
+        self._env = None
+        self._version = None
+        self._positions = []
+        self._state = np.zeros(FLAT_DIM, dtype=np.float32)
+        self._bytes = memoryview(self._state).cast("B")
+
+    def build(self, agent, env, out=None):
+        self._write(agent, env, self._bytes)
+        if out is None:
+            return self._state.copy()
+        out[...] = self._state
+        return out
+
+    def build_batch(self, agents, env, out=None):
+        """États (K, FLAT_DIM) de plusieurs agents d'un même Env, en un seul tableau."""
+        states = np.zeros((len(agents), FLAT_DIM), dtype=np.float32)
+        for k, agent in enumerate(agents):
+            self._write(agent, env, memoryview(states[k]).cast("B"))
+        if out is None:
+            return states
+        out[...] = states
+        return out
+
+    def _write(self, agent, env, view):
+        """Écrit l'état de `agent` dans `view` (octets d'un float32 (FLAT_DIM,))."""
+        tables = self._tables
+        if env is not self._env or tables.range != agent.range or tables.fov != agent.fov:
+            tables = self._tables = get_tables(agent.range, agent.fov, env.arena)
+            self._env = env
+            self._version = None
+
+        body = agent.body
+        head = body[0]
+        hx, hy = head.x, head.y
+        if len(body) >= 2:
+            first = body[1]
+            bx, by = first.x, first.y
+        else:
+            bx, by = 0, 0
+        view[:TARGETS_OFFSET] = tables.self_block(hx, hy, bx, by, agent.facing_angle, agent.alive)
+
+        size, center = tables.size, tables.center
+        if len(env.targets) <= LINEAR_TARGETS:
+            r, cone = tables.r, tables.cone(agent.facing_angle)
+            offsets = []
+            if env.targets_version != self._version:
+                self._positions = env.target_positions().tolist()
+                self._version = env.targets_version
+            for x, y in self._positions:
+                dx, dy = x - hx, y - hy
+                if -r <= dx <= r and -r <= dy <= r and cone[dx * size + dy + center]:
+                    offsets.append(dx * size + dy + center)
+        else:
+            visible = env.spatial.in_cone(hx, hy, agent.range, agent.facing_angle, agent.fov, etype='target')
+            offsets = [(t.position.x - hx) * size + (t.position.y - hy) + center for t in visible]
+        if len(offsets) > 1:
+            offsets.sort(key=tables.distance.__getitem__)
+
+        start = TARGETS_OFFSET
+        one_hot = tables.one_hot
+        for k in offsets[:MAX_TARGETS]:
+            view[start:start + 32] = one_hot[k]
+            start += 32
+        view[start:] = _ZEROS[MAX_TARGETS - min(len(offsets), MAX_TARGETS)]
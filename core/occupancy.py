@@ -0,0 +1,75 @@
+from config import GRID_WIDTH, GRID_HEIGHT
+
+
+class OccupancyGrid:
+    """Compteur d'occupation par case, mis à jour incrémentalement par `Snake`.
+
+    Les cases hors de l'arène (tête sortie du plateau) sont comptées à part,
+    pour que `count` reste exact même après une sortie.
+
+    Les cases libres sont tenues dans une liste indexable (`free`, retrait par
+    échange avec le dernier élément) : `random_free_cell` tire une case libre
+    uniformément en O(1) quel que soit le remplissage.
+    """
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.counts = [0] * (width * height)
+        self.outside = {}
+        # free[:] : indices (y * width + x) des cases libres ; free_pos[i] : place de i dans free (-1 si occupée)
+        self.free = list(range(width * height))
+        self.free_pos = list(range(width * height))
+
+    @property
+    def filled(self):
+        """Nombre de cases de l'arène occupées au moins une fois."""
+        return len(self.counts) - len(self.free)
+
+    def add(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = y * self.width + x
+            if self.counts[i] == 0:
+                # Retrait de i de la liste libre : la dernière case prend sa place
+                free, free_pos = self.free, self.free_pos
+                p = free_pos[i]
+                last = free.pop()
+                if last != i:
+                    free[p] = last
+                    free_pos[last] = p
+                free_pos[i] = -1
+            self.counts[i] += 1
+        else:
+            self.outside[(x, y)] = self.outside.get((x, y), 0) + 1
+
+    def remove(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = y * self.width + x
+            self.counts[i] -= 1
+            if self.counts[i] == 0:
+                self.free_pos[i] = len(self.free)
+                self.free.append(i)
+        else:
+            n = self.outside[(x, y)] - 1
+            if n:
+                self.outside[(x, y)] = n
+            else:
+                del self.outside[(x, y)]
+
+    def count(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.counts[y * self.width + x]
+        return self.outside.get((x, y), 0)
+
+    def is_occupied(self, x, y):
+        return self.count(x, y) > 0
+
+    def is_full(self):
+        return not self.free
+
+    def random_free_cell(self, rng):
+        """(x, y) d'une case libre tirée uniformément avec `rng` (RandomStream), None si le plateau est plein."""
+        if not self.free:
+            return None
+        i = self.free[rng.randbelow(len(self.free))]
+        return i % self.width, i // self.width
@@ -1,27 +1,39 @@
-import numpy as np
+import math
+
 
 class Point:
+    """Case entière de la grille, immuable et hashable (utilisable dans un set/dict)."""
+
+    __slots__ = ("x", "y", "etype")
+
     def __init__(self, x: int, y: int,etype = "point"):
-        self.x = x
-        self.y = y
-        self.etype = etype
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "etype", etype)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Point is immutable")
 
     def __eq__(self, other):
         return isinstance(other, Point) and self.x == other.x and self.y == other.y
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return (Point, (self.x, self.y, self.etype))
+
+    def __repr__(self):
+        return f"Point({self.x}, {self.y})"
+
     def to_dict(self):
         return {"x": self.x, "y": self.y}
-    
+
     def direction_to(self,point):
         return Point(self.x-point.x , self.y-point.y)
-    
+
     def length(self):
-        return  np.linalg.norm(np.array([self.x,self.y]))
-    
-    def distance_to(self, point):
-        dx = self.x - point.x
-        dy = self.y - point.y
-        return np.hypot(dx, dy)
+        return math.hypot(self.x, self.y)
 
-        
-        
+    def distance_to(self, point):
+        return math.hypot(self.x - point.x, self.y - point.y)
@@ -0,0 +1,187 @@
+import json
+import math
+import os
+import struct
+import zlib
+from array import array
+from collections import deque
+
+from core.snack import ACTION
+
+ACTION_NAMES = list(ACTION)
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+MAGIC = b"SNKREC1\n"
+CHUNK_HEADER = struct.Struct("<III")  # pas, respawns, octets compressés
+
+FLAG_GROW = 1
+FLAG_DONE = 2
+
+
+class MemoryRecorder:
+    """Enregistrement d'origine : un dict complet par pas, gardé en mémoire."""
+
+    def __init__(self):
+        self.steps = []
+
+    def start(self, env):
+        pass
+
+    def record(self, env, action, respawned):
+        self.steps.append({
+            "snake": env.snake.to_dict(),
+            "facing": env.snake.facing(),
+            "targets": [target.to_dict() for target in env.targets],
+            "objects": [obj.to_dict() for obj in env.objects],
+            "done": env.done,
+            "action": action,
+        })
+
+    def close(self):
+        pass
+
+
+class StreamRecorder:
+    """Enregistrement en flux vers un fichier binaire colonnaire, compressé par blocs.
+
+    Seul l'état initial est écrit en entier. Ensuite chaque pas ne stocke que
+    l'action (qui donne le déplacement de la tête) et deux drapeaux (croissance,
+    fin), plus les réapparitions de cibles quand il y en a. Les blocs de
+    `chunk_steps` pas sont compressés avec zlib et écrits au fil de l'épisode.
+    `read_steps` reconstruit exactement la liste `steps` de `MemoryRecorder`.
+    """
+
+    def __init__(self, path, chunk_steps=4096, compress_level=6):
+        self.path = path
+        self.chunk_steps = chunk_steps
+        self.compress_level = compress_level
+        self._file = None
+        self._length = 0
+        self._step = 0
+        self._reset_chunk()
+
+    def _reset_chunk(self):
+        self._actions = array("B")
+        self._flags = array("B")
+        self._event_steps = array("I")
+        self._event_targets = array("H")
+        self._event_x = array("i")
+        self._event_y = array("i")
+
+    def start(self, env):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = json.dumps({
+            "snake": env.snake.to_dict(),
+            "range": env.snake.range,
+            "fov": env.snake.fov,
+            "targets": [target.to_dict() for target in env.targets],
+            "objects": [obj.to_dict() for obj in env.objects],
+        }).encode()
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self._length = len(env.snake.body)
+
+    def record(self, env, action, respawned):
+        length = len(env.snake.body)
+        self._actions.append(ACTION_CODES[action])
+        self._flags.append((FLAG_GROW if length > self._length else 0) | (FLAG_DONE if env.done else 0))
+        self._length = length
+
+        for index in respawned:
+            position = env.targets[index].position
+            self._event_steps.append(self._step)
+            self._event_targets.append(index)
+            self._event_x.append(position.x)
+            self._event_y.append(position.y)
+
+        self._step += 1
+        if len(self._actions) >= self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        if self._file is None or not self._actions:
+            return
+        payload = b"".join(column.tobytes() for column in (
+            self._actions, self._flags,
+            self._event_steps, self._event_targets, self._event_x, self._event_y,
+        ))
+        compressed = zlib.compress(payload, self.compress_level)
+        self._file.write(CHUNK_HEADER.pack(len(self._actions), len(self._event_steps), len(compressed)))
+        self._file.write(compressed)
+        self._file.flush()
+        self._reset_chunk()
+
+    @property
+    def steps(self):
+        self.flush()
+        return read_steps(self.path)
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def _read_chunks(f):
+    while True:
+        raw = f.read(CHUNK_HEADER.size)
+        if len(raw) < CHUNK_HEADER.size:
+            return
+        num_steps, num_events, size = CHUNK_HEADER.unpack(raw)
+        payload = zlib.decompress(f.read(size))
+
+        columns = []
+        offset = 0
+        for typecode, count in (("B", num_steps), ("B", num_steps), ("I", num_events),
+                                ("H", num_events), ("i", num_events), ("i", num_events)):
+            column = array(typecode)
+            nbytes = count * column.itemsize
+            column.frombytes(payload[offset:offset + nbytes])
+            offset += nbytes
+            columns.append(column)
+        yield columns
+
+
+def iter_steps(path):
+    """Rejoue un fichier de `StreamRecorder` pas à pas (mêmes dicts que `MemoryRecorder`)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a stream recording")
+        (header_size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_size))
+
+        body = deque((p["x"], p["y"]) for p in header["snake"])
+        targets = [(t["x"], t["y"]) for t in header["targets"]]
+        objects = header["objects"]
+
+        step = 0
+        for actions, flags, event_steps, event_targets, event_x, event_y in _read_chunks(f):
+            event = 0
+            for code, flag in zip(actions, flags):
+                name = ACTION_NAMES[code]
+                dx, dy = ACTION[name]
+                head_x, head_y = body[0]
+                body.appendleft((head_x + dx, head_y + dy))
+                if not flag & FLAG_GROW:
+                    body.pop()
+
+                while event < len(event_steps) and event_steps[event] == step:
+                    targets[event_targets[event]] = (event_x[event], event_y[event])
+                    event += 1
+
+                yield {
+                    "snake": [{"x": x, "y": y} for x, y in body],
+                    "facing": {"facing_angle": math.atan2(dy, dx), "range": header["range"], "fov": header["fov"]},
+                    "targets": [{"x": x, "y": y} for x, y in targets],
+                    "objects": [dict(obj) for obj in objects],
+                    "done": bool(flag & FLAG_DONE),
+                    "action": name,
+                }
+                step += 1
+
+
+def read_steps(path):
+    return list(iter_steps(path))
@@ -0,0 +1,240 @@
+import numpy as np
+
+# Durée de vie dynamique : un serpent a BASE_LIFESPAN + longueur * LIFESPAN_PER_SEGMENT pas
+BASE_LIFESPAN = 150
+LIFESPAN_PER_SEGMENT = 30
+HUNGER_THRESHOLD = 0.7
+
+# En dessous de ce nombre d'agents, `shaped_reward_one` par agent est plus
+# rapide que `shaped_rewards` (surcoût fixe de NumPy d'environ 50 µs)
+NUMPY_MIN_ROWS = 48
+
+# Termes qui ne dépendent que de la longueur, calculés une fois par longueur
+# avec les mêmes expressions que la référence (résultats identiques au bit près)
+_survival = []  # 0.5 / longueur ** 0.5
+_death = []     # max(-20 / longueur ** 0.7, -30)
+_survival_array = np.zeros(0)
+_death_array = np.zeros(0)
+
+
+def length_tables(max_length):
+    """Tables (survie, pénalité de mort) indexées par la longueur, étendues jusqu'à `max_length`."""
+    global _survival_array, _death_array
+    if max_length >= len(_survival):
+        for length in range(len(_survival), 2 * max_length + 1):
+            _survival.append(0.5 / (length ** 0.5) if length > 0 else 0.0)
+            _death.append(max(-20.0 / (length ** 0.7) if length > 0 else -20.0, -30.0))
+        _survival_array = np.array(_survival)
+        _death_array = np.array(_death)
+    return _survival_array, _death_array
+
+
+def shaped_rewards(step_count, length, prev_length, ate, alive, moved, distance_diff, unique_cells):
+    """Récompense façonnée de N agents en une passe NumPy.
+
+    Tous les arguments sont des tableaux (N,) (ou des scalaires diffusés) :
+    `alive` est l'état après Env.step, avant le retrait des agents dont le temps
+    est écoulé ; `distance_diff` = distance d'avant - distance d'après à la cible
+    la plus proche. Les termes sont ajoutés dans l'ordre de la référence
+    (`shaped_reward_reference`), un terme absent valant 0.0.
+
+    Retourne (récompenses, fins d'épisode, temps écoulés).
+    """
+    length = np.asarray(length, dtype=np.int64)
+    survival, death = length_tables(int(length.max()))
+    allowed = BASE_LIFESPAN + length * LIFESPAN_PER_SEGMENT
+    time_ratio = step_count / allowed
+
+    reward = survival[length]
+    reward = reward + np.where(length > prev_length, 15.0 + (5.0 * length), 0.0)
+    reward = reward - np.where(time_ratio > HUNGER_THRESHOLD, (time_ratio - HUNGER_THRESHOLD) * 2.0, 0.0)
+    reward = reward + np.clip(np.asarray(distance_diff, dtype=np.float64) * 0.3, -0.15, 0.3)
+    reward = reward + np.where(ate, 15.0, 0.0)
+
+    expired = time_ratio >= 1.0
+    reward = reward - np.where(expired, np.minimum(5.0 + ((step_count - allowed) * 0.01), 10.0), 0.0)
+    dead = ~np.asarray(alive, dtype=bool) | expired
+    reward = reward + np.where(dead, death[length], 0.0)
+    reward = reward + np.where(dead & (step_count > BASE_LIFESPAN * 2), np.minimum(length, 10.0), 0.0)
+
+    reward = reward - np.where(moved, 0.0, 0.2)
+    reward = reward + np.asarray(unique_cells) * 0.005
+    return np.clip(reward, -10.0, 30.0), dead, expired
+
+
+def shaped_reward_one(step_count, length, prev_length, ate, alive, moved, distance_diff, unique_cells):
+    """`shaped_rewards` pour un seul agent, en flottants Python (sans surcoût NumPy)."""
+    if length >= len(_survival):
+        length_tables(length)
+    allowed = BASE_LIFESPAN + length * LIFESPAN_PER_SEGMENT
+    time_ratio = step_count / allowed
+
+    reward = _survival[length]
+    if length > prev_length:
+        reward += 15.0 + (5.0 * length)
+    if time_ratio > HUNGER_THRESHOLD:
+        reward -= (time_ratio - HUNGER_THRESHOLD) * 2.0
+    reward += min(max(distance_diff * 0.3, -0.15), 0.3)
+    if ate:
+        reward += 15.0
+
+    expired = time_ratio >= 1.0
+    if expired:
+        reward -= min(5.0 + ((step_count - allowed) * 0.01), 10.0)
+    dead = not alive or expired
+    if dead:
+        reward += _death[length]
+        if step_count > BASE_LIFESPAN * 2:
+            reward += min(length, 10.0)
+
+    if not moved:
+        reward -= 0.2
+    reward += unique_cells * 0.005
+    return min(max(reward, -10.0), 30.0), dead, expired
+
+
+class RewardKernel:
+    """Récompense façonnée de ShooterEnvWrapper pour plusieurs agents.
+
+    Les agents sont ceux d'un même Env (`env` seul) ou de plusieurs Env
+    (`env` liste alignée sur `agents`, un Env par agent, comme
+    extract_minimap_batch). `begin` relève l'état des agents avant Env.step,
+    `finish` calcule ensuite toutes les récompenses en une passe
+    (`shaped_rewards`) ; `finish_one` fait de même pour un agent seul
+    (`shaped_reward_one`). Deux agrégats sont tenus à jour au lieu d'être
+    recalculés à chaque pas :
+
+    - la distance à la cible la plus proche, gardée par agent avec la tête et
+      `Env.targets_version` : la distance d'après un pas sert d'avant au suivant ;
+      les distances manquantes de plusieurs agents sont calculées en une passe
+      contre `Env.target_positions` (`nearest_distances`) ;
+    - le nombre de cases distinctes du corps : un serpent vivant ne passe jamais
+      deux fois par la même case (ce serait une collision), c'est donc sa
+      longueur ; le corps n'est parcouru que pour un serpent mort.
+
+    Avec `skip_dead`, les agents déjà morts avant le pas ont une récompense
+    nulle et restent `done` (MultiAgentEnvWrapper).
+    """
+
+    def __init__(self, env, agents, skip_dead=False):
+        self.agents = list(agents)
+        self.envs = list(env) if isinstance(env, (list, tuple)) else [env] * len(self.agents)
+        self.skip_dead = skip_dead
+        # Indice de chaque agent dans env.snakes, pour Env.ate
+        self._slots = [self._slot(env, agent) for env, agent in zip(self.envs, self.agents)]
+        self._nearest = [None] * len(self.agents)  # ((x, y, targets_version), distance)
+
+    @staticmethod
+    def _slot(env, agent):
+        return next(i for i, snake in enumerate(env.snakes) if snake is agent)
+
+    def replace(self, k, env, agent):
+        """Nouvelle paire (Env, agent) à la place `k`, par exemple au début d'un nouvel épisode."""
+        self.envs[k], self.agents[k] = env, agent
+        self._slots[k] = self._slot(env, agent)
+        self._nearest[k] = None
+
+    def nearest_distance(self, k):
+        env = self.envs[k]
+        head = self.agents[k].head()
+        key = (head.x, head.y, env.targets_version)
+        cached = self._nearest[k]
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        distance = env.spatial.nearest(head.x, head.y, etype='target')[1]
+        self._nearest[k] = (key, distance)
+        return distance
+
+    def nearest_distances(self, rows):
+        """`nearest_distance` des agents `rows`, toutes les têtes hors cache en une passe NumPy.
+
+        Chaque tête n'est comparée qu'aux cibles de son Env. Même valeur que
+        SpatialIndex.nearest : la racine (arrondie correctement) du plus petit
+        carré entier de distance, comme `math.hypot`.
+        """
+        missing = []
+        for k in rows:
+            env = self.envs[k]
+            head = self.agents[k].head()
+            key = (head.x, head.y, env.targets_version)
+            cached = self._nearest[k]
+            # Les objets de l'index spatial peuvent aussi être des cibles : cas rare, laissé à `nearest_distance`
+            if (cached is None or cached[0] != key) and not env.objects and len(env.target_positions()):
+                missing.append((k, key))
+        if len(missing) > 1:
+            targets = [self.envs[k].target_positions() for k, _ in missing]
+            counts = [len(positions) for positions in targets]
+            heads = np.repeat(np.array([key[:2] for _, key in missing], dtype=np.int64), counts, axis=0)
+            offsets = np.concatenate(targets) - heads
+            squared = (offsets * offsets).sum(axis=1)
+            starts = np.cumsum([0] + counts[:-1])
+            for (k, key), distance in zip(missing, np.sqrt(np.minimum.reduceat(squared, starts)).tolist()):
+                self._nearest[k] = (key, distance)
+        return [self.nearest_distance(k) for k in rows]
+
+    def unique_cells(self, k):
+        agent = self.agents[k]
+        if agent.alive:
+            return len(agent.body)
+        return len(set((p.x, p.y) for p in agent.body))
+
+    def begin(self):
+        """État avant Env.step : (agents actifs, distances, longueurs, têtes)."""
+        active = [agent.alive or not self.skip_dead for agent in self.agents]
+        rows = [k for k in range(len(self.agents)) if active[k]]
+        distances = [None] * len(self.agents)
+        for k, distance in zip(rows, self.nearest_distances(rows)):
+            distances[k] = distance
+        return active, distances, [len(agent.body) for agent in self.agents], [agent.head() for agent in self.agents]
+
+    def finish(self, before):
+        """Récompenses (N,) et fins d'épisode (N,) après Env.step.
+
+        Les agents dont le temps est écoulé sont retirés de l'arène (Env.kill).
+        """
+        active, prev_distances, prev_lengths, prev_heads = before
+        rows = [k for k in range(len(self.agents)) if active[k]]
+        distance_diff = [prev_distances[k] - distance for k, distance in zip(rows, self.nearest_distances(rows))]
+        if len(rows) < NUMPY_MIN_ROWS:
+            rewards, dones = [0.0] * len(self.agents), [True] * len(self.agents)
+            for k, diff in zip(rows, distance_diff):
+                env, agent = self.envs[k], self.agents[k]
+                rewards[k], dones[k], expired = shaped_reward_one(
+                    env.step_count, len(agent.body), prev_lengths[k], env.ate[self._slots[k]], agent.alive,
+                    agent.head() != prev_heads[k], diff, self.unique_cells(k))
+                if expired:
+                    env.kill(agent)
+            return np.array(rewards), np.array(dones)
+
+        rewards = np.zeros(len(self.agents))
+        dones = np.ones(len(self.agents), dtype=bool)
+        agents = [self.agents[k] for k in rows]
+        values, dead, expired = shaped_rewards(
+            np.array([self.envs[k].step_count for k in rows]),
+            [len(agent.body) for agent in agents],
+            [prev_lengths[k] for k in rows],
+            [self.envs[k].ate[self._slots[k]] for k in rows],
+            [agent.alive for agent in agents],
+            [agent.head() != prev_heads[k] for agent, k in zip(agents, rows)],
+            distance_diff,
+            [self.unique_cells(k) for k in rows],
+        )
+        for k in np.flatnonzero(expired).tolist():
+            self.envs[rows[k]].kill(agents[k])
+        rewards[rows] = values
+        dones[rows] = dead
+        return rewards, dones
+
+    def finish_one(self, before):
+        """`finish` pour le seul agent du kernel : (récompense, fin d'épisode)."""
+        env = self.envs[0]
+        active, prev_distances, prev_lengths, prev_heads = before
+        if not active[0]:
+            return 0.0, True
+        agent = self.agents[0]
+        reward, done, expired = shaped_reward_one(
+            env.step_count, len(agent.body), prev_lengths[0], env.ate[self._slots[0]], agent.alive,
+            agent.head() != prev_heads[0], prev_distances[0] - self.nearest_distance(0), self.unique_cells(0))
+        if expired:
+            env.kill(agent)
+        return reward, done
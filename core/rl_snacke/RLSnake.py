@@ -7,8 +7,9 @@ ACTION = {
         }
 
 class RLSnacke(Snake):
-    def __init__(self, start, cell_size, range_radius = 10, fov_deg = 90, etype='snake'):
-        super().__init__(start, cell_size, range_radius, fov_deg, etype)
+    def __init__(self, start, cell_size, range_radius = 10, fov_deg = 90, etype='snake', arena=None, occupancy=None,
+                 rng=None):
+        super().__init__(start, cell_size, range_radius, fov_deg, etype, arena, occupancy, rng)
         self.external_action = None
         self.action_space = self._build_action_space()
         
@@ -0,0 +1,258 @@
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from core.env import Env
+from core.env_wrapper import ShooterEnvWrapper
+from core.observation import FLAT_DIM, MINIMAP_SHAPE
+from core.seeding import RandomStream, spawn_seeds
+from .dqn_model import CombinedDQN
+from .train_dqn import DQNTrainer
+
+ACTION_DIM = 4
+PACKED_MINIMAP = int(np.prod(MINIMAP_SHAPE)) // 8
+MAX_EPISODE_STEPS = 5000
+
+# Une transition dans l'anneau partagé ; `first` marque le début d'un épisode,
+# sinon l'état est l'état suivant de la transition précédente et n'est pas renvoyé.
+TRANSITION_DTYPE = np.dtype([
+    ("flat", np.float32, FLAT_DIM),
+    ("minimap", np.uint8, PACKED_MINIMAP),
+    ("next_flat", np.float32, FLAT_DIM),
+    ("next_minimap", np.uint8, PACKED_MINIMAP),
+    ("action", np.int64),
+    ("reward", np.float32),
+    ("done", np.bool_),
+    ("first", np.bool_),
+])
+
+
+class TransitionRing:
+    """File circulaire en mémoire partagée, un acteur producteur / le learner consommateur.
+
+    `head` n'est écrit que par l'acteur et `tail` que par le learner : pas de verrou.
+    """
+
+    def __init__(self, slots, ctx):
+        self.slots = slots
+        self._raw = ctx.RawArray("b", slots * TRANSITION_DTYPE.itemsize)
+        self._head = ctx.RawValue("q", 0)
+        self._tail = ctx.RawValue("q", 0)
+        self._data = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = np.frombuffer(self._raw, dtype=TRANSITION_DTYPE)
+        return self._data
+
+    def put(self, stop, flat, minimap, action, reward, next_flat, next_minimap, done, first):
+        """Écrit une transition ; attend tant que l'anneau est plein (back-pressure)."""
+        head = self._head.value
+        while head - self._tail.value >= self.slots:
+            if stop.is_set():
+                return False
+            time.sleep(0.0005)
+
+        record = self.data[head % self.slots]
+        if first:
+            record["flat"] = flat
+            record["minimap"] = np.packbits(minimap.reshape(-1) != 0)
+        record["next_flat"] = next_flat
+        record["next_minimap"] = np.packbits(next_minimap.reshape(-1) != 0)
+        record["action"] = action
+        record["reward"] = reward
+        record["done"] = done
+        record["first"] = first
+        self._head.value = head + 1
+        return True
+
+    def drain(self):
+        """Copie et retire toutes les transitions disponibles."""
+        head, tail = self._head.value, self._tail.value
+        if head == tail:
+            return self.data[:0].copy()
+        idx = np.arange(tail, head) % self.slots
+        records = self.data[idx]
+        self._tail.value = head
+        return records
+
+
+def actor_epsilons(num_actors, base=0.4, alpha=7.0):
+    """Epsilon fixe par acteur (schéma Ape-X) : de très exploratoire à presque glouton."""
+    if num_actors == 1:
+        return [base]
+    return [base ** (1 + alpha * i / (num_actors - 1)) for i in range(num_actors)]
+
+
+def run_actor(actor_id, ring, shared_net, version, lock, stop, epsilon, seed, arena=None, client=None):
+    """Boucle d'un acteur ; avec `client` (PolicyClient), les actions gloutonnes viennent du serveur d'inférence."""
+    torch.set_num_threads(1)
+    # `seed` : SeedSequence de l'acteur ; un flux pour l'exploration, un pour les Env successifs
+    action_seed, env_seed = spawn_seeds(seed, 2)
+    rng = np.random.default_rng(action_seed)
+    env_rng = RandomStream(env_seed)
+    torch.manual_seed(int(action_seed.generate_state(1)[0]))
+
+    if client is None:
+        net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+        net.eval()
+    local_version = -1
+
+    while not stop.is_set():
+        env = Env(record=False, arena=arena, rng=env_rng)  # les acteurs n'exportent pas d'épisodes
+        wrapper = ShooterEnvWrapper(env, env.snake)
+        flat_state, minimap = wrapper.reset()
+        first = True
+
+        for _ in range(MAX_EPISODE_STEPS):
+            if client is None and version.value != local_version:
+                with lock:
+                    net.load_state_dict(shared_net.state_dict())
+                    local_version = version.value
+
+            if rng.random() < epsilon:
+                action = int(rng.integers(ACTION_DIM))
+            elif client is not None:
+                action = client.act(flat_state, minimap)
+                if action is None:
+                    return
+            else:
+                with torch.no_grad():
+                    q_values = net(torch.from_numpy(flat_state)[None], torch.from_numpy(minimap)[None])
+                action = q_values.argmax().item()
+
+            next_state, next_minimap, reward, done = wrapper.step(action)
+            if not ring.put(stop, flat_state, minimap, action, reward, next_state, next_minimap, done, first):
+                return
+            first = False
+            flat_state, minimap = next_state, next_minimap
+            if done or stop.is_set():
+                break
+
+
+def _unpack_minimap(packed):
+    return np.unpackbits(packed).reshape(MINIMAP_SHAPE).astype(np.float32)
+
+
+def train_distributed(num_actors=4, total_env_steps=1000000, sync_every=100, ring_slots=2048,
+                      seed=0, report_every=10.0, max_seconds=None, arena=None, policy_server=False, schedule=None):
+    """Entraînement acteurs / learner.
+
+    Chaque acteur fait tourner Env + ShooterEnvWrapper avec sa copie de
+    CombinedDQN et envoie ses transitions dans un anneau en mémoire partagée.
+    Le learner (ce processus) possède le DQNTrainer et le replay buffer, et
+    republie ses poids tous les `sync_every` pas de gradient.
+
+    Avec `policy_server`, les acteurs n'ont plus de réseau : un PolicyServer
+    calcule leurs actions par batchs et reçoit les poids republiés.
+
+    Avec `schedule` (LearnerSchedule), les pas de gradient suivent le rythme
+    des acteurs : `trainer.observe` reçoit les pas drainés des anneaux (replay
+    ratio, paquets de K, warmup, réseau cible). Sans, le learner fait un pas
+    de gradient par tour de boucle dès que le buffer le permet.
+    """
+    ctx = mp.get_context("spawn")
+    # Graine racine -> un flux pour le learner, un par acteur
+    learner_seed, *actor_seeds = spawn_seeds(seed, num_actors + 1)
+    # Poids initiaux du learner (donc des acteurs et du serveur) tirés du flux du learner
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=ACTION_DIM, rng=learner_seed, schedule=schedule)
+
+    stop = ctx.Event()
+    server = None
+    if policy_server:
+        from .policy_server import PolicyServer  # import local : policy_server importe ce module
+        server = PolicyServer(trainer.q_net, num_actors, ctx=ctx, stop=stop).start()
+        # Le learner publie dans la copie partagée du serveur
+        shared_net, version, lock = server.shared_net, server.version, server.lock
+    else:
+        shared_net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+        shared_net.load_state_dict(trainer.q_net.state_dict())
+        shared_net.share_memory()
+        version = ctx.RawValue("q", 0)
+        lock = ctx.Lock()
+
+    rings = [TransitionRing(ring_slots, ctx) for _ in range(num_actors)]
+    actors = [
+        ctx.Process(
+            target=run_actor,
+            args=(i, rings[i], shared_net, version, lock, stop, epsilon, actor_seeds[i], arena,
+                  server.client(i) if server is not None else None),
+            daemon=True,
+        )
+        for i, epsilon in enumerate(actor_epsilons(num_actors))
+    ]
+    for actor in actors:
+        actor.start()
+
+    last_next = [None] * num_actors  # dernier état suivant de chaque acteur (chaînage du buffer)
+    env_steps = 0
+    published = 0  # trainer.grad_steps // sync_every à la dernière publication
+    start = last_report = time.perf_counter()
+    try:
+        while env_steps < total_env_steps:
+            if max_seconds is not None and time.perf_counter() - start > max_seconds:
+                break
+
+            received = 0
+            for i, ring in enumerate(rings):
+                for record in ring.drain():
+                    if record["first"] or last_next[i] is None:
+                        state = (record["flat"].copy(), _unpack_minimap(record["minimap"]))
+                    else:
+                        state = last_next[i]
+                    next_state = (record["next_flat"].copy(), _unpack_minimap(record["next_minimap"]))
+                    trainer.replay_buffer.push(state[0], state[1], int(record["action"]), float(record["reward"]),
+                                               next_state[0], next_state[1], bool(record["done"]))
+                    last_next[i] = None if record["done"] else next_state
+                    received += 1
+            env_steps += received
+
+            if schedule is not None:
+                learned = trainer.observe(received)
+            elif len(trainer.replay_buffer) >= trainer.batch_size:
+                trainer.train_step()
+                learned = 1
+            else:
+                learned = 0
+            if learned and trainer.grad_steps // sync_every > published:
+                with lock:
+                    shared_net.load_state_dict(trainer.q_net.state_dict())
+                    version.value += 1
+                published = trainer.grad_steps // sync_every
+            elif not learned and not received:
+                time.sleep(0.001)
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                elapsed = now - start
+                print(f"[learner] {env_steps / elapsed:8.0f} env steps/s  "
+                      f"{trainer.grad_steps / elapsed:6.1f} grad steps/s  buffer {len(trainer.replay_buffer)}")
+                last_report = now
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join(timeout=5)
+            if actor.is_alive():
+                actor.terminate()
+        if server is not None:
+            server.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "env_steps": env_steps,
+        "grad_steps": trainer.grad_steps,
+        "seconds": elapsed,
+        "env_steps_per_sec": env_steps / elapsed,
+        "grad_steps_per_sec": trainer.grad_steps / elapsed,
+    }
+    if server is not None:
+        stats["policy_server"] = server.stats()
+    return trainer, stats
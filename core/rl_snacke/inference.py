@@ -0,0 +1,114 @@
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+COMPILE_MODES = (None, "trace", "compile")
+
+
+def configure_threads(num_threads=None, num_interop_threads=None):
+    """Threads intra-op / inter-op de torch (None : réglage inchangé).
+
+    Le nombre de threads inter-op ne peut être fixé qu'avant le premier calcul
+    parallèle du processus (sinon torch lève une RuntimeError).
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads is not None and torch.get_num_interop_threads() != num_interop_threads:
+        torch.set_num_interop_threads(num_interop_threads)
+
+
+def fold_conv_bn(conv, bn):
+    """(poids, biais) d'une convolution suivie d'une BatchNorm en mode eval, fondues en une convolution."""
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    weight = conv.weight * scale.reshape(-1, 1, 1, 1)
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+    return weight, (bias - bn.running_mean) * scale + bn.bias
+
+
+class DQNInference(nn.Module):
+    """CombinedDQN pour l'action, sans gradient.
+
+    Chaque bloc Conv2d + BatchNorm2d est fondu en une seule convolution
+    (statistiques courantes de la BatchNorm, comme en mode eval) et les
+    convolutions travaillent en channels_last. Les couches linéaires sont
+    celles du réseau d'origine (partagées, pas copiées) ; seules les
+    convolutions fondues doivent être recalculées après un pas de gradient
+    (`refresh`, appelé au prochain forward si `stale`).
+
+    `compile` : None (eager), "trace" (graphe TorchScript tracé au premier
+    appel) ou "compile" (`torch.compile`).
+    """
+
+    def __init__(self, net, channels_last=True, compile=None):
+        super().__init__()
+        if compile not in COMPILE_MODES:
+            raise ValueError(f"unknown compile mode: {compile!r}")
+        self.net = [net]  # liste : le réseau d'origine n'est pas un sous-module
+        self.channels_last = channels_last
+        self.compile = compile
+        self.convs = nn.ModuleList(
+            nn.Conv2d(block[0].in_channels, block[0].out_channels, block[0].kernel_size, padding=block[0].padding)
+            for block in (net.conv1, net.conv2, net.conv3)
+        )
+        self.convs.requires_grad_(False)
+        self.convs.to(net.out.weight.device)
+        if channels_last:
+            # copy_ (refresh) garde ensuite le format mémoire
+            self.convs.to(memory_format=torch.channels_last)
+        self.flat_fc1 = net.flat_fc1
+        self.flat_fc2 = net.flat_fc2
+        self.fc_combined = net.fc_combined
+        self.out = net.out
+        self.stale = True
+        self._graph = []  # graphe tracé ou compilé ; liste : ce n'est pas un sous-module
+
+    @torch.no_grad()
+    def refresh(self):
+        """Recopie en place les convolutions fondues depuis le réseau d'origine."""
+        net = self.net[0]
+        for conv, block in zip(self.convs, (net.conv1, net.conv2, net.conv3)):
+            weight, bias = fold_conv_bn(block[0], block[1])
+            conv.weight.copy_(weight)
+            conv.bias.copy_(bias)
+        self.stale = False
+
+    def forward(self, flat_input, minimap_input):
+        x = minimap_input
+        for conv in self.convs:
+            x = F.max_pool2d(F.relu(conv(x)), 2)
+        x = x.flatten(1)  # ordre NCHW, même en channels_last
+
+        f = F.relu(self.flat_fc1(flat_input))
+        f = F.relu(self.flat_fc2(f))
+        combined = F.relu(self.fc_combined(torch.cat((x, f), dim=1)))
+        return self.out(combined)
+
+    def _runner(self, flat, minimap):
+        if self.compile is None:
+            return self
+        if not self._graph:
+            if self.compile == "trace":
+                # Pas de torch.jit.freeze : le graphe garde les poids partagés
+                with torch.no_grad():
+                    self._graph.append(torch.jit.trace(self, (flat, minimap), check_trace=False))
+            else:
+                self._graph.append(torch.compile(self))
+        return self._graph[0]
+
+    def q_values(self, flat_batch, minimap_batch):
+        """Q-valeurs (N, actions) pour des tableaux (N, flat) et (N, C, H, W)."""
+        if self.stale:
+            self.refresh()
+        device = self.out.weight.device
+        flat = torch.as_tensor(np.asarray(flat_batch, dtype=np.float32), device=device)
+        minimap = torch.as_tensor(np.asarray(minimap_batch, dtype=np.float32), device=device)
+        if self.channels_last:
+            minimap = minimap.contiguous(memory_format=torch.channels_last)
+        runner = self._runner(flat, minimap)
+        with torch.inference_mode():
+            return runner(flat, minimap)
+
+    def act(self, flat_batch, minimap_batch):
+        """Actions gloutonnes (N,) en int64."""
+        return self.q_values(flat_batch, minimap_batch).argmax(1).cpu().numpy()
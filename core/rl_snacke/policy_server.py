@@ -0,0 +1,255 @@
+import time
+
+import numpy as np
+import torch.multiprocessing as mp
+
+from .distributed import ACTION_DIM, FLAT_DIM, MINIMAP_SHAPE, PACKED_MINIMAP
+from .dqn_model import CombinedDQN
+from .inference import DQNInference, configure_threads
+
+# Une requête par client : l'observation (minimap en bits, comme TransitionRing),
+# l'heure d'envoi (time.monotonic, commune aux processus) et l'action renvoyée
+REQUEST_DTYPE = np.dtype([
+    ("flat", np.float32, FLAT_DIM),
+    ("minimap", np.uint8, PACKED_MINIMAP),
+    ("sent", np.float64),
+    ("action", np.int64),
+])
+
+# Bornes des classes de latence en µs : 10 par décade, de 1 µs à 1 s
+LATENCY_EDGES_US = np.geomspace(1.0, 1e6, 61)
+
+# Attente bloquante maximale avant de relire l'événement d'arrêt
+STOP_CHECK_SECONDS = 0.1
+
+
+class PolicyRequests:
+    """Une case de requête par client, en mémoire partagée.
+
+    Le client écrit son observation, incrémente `requested[slot]` et réveille
+    le serveur (`ready`) ; le serveur écrit l'action, recopie ce numéro dans
+    `answered[slot]` et réveille le client (`answers[slot]`). Chaque compteur
+    n'a qu'un écrivain : pas de verrou (comme TransitionRing). Les deux côtés
+    attendent sur un sémaphore, sans boucle active : avec moins de cœurs que
+    de processus, l'attente d'un client ne prend pas le CPU du serveur.
+    """
+
+    def __init__(self, slots, ctx):
+        self.slots = slots
+        self._raw = ctx.RawArray("b", slots * REQUEST_DTYPE.itemsize)
+        self._requested = ctx.RawArray("q", slots)
+        self._answered = ctx.RawArray("q", slots)
+        self.ready = ctx.Semaphore(0)  # une unité par requête envoyée
+        self.answers = [ctx.Semaphore(0) for _ in range(slots)]
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    def _view(self):
+        if self._views is None:
+            self._views = (
+                np.frombuffer(self._raw, dtype=REQUEST_DTYPE),
+                np.frombuffer(self._requested, dtype=np.int64),
+                np.frombuffer(self._answered, dtype=np.int64),
+            )
+        return self._views
+
+    @property
+    def data(self):
+        return self._view()[0]
+
+    @property
+    def requested(self):
+        return self._view()[1]
+
+    @property
+    def answered(self):
+        return self._view()[2]
+
+
+class ServerStats:
+    """Histogrammes partagés du serveur : latence par requête et taille des batchs.
+
+    La latence va de l'envoi de la requête à l'écriture de l'action (attente
+    du batch + forward) ; les percentiles sont lus sur l'histogramme, à une
+    classe près (26 %).
+    """
+
+    def __init__(self, max_batch, ctx):
+        self._latency = ctx.RawArray("q", len(LATENCY_EDGES_US) + 1)
+        self._batch = ctx.RawArray("q", max_batch + 1)
+        self._swaps = ctx.RawValue("q", 0)
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    def _view(self):
+        if self._views is None:
+            self._views = (np.frombuffer(self._latency, dtype=np.int64), np.frombuffer(self._batch, dtype=np.int64))
+        return self._views
+
+    def record(self, latencies_us, batch_size):
+        latency, batch = self._view()
+        np.add.at(latency, np.searchsorted(LATENCY_EDGES_US, latencies_us), 1)
+        batch[batch_size] += 1
+
+    def swapped(self):
+        self._swaps.value += 1
+
+    def percentile(self, q):
+        """Borne haute (µs) de la classe qui contient le percentile `q` ; None sans requête."""
+        latency = self._view()[0].copy()
+        total = latency.sum()
+        if not total:
+            return None
+        index = int(np.searchsorted(np.cumsum(latency), q / 100 * total))
+        return float(LATENCY_EDGES_US[index]) if index < len(LATENCY_EDGES_US) else float("inf")
+
+    def summary(self):
+        batch = self._view()[1].copy()
+        batches = int(batch.sum())
+        requests = int(np.dot(batch, np.arange(len(batch))))
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch": requests / batches if batches else 0.0,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "weight_swaps": self._swaps.value,
+            "batch_histogram": {size: int(n) for size, n in enumerate(batch) if n},
+        }
+
+
+class PolicyClient:
+    """Côté Env : envoie une observation au serveur et attend l'action (case `slot`)."""
+
+    def __init__(self, requests, slot, stop):
+        self.requests = requests
+        self.slot = slot
+        self.stop = stop
+
+    def act(self, flat_state, minimap):
+        """Action gloutonne pour une observation ; None si le serveur s'arrête avant de répondre."""
+        requests, slot = self.requests, self.slot
+        record = requests.data[slot]
+        record["flat"] = flat_state
+        record["minimap"] = np.packbits(minimap.reshape(-1) != 0)
+        record["sent"] = time.monotonic()
+        requests.requested[slot] += 1
+        requests.ready.release()
+
+        answer = requests.answers[slot]
+        while not answer.acquire(timeout=STOP_CHECK_SECONDS):
+            if self.stop.is_set():
+                return None
+        return int(record["action"])
+
+
+def run_policy_server(requests, stats, shared_net, version, lock, stop, max_batch, max_latency,
+                      compile=None, num_threads=None):
+    configure_threads(num_threads)
+    net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+    net.eval()
+    inference = DQNInference(net, compile=compile)
+    data, requested, answered = requests.data, requests.requested, requests.answered
+    ready, answers = requests.ready, requests.answers
+    local_version = -1
+
+    while not stop.is_set():
+        pending = np.flatnonzero(requested != answered)
+        if not len(pending):
+            ready.acquire(timeout=STOP_CHECK_SECONDS)
+            continue
+        # Le batch part plein, quand tous les clients attendent, ou à l'échéance de la plus vieille requête :
+        # en attendant, le serveur dort jusqu'à la requête suivante ou l'échéance
+        if len(pending) < max_batch and len(pending) < requests.slots:
+            wait = max_latency - (time.monotonic() - data["sent"][pending].min())
+            if wait > 0:
+                ready.acquire(timeout=wait)
+                continue
+        pending = pending[:max_batch]
+        seq = requested[pending]
+        records = data[pending]
+
+        # Poids relus après la collecte : une requête envoyée après `publish` voit les nouveaux poids
+        if version.value != local_version:
+            with lock:
+                net.load_state_dict(shared_net.state_dict())
+                local_version = version.value
+            inference.stale = True
+            stats.swapped()
+
+        minimap = np.unpackbits(records["minimap"], axis=1).reshape(len(pending), *MINIMAP_SHAPE)
+        data["action"][pending] = inference.act(records["flat"], minimap)
+        answered[pending] = seq
+        stats.record((time.monotonic() - records["sent"]) * 1e6, len(pending))
+        for slot in pending.tolist():
+            answers[slot].release()
+
+
+class PolicyServer:
+    """Serveur local d'inférence : un processus, une copie de CombinedDQN, des batchs dynamiques.
+
+    Les clients (un par Env / ShooterEnvWrapper, dans n'importe quel processus)
+    déposent leurs observations dans une case en mémoire partagée ; le serveur
+    regroupe les requêtes en attente en un batch (au plus `max_batch`, au plus
+    `max_latency` secondes d'attente pour la plus ancienne) et répond par les
+    actions gloutonnes de DQNInference. `publish` remplace les poids (même
+    schéma version / verrou que train_distributed) ; le serveur les recharge
+    entre deux batchs. `stats` donne les percentiles de latence et
+    l'histogramme des tailles de batch.
+    """
+
+    def __init__(self, net, num_clients, max_batch=64, max_latency=0.001, compile=None, num_threads=None,
+                 ctx=None, stop=None):
+        ctx = ctx if ctx is not None else mp.get_context("spawn")
+        self.num_clients = num_clients
+        self.max_batch = max_batch
+        self.shared_net = CombinedDQN(flat_input_dim=FLAT_DIM, output_dim=ACTION_DIM)
+        self.shared_net.load_state_dict(net.state_dict())
+        self.shared_net.share_memory()
+        self.version = ctx.RawValue("q", 0)
+        self.lock = ctx.Lock()
+        self.stop = stop if stop is not None else ctx.Event()
+        self.requests = PolicyRequests(num_clients, ctx)
+        self.metrics = ServerStats(max_batch, ctx)
+        self._process = ctx.Process(
+            target=run_policy_server,
+            args=(self.requests, self.metrics, self.shared_net, self.version, self.lock, self.stop,
+                  max_batch, max_latency, compile, num_threads),
+            daemon=True,
+        )
+
+    def start(self):
+        self._process.start()
+        return self
+
+    def client(self, slot):
+        return PolicyClient(self.requests, slot, self.stop)
+
+    def publish(self, net):
+        """Nouveaux poids (par exemple `trainer.q_net`), pris en compte dès le batch suivant."""
+        with self.lock:
+            self.shared_net.load_state_dict(net.state_dict())
+            self.version.value += 1
+
+    def stats(self):
+        return self.metrics.summary()
+
+    def close(self):
+        self.stop.set()
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
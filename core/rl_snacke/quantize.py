@@ -0,0 +1,139 @@
+import copy
+import io
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization import (DeQuantStub, QuantStub, convert, fuse_modules, get_default_qconfig, prepare,
+                                   quantize_dynamic)
+
+from .inference import fold_conv_bn
+
+CALIBRATION_BATCH = 256
+
+
+class QuantizedConvStack(nn.Module):
+    """Les trois blocs convolutifs de CombinedDQN, BatchNorm fondue, prêts pour la quantification statique."""
+
+    def __init__(self, net):
+        super().__init__()
+        self.quant = QuantStub()
+        blocks = []
+        for block in (net.conv1, net.conv2, net.conv3):
+            conv = nn.Conv2d(block[0].in_channels, block[0].out_channels, block[0].kernel_size,
+                             padding=block[0].padding)
+            with torch.no_grad():
+                weight, bias = fold_conv_bn(block[0], block[1])
+                conv.weight.copy_(weight.cpu())
+                conv.bias.copy_(bias.cpu())
+            blocks.append(nn.Sequential(conv, nn.ReLU(), nn.MaxPool2d(2)))
+        self.blocks = nn.ModuleList(blocks)
+        self.dequant = DeQuantStub()
+
+    def forward(self, x):
+        x = self.quant(x)
+        for block in self.blocks:
+            x = block(x)
+        return self.dequant(x).flatten(1)  # ordre NCHW, comme CombinedDQN
+
+
+class QuantizedDQN(nn.Module):
+    """CombinedDQN int8 pour les acteurs (CPU) : seules les actions gloutonnes comptent.
+
+    Les convolutions sont quantifiées statiquement (activations calibrées sur
+    des minimaps, `quantize_actor`), les couches linéaires dynamiquement
+    (poids int8, activations quantifiées à la volée).
+    """
+
+    def __init__(self, net):
+        super().__init__()
+        self.convs = QuantizedConvStack(net)
+        self.flat_fc1 = copy.deepcopy(net.flat_fc1).cpu()
+        self.flat_fc2 = copy.deepcopy(net.flat_fc2).cpu()
+        self.fc_combined = copy.deepcopy(net.fc_combined).cpu()
+        self.out = copy.deepcopy(net.out).cpu()
+        self.requires_grad_(False)
+        self.eval()
+
+    def forward(self, flat_input, minimap_input):
+        x = self.convs(minimap_input)
+        f = F.relu(self.flat_fc1(flat_input))
+        f = F.relu(self.flat_fc2(f))
+        combined = F.relu(self.fc_combined(torch.cat((x, f), dim=1)))
+        return self.out(combined)
+
+    def act(self, flat_batch, minimap_batch):
+        """Actions gloutonnes (N,) en int64 pour des tableaux (N, flat) et (N, C, H, W)."""
+        flat = torch.as_tensor(np.asarray(flat_batch, dtype=np.float32))
+        minimap = torch.as_tensor(np.asarray(minimap_batch, dtype=np.float32))
+        with torch.inference_mode():
+            return self(flat, minimap).argmax(1).numpy()
+
+
+def quantize_actor(net, calibration_minimaps, backend=None):
+    """Copie int8 de `net` (CombinedDQN, inchangé) pour l'action.
+
+    `calibration_minimaps` (N, C, H, W) fixe les échelles des activations
+    des convolutions : des minimaps du replay buffer (`replay_states`).
+    `backend` : moteur de torch.backends.quantized (par défaut celui en cours).
+    """
+    if backend is not None:
+        torch.backends.quantized.engine = backend
+    model = QuantizedDQN(net)
+    convs = model.convs
+    fuse_modules(convs, [[f"blocks.{i}.0", f"blocks.{i}.1"] for i in range(len(convs.blocks))], inplace=True)
+    convs.qconfig = get_default_qconfig(torch.backends.quantized.engine)
+    prepare(convs, inplace=True)
+    minimaps = np.asarray(calibration_minimaps, dtype=np.float32)
+    with torch.no_grad():
+        for start in range(0, len(minimaps), CALIBRATION_BATCH):
+            convs(torch.from_numpy(minimaps[start:start + CALIBRATION_BATCH]))
+    convert(convs, inplace=True)
+    return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def replay_states(buffer, calibration_size, held_out_size=0):
+    """États de transitions distinctes du replay buffer : (flat, minimaps) de calibration, puis de test.
+
+    Les slots sont tirés uniformément sans remise (flux du buffer), y compris
+    pour un PrioritizedReplayBuffer dont le tirage stratifié peut répéter un
+    slot : les deux ensembles sont disjoints, l'accord des actions se mesure
+    sur des états qui n'ont pas servi à calibrer.
+    """
+    count = calibration_size + held_out_size
+    if count > len(buffer):
+        raise ValueError(f"replay buffer holds {len(buffer)} transitions, "
+                         f"{calibration_size} + {held_out_size} distinct states requested")
+    positions = buffer.rng.choice(len(buffer), count, replace=False)
+    flat, minimaps = buffer._gather((buffer._start + positions) % buffer.capacity)[:2]
+    return ((flat[:calibration_size], minimaps[:calibration_size]),
+            (flat[calibration_size:], minimaps[calibration_size:]))
+
+
+def action_agreement(net, quantized, flat_batch, minimap_batch):
+    """Part des états où `quantized` choisit la même action que `net` (fp32, mode eval)."""
+    was_training = net.training
+    net.eval()
+    device = next(net.parameters()).device
+    with torch.no_grad():
+        expected = net(torch.as_tensor(np.asarray(flat_batch, dtype=np.float32), device=device),
+                       torch.as_tensor(np.asarray(minimap_batch, dtype=np.float32), device=device))
+    net.train(was_training)
+    return float((quantized.act(flat_batch, minimap_batch) == expected.argmax(1).cpu().numpy()).mean())
+
+
+def model_bytes(module):
+    """Taille du state_dict sérialisé : poids int8 + échelles pour un modèle quantifié."""
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+def export_actor(quantized, path, flat_batch, minimap_batch):
+    """Sauvegarde TorchScript tracée sur des états d'exemple ; un acteur la recharge
+    par `torch.jit.load`, sans CombinedDQN."""
+    example = (torch.as_tensor(np.asarray(flat_batch, dtype=np.float32)),
+               torch.as_tensor(np.asarray(minimap_batch, dtype=np.float32)))
+    with torch.no_grad():
+        torch.jit.save(torch.jit.trace(quantized, example, check_trace=False), path)
@@ -1,27 +1,321 @@
-import random
+from collections import OrderedDict
+
 import numpy as np
-from collections import deque
+
 
 class ReplayBuffer:
-    def __init__(self, capacity):
-        self.buffer = deque(maxlen=capacity)
-        
+    """Replay buffer circulaire préalloué qui ne stocke chaque observation qu'une fois.
+
+    Les observations (état plat + minimap) vivent dans un anneau de frames et une
+    transition ne garde que les indices de son état et de son état suivant. Quand
+    `push` reçoit comme état l'état suivant d'une transition précédente (le cas de
+    la boucle d'entraînement, même avec plusieurs environnements entrelacés), la
+    frame déjà écrite est réutilisée.
+
+    Les minimaps sont des masques binaires : elles sont stockées bit à bit
+    (`minimap_storage="bits"`) ou en uint8, et ne redeviennent des float32 que
+    pour le batch échantillonné.
+    """
+
+    prioritized = False
+    max_streams = 1024  # états suivants en attente de réutilisation (un par env en cours)
+
+    def __init__(self, capacity, frame_capacity=None, minimap_storage="bits", rng=None):
+        if minimap_storage not in ("bits", "uint8"):
+            raise ValueError(f"unknown minimap_storage: {minimap_storage!r}")
+        self.capacity = capacity
+        # Une frame par transition + une par début d'épisode
+        self.frame_capacity = frame_capacity or capacity + capacity // 8 + 1
+        self.minimap_storage = minimap_storage
+
+        # Transitions ; state_ids/next_ids sont des numéros de frame globaux
+        self.state_ids = np.zeros(capacity, dtype=np.int64)
+        self.next_ids = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self._start = 0  # slot de la transition la plus ancienne
+        self._size = 0
+
+        # Frames, allouées au premier push quand les formes sont connues
+        self.flat_frames = None
+        self.minimap_frames = None
+        self.minimap_shape = None
+        self._frames_written = 0
+        self._pending = OrderedDict()  # id(état suivant) -> (flat, minimap, frame id)
+
+        # Generator (ou graine) de l'échantillonnage ; DQNTrainer lui donne un flux dérivé du sien
+        self.rng = np.random.default_rng(rng)
+        self._batch_buffers = {}
+
+    def _allocate(self, flat_state, minimap):
+        flat_state = np.asarray(flat_state)
+        minimap = np.asarray(minimap)
+        self.minimap_shape = minimap.shape
+        self.flat_frames = np.zeros((self.frame_capacity,) + flat_state.shape, dtype=np.float32)
+        if self.minimap_storage == "bits":
+            packed_size = (minimap.size + 7) // 8
+            self.minimap_frames = np.zeros((self.frame_capacity, packed_size), dtype=np.uint8)
+        else:
+            self.minimap_frames = np.zeros((self.frame_capacity,) + minimap.shape, dtype=np.uint8)
+
+    def _encode_minimap(self, minimap):
+        minimap = np.asarray(minimap)
+        if self.minimap_storage == "bits":
+            return np.packbits(minimap.reshape(-1) != 0)
+        return minimap
+
+    def _decode_minimaps(self, frames):
+        if self.minimap_storage == "bits":
+            size = int(np.prod(self.minimap_shape))
+            bits = np.unpackbits(frames, axis=1, count=size)
+            return bits.reshape((len(frames),) + self.minimap_shape).astype(np.float32)
+        return frames.astype(np.float32)
+
+    def _write_frame(self, flat_state, minimap):
+        frame_id = self._frames_written
+        # Évince les transitions dont l'état serait écrasé par cette frame
+        overwritten = frame_id - self.frame_capacity
+        while self._size and self.state_ids[self._start] <= overwritten:
+            self._evict_oldest()
+
+        slot = frame_id % self.frame_capacity
+        self.flat_frames[slot] = flat_state
+        self.minimap_frames[slot] = self._encode_minimap(minimap)
+        self._frames_written += 1
+        return frame_id
+
+    def _evict_oldest(self):
+        self._start = (self._start + 1) % self.capacity
+        self._size -= 1
+
     def push(self, flat_state, minimap, action, reward, flat_next_state, next_minimap, done):
-        self.buffer.append((flat_state, minimap, action, reward, flat_next_state, next_minimap, done))
+        if self.flat_frames is None:
+            self._allocate(flat_state, minimap)
 
-    def sample(self, batch_size):
-        samples = random.sample(self.buffer, batch_size)
-        flat_s, minimap_s, a, r, flat_s2, minimap_s2, d = zip(*samples)
+        pending = self._pending.pop(id(flat_state), None)
+        if (pending is not None and flat_state is pending[0] and minimap is pending[1]
+                and pending[2] > self._frames_written - self.frame_capacity  # doit survivre à l'écriture de next_id
+                and np.array_equal(self.flat_frames[pending[2] % self.frame_capacity], flat_state)):
+            state_id = pending[2]
+        else:
+            state_id = self._write_frame(flat_state, minimap)
+        next_id = self._write_frame(flat_next_state, next_minimap)
+        if not done:
+            self._pending[id(flat_next_state)] = (flat_next_state, next_minimap, next_id)
+            if len(self._pending) > self.max_streams:
+                self._pending.popitem(last=False)
 
+        if self._size == self.capacity:
+            self._evict_oldest()
+        slot = (self._start + self._size) % self.capacity
+        self._size += 1
+
+        self.state_ids[slot] = state_id
+        self.next_ids[slot] = next_id
+        self.actions[slot] = action
+        self.rewards[slot] = reward
+        self.dones[slot] = done
+
+    def _gather(self, slots):
+        states = self.state_ids[slots] % self.frame_capacity
+        next_states = self.next_ids[slots] % self.frame_capacity
         return (
-            np.array(flat_s),
-            np.array(minimap_s),
-            np.array(a),
-            np.array(r),
-            np.array(flat_s2),
-            np.array(minimap_s2),
-            np.array(d)
+            self.flat_frames[states],
+            self._decode_minimaps(self.minimap_frames[states]),
+            self.actions[slots],
+            self.rewards[slots],
+            self.flat_frames[next_states],
+            self._decode_minimaps(self.minimap_frames[next_states]),
+            self.dones[slots],
         )
 
+    def _sample_slots(self, batch_size):
+        positions = self.rng.choice(self._size, batch_size, replace=False)
+        return (self._start + positions) % self.capacity
+
+    def sample(self, batch_size):
+        return self._gather(self._sample_slots(batch_size))
+
+    def _tensor_batch(self, batch_size, pin_memory):
+        """Buffers torch réutilisés d'un appel à l'autre, avec leurs vues NumPy."""
+        import torch  # import local : SumTree, push et sample n'ont pas besoin de torch
+        key = (batch_size, pin_memory)
+        batch = self._batch_buffers.get(key)
+        if batch is None:
+            flat_shape = (batch_size,) + self.flat_frames.shape[1:]
+            minimap_shape = (batch_size,) + self.minimap_shape
+            specs = [
+                (flat_shape, np.float32), (minimap_shape, np.float32),
+                ((batch_size, 1), np.int64), ((batch_size, 1), np.float32),
+                (flat_shape, np.float32), (minimap_shape, np.float32),
+                ((batch_size, 1), np.float32),
+            ]
+            arrays = [np.empty(shape, dtype=dtype) for shape, dtype in specs]
+            tensors = [torch.from_numpy(array) for array in arrays]
+            if pin_memory:
+                # Copie unique vers de la mémoire verrouillée, puis vues NumPy dessus
+                tensors = [tensor.pin_memory() for tensor in tensors]
+                arrays = [tensor.numpy() for tensor in tensors]
+            batch = self._batch_buffers[key] = (arrays, tensors)
+        return batch
+
+    def _decode_minimaps_into(self, frame_slots, out):
+        frames = self.minimap_frames[frame_slots]
+        if self.minimap_storage == "bits":
+            # Conversion uint8 -> float32 écrite directement dans le buffer de sortie
+            out.reshape(len(out), -1)[...] = np.unpackbits(frames, axis=1, count=out[0].size)
+        else:
+            out[...] = frames
+
+    def sample_tensors(self, batch_size, device=None, pin_memory=False):
+        """Échantillonne directement dans des tenseurs torch préalloués.
+
+        Retourne (flat, minimap, action, reward, next_flat, next_minimap, done) ;
+        action/reward/done sont de forme (B, 1).
+
+        Attention : sur CPU, ce sont toujours les mêmes tenseurs pour une même
+        taille de batch (et `pin_memory`). Le prochain appel les réécrit en
+        place, y compris les tenseurs déjà rendus : un batch à garder au-delà
+        de l'appel suivant (file de batchs, moyenne sur plusieurs tirages…)
+        doit être copié (`tensor.clone()`). Sur GPU, `.to(device)` renvoie des
+        copies qui ne sont pas réécrites.
+        """
+        return self._gather_tensors(self._sample_slots(batch_size), device, pin_memory)
+
+    def _gather_tensors(self, slots, device, pin_memory):
+        import torch
+        arrays, tensors = self._tensor_batch(len(slots), pin_memory)
+        flat, minimap, actions, rewards, next_flat, next_minimap, dones = arrays
+
+        states = self.state_ids[slots] % self.frame_capacity
+        next_states = self.next_ids[slots] % self.frame_capacity
+
+        np.take(self.flat_frames, states, axis=0, out=flat)
+        np.take(self.flat_frames, next_states, axis=0, out=next_flat)
+        self._decode_minimaps_into(states, minimap)
+        self._decode_minimaps_into(next_states, next_minimap)
+        np.take(self.actions, slots, out=actions.reshape(-1))
+        np.take(self.rewards, slots, out=rewards.reshape(-1))
+        dones[:, 0] = self.dones[slots]
+
+        if device is not None and torch.device(device).type != "cpu":
+            return tuple(tensor.to(device, non_blocking=pin_memory) for tensor in tensors)
+        return tuple(tensors)
+
+    def memory_bytes(self):
+        arrays = [self.state_ids, self.next_ids, self.actions, self.rewards, self.dones]
+        if self.flat_frames is not None:
+            arrays += [self.flat_frames, self.minimap_frames]
+        return sum(array.nbytes for array in arrays)
+
     def __len__(self):
-        return len(self.buffer)
+        return self._size
+
+
+class SumTree:
+    """Arbre de sommes stocké dans un tableau : feuilles en [size, size + capacity).
+
+    Mises à jour et tirages sont vectorisés sur un batch d'indices, en O(log n).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.depth = self.size.bit_length() - 1
+        self.tree = np.zeros(2 * self.size, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.size + np.asarray(indices)]
+
+    def update(self, indices, values):
+        nodes = self.size + np.asarray(indices, dtype=np.int64)
+        self.tree[nodes] = values
+        for _ in range(self.depth):
+            nodes //= 2
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Feuille dont l'intervalle de somme cumulée contient chaque valeur.
+
+        Une valeur n'entre jamais dans un sous-arbre de somme nulle : avec les
+        arrondis, la somme d'un nœud peut dépasser celle de ses enfants, et une
+        valeur au-delà du fils gauche reste à gauche si le fils droit est vide
+        (elle finit sur la dernière feuille non nulle).
+        """
+        values = np.minimum(values, np.nextafter(self.total(), 0))
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            go_right = (values >= left) & (self.tree[2 * nodes + 1] > 0)
+            values = np.where(go_right, values - left, values)
+            nodes = 2 * nodes + go_right
+        return nodes - self.size
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Replay buffer à priorités proportionnelles (Schaul et al.) sur un sum-tree.
+
+    `sample`/`sample_tensors` renvoient en plus les poids d'importance (B, 1) et
+    les slots tirés, à repasser à `update_priorities` avec les erreurs TD.
+    """
+
+    prioritized = True
+
+    def __init__(self, capacity, alpha=0.6, beta=0.4, beta_increment=1e-5, epsilon=1e-5, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self._weights = {}
+
+    def _evict_oldest(self):
+        self.tree.update([self._start], [0.0])
+        super()._evict_oldest()
+
+    def push(self, *transition):
+        super().push(*transition)
+        slot = (self._start + self._size - 1) % self.capacity
+        self.tree.update([slot], [self.max_priority ** self.alpha])
+
+    def _sample_slots(self, batch_size):
+        # Tirage stratifié : un tirage par segment de la masse totale
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        return self.tree.find(values)
+
+    def _importance_weights(self, slots):
+        probabilities = self.tree.get(slots) / self.tree.total()
+        weights = (self._size * probabilities) ** (-self.beta)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return (weights / weights.max()).astype(np.float32)
+
+    def sample(self, batch_size):
+        slots = self._sample_slots(batch_size)
+        return self._gather(slots) + (self._importance_weights(slots)[:, None], slots)
+
+    def sample_tensors(self, batch_size, device=None, pin_memory=False):
+        import torch
+        slots = self._sample_slots(batch_size)
+        batch = self._gather_tensors(slots, device, pin_memory)
+        if batch_size not in self._weights:
+            array = np.empty((batch_size, 1), dtype=np.float32)
+            self._weights[batch_size] = (array, torch.from_numpy(array))
+        array, weights = self._weights[batch_size]
+        array[:, 0] = self._importance_weights(slots)
+        if device is not None and torch.device(device).type != "cpu":
+            return batch + (weights.to(device), slots)
+        return batch + (weights, slots)
+
+    def update_priorities(self, slots, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(slots, priorities ** self.alpha)
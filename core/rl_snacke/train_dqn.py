@@ -1,5 +1,6 @@
 from .dqn_model import CombinedDQN
-from .replay_buffer import ReplayBuffer
+from .inference import DQNInference, configure_threads
+from .replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
 
 
 import torch
@@ -8,11 +9,52 @@ import numpy as np
 import torch.optim as optim
 import torch.nn.functional as F
 
+TARGET_UPDATES = ("hard", "soft")
+
+
+class LearnerSchedule:
+    """Quand et combien apprendre, compté en pas d'environnement (DQNTrainer.observe).
+
+    - `replay_ratio` : pas de gradient par pas d'environnement (0.25 = un pas
+      tous les quatre, 2 = deux par pas) ; la fraction due s'accumule d'un
+      appel à l'autre.
+    - `updates_per_sample` (K) : les pas dus sont faits par paquets de K sur
+      un seul tirage de K × batch_size transitions, découpé en K minibatchs.
+    - `warmup` : pas d'apprentissage tant que le replay buffer a moins de
+      transitions que ça (et jamais moins de K × batch_size).
+    - `target_update` : "hard" recopie q_net dans target_net tous les
+      `target_period` pas de gradient, "soft" fait une moyenne de Polyak
+      (poids cible ← tau × q_net + (1 - tau) × cible) après chaque pas.
+    """
+
+    def __init__(self, replay_ratio=1.0, updates_per_sample=1, warmup=0, target_update="hard",
+                 target_period=1000, tau=0.005):
+        if target_update not in TARGET_UPDATES:
+            raise ValueError(f"target_update must be 'hard' or 'soft', got {target_update!r}")
+        if replay_ratio < 0 or updates_per_sample < 1:
+            raise ValueError("replay_ratio must be >= 0 and updates_per_sample >= 1")
+        self.replay_ratio = replay_ratio
+        self.updates_per_sample = updates_per_sample
+        self.warmup = warmup
+        self.target_update = target_update
+        self.target_period = target_period
+        self.tau = tau
+        self.credit = 0.0  # pas de gradient dus, pas encore faits
+
+
 class DQNTrainer:
-    def __init__(self, state_dim, action_dim, device='cpu'):
+    def __init__(self, state_dim, action_dim, device='cpu', prioritized=False, rng=None, schedule=None):
         self.device = torch.device(device)
-        self.q_net = CombinedDQN(flat_input_dim=state_dim, output_dim=action_dim).to(self.device)
-        self.target_net = CombinedDQN(flat_input_dim=state_dim, output_dim=action_dim).to(self.device)
+        # Exploration epsilon-greedy ; le replay buffer et les poids initiaux tirent dans des flux dérivés
+        self.rng = np.random.default_rng(rng)
+        buffer_rng, torch_rng = self.rng.spawn(2)
+        # Sans graine, les poids viennent du générateur global de torch (torch.manual_seed)
+        self.torch_seed = None if rng is None else int(torch_rng.integers(2 ** 63))
+        with torch.random.fork_rng(devices=[], enabled=self.torch_seed is not None):
+            if self.torch_seed is not None:
+                torch.manual_seed(self.torch_seed)
+            self.q_net = CombinedDQN(flat_input_dim=state_dim, output_dim=action_dim).to(self.device)
+            self.target_net = CombinedDQN(flat_input_dim=state_dim, output_dim=action_dim).to(self.device)
 
         # self.q_net = DQN(state_dim, action_dim).to(self.device)
         # self.target_net = DQN(state_dim, action_dim).to(self.device)
@@ -20,7 +62,10 @@ class DQNTrainer:
         self.target_net.eval()
 
         self.optimizer = optim.Adam(self.q_net.parameters(), lr=1e-3)
-        self.replay_buffer = ReplayBuffer(capacity=50000)
+        if prioritized:
+            self.replay_buffer = PrioritizedReplayBuffer(capacity=50000, rng=buffer_rng)
+        else:
+            self.replay_buffer = ReplayBuffer(capacity=50000, rng=buffer_rng)
         self.batch_size = 64
         self.gamma = 0.99
 
@@ -31,20 +76,49 @@ class DQNTrainer:
         
         self.action_dim =action_dim
 
+        # Rythme d'apprentissage de observe() et mise à jour du réseau cible
+        self.schedule = schedule if schedule is not None else LearnerSchedule()
+        self.env_steps = 0
+        self.grad_steps = 0
+
+        # DQNInference de q_net pour choisir les actions (enable_inference), sinon forward eager
+        self.inference = None
+
+    def enable_inference(self, channels_last=True, compile=None, num_threads=None, num_interop_threads=None):
+        """Choisit les actions avec une copie d'inférence de q_net (BatchNorm fondue, channels_last,
+        graphe tracé ou compilé en option), remise à jour après chaque pas de gradient.
 
+        Comme le forward eager de select_action / select_actions, les actions
+        utilisent les statistiques courantes de la BatchNorm (mode eval).
+        """
+        configure_threads(num_threads, num_interop_threads)
+        self.inference = DQNInference(self.q_net, channels_last=channels_last, compile=compile)
+        return self.inference
+    
+    def quantized_actor(self, calibration_size=512, backend=None):
+        """Copie int8 de q_net pour les acteurs (QuantizedDQN, CPU), calibrée sur des minimaps du replay buffer."""
+        from .quantize import quantize_actor, replay_states  # import local : torch.ao seulement si on quantifie
+        (_, minimaps), _ = replay_states(self.replay_buffer, min(calibration_size, len(self.replay_buffer)))
+        return quantize_actor(self.q_net, minimaps, backend=backend)
     
     def select_action(self, flat_state, minimap_tensor,epoche =51):
-        flat_state_tensor = torch.FloatTensor(flat_state).unsqueeze(0).to(self.device)
-        minimap_tensor = torch.FloatTensor(minimap_tensor).unsqueeze(0).to(self.device)  # (1, C, H, W)
-        
-
-        if np.random.rand() < self.epsilon:
-            action = np.random.randint(0, self.action_dim)
+        if self.rng.random() < self.epsilon:
+            action = int(self.rng.integers(self.action_dim))
+        elif self.inference is not None:
+            action = int(self.inference.act(flat_state[None], minimap_tensor[None])[0])
         else:
+            # Les tensors ne sont construits que si on passe par le réseau
+            flat_state_tensor = torch.FloatTensor(flat_state).unsqueeze(0).to(self.device)
+            minimap_tensor = torch.FloatTensor(minimap_tensor).unsqueeze(0).to(self.device)  # (1, C, H, W)
+            # Mode eval, comme select_actions : BatchNorm sur ses statistiques courantes, sans les modifier
+            was_training = self.q_net.training
+            self.q_net.eval()
             with torch.no_grad():
                 q_values = self.q_net(flat_state_tensor, minimap_tensor)
                 action = q_values.argmax().item()
-                
+            self.q_net.train(was_training)
+
+
         if epoche <=10:
             self.epsilon_min = 0.1
         else:
@@ -54,24 +128,103 @@ class DQNTrainer:
     
         return action
 
+    def select_actions(self, flat_batch, minimap_batch, epsilons=None):
+        """Actions epsilon-greedy pour N environnements avec un seul forward.
+
+        `epsilons` est un scalaire ou un tableau (N,) pour un epsilon par
+        environnement (par défaut `self.epsilon`, sans le faire décroître).
+        Les lignes qui explorent ne passent pas par le réseau. Le forward se fait
+        en mode eval pour que les lignes du batch ne s'influencent pas via BatchNorm.
+        """
+        n = len(flat_batch)
+        if epsilons is None:
+            epsilons = self.epsilon
+        epsilons = np.broadcast_to(np.asarray(epsilons, dtype=np.float64), (n,))
+
+        explore = self.rng.random(n) < epsilons
+        actions = self.rng.integers(0, self.action_dim, size=n)
+        greedy = np.flatnonzero(~explore)
+        if greedy.size and self.inference is not None:
+            actions[greedy] = self.inference.act(np.asarray(flat_batch)[greedy], np.asarray(minimap_batch)[greedy])
+        elif greedy.size:
+            flat = torch.from_numpy(np.asarray(flat_batch, dtype=np.float32)[greedy]).to(self.device)
+            minimap = torch.from_numpy(np.asarray(minimap_batch, dtype=np.float32)[greedy]).to(self.device)
+            was_training = self.q_net.training
+            self.q_net.eval()
+            with torch.no_grad():
+                actions[greedy] = self.q_net(flat, minimap).argmax(1).cpu().numpy()
+            self.q_net.train(was_training)
+        return actions
+
 
     def train_step(self):
         if len(self.replay_buffer) < self.batch_size:
             return  # Pas assez d'échantillons
+        self.train_steps(1)
+
+    def observe(self, env_steps=1):
+        """Compte `env_steps` pas d'environnement et fait les pas de gradient dus
+        selon `self.schedule` ; renvoie le nombre de pas de gradient faits."""
+        schedule = self.schedule
+        self.env_steps += env_steps
+        k = schedule.updates_per_sample
+        if len(self.replay_buffer) < max(schedule.warmup, k * self.batch_size):
+            return 0
+        schedule.credit += env_steps * schedule.replay_ratio
+        steps = 0
+        while schedule.credit >= k:
+            self.train_steps(k)
+            schedule.credit -= k
+            steps += k
+        return steps
+
+    def train_steps(self, k):
+        """`k` pas de gradient sur un seul tirage de k × batch_size transitions (k minibatchs disjoints)."""
+        # === Sample (directement en tensors, sans copie intermédiaire) ===
+        batch = self.replay_buffer.sample_tensors(k * self.batch_size, device=self.device)
+        prioritized = self.replay_buffer.prioritized
+        if prioritized:
+            *batch, weights, indices = batch
+        for i in range(k):
+            rows = slice(i * self.batch_size, (i + 1) * self.batch_size)
+            minibatch = [tensor[rows] for tensor in batch]
+            if prioritized:
+                td_errors = self._learn(*minibatch, weights=weights[rows])
+                self.replay_buffer.update_priorities(indices[rows], td_errors)
+            else:
+                self._learn(*minibatch)
+            self._after_update()
 
-        # === Sample ===
-        flat_states, minimaps, actions, rewards, flat_next_states, next_minimaps, dones = self.replay_buffer.sample(self.batch_size)
+    def _after_update(self):
+        self.grad_steps += 1
+        schedule = self.schedule
+        if schedule.target_update == "soft":
+            self.soft_update_target(schedule.tau)
+        elif self.grad_steps % schedule.target_period == 0:
+            self.update_target()
 
-        # === Conversion en tensors ===
-        flat_states = torch.FloatTensor(flat_states).to(self.device)
-        minimaps = torch.FloatTensor(minimaps).to(self.device)
+    def pretrain(self, dataset, epochs=1, batch_size=None, seed=None):
+        """Entraînement hors ligne sur un `MinimapDataset` (transitions journalisées).
 
-        actions = torch.LongTensor(actions).unsqueeze(1).to(self.device)
-        rewards = torch.FloatTensor(rewards).unsqueeze(1).to(self.device)
-        flat_next_states = torch.FloatTensor(flat_next_states).to(self.device)
-        next_minimaps = torch.FloatTensor(next_minimaps).to(self.device)
-        dones = torch.FloatTensor(dones).unsqueeze(1).to(self.device)
+        Même mise à jour que `train_step`, mais chaque époque parcourt tout le
+        dataset dans un ordre mélangé au lieu de tirer dans le replay buffer.
+        Le réseau cible suit `self.schedule` (hard / soft) et chaque batch
+        compte dans `grad_steps` ; replay_ratio et warmup ne s'appliquent pas.
+        """
+        batch_size = batch_size or self.batch_size
+        steps = 0
+        for epoch in range(epochs):
+            # Sans graine, l'ordre des batchs vient du flux du trainer
+            epoch_seed = self.rng if seed is None else seed + epoch
+            for batch in dataset.batches(batch_size, shuffle=True, seed=epoch_seed):
+                self._learn(*(torch.from_numpy(array).to(self.device) for array in batch))
+                self._after_update()
+                steps += 1
+        return steps
 
+    def _learn(self, flat_states, minimaps, actions, rewards, flat_next_states, next_minimaps, dones,
+               weights=None):
+        """Un pas de gradient Double DQN ; renvoie les erreurs TD si `weights` est donné."""
         # === Q(s, a) ===
         q_values = self.q_net(flat_states, minimaps).gather(1, actions)
 
@@ -82,14 +235,35 @@ class DQNTrainer:
             target_q = rewards + self.gamma * next_q_values * (1 - dones)
 
         # === Perte et descente de gradient ===
-        loss = F.smooth_l1_loss(q_values, target_q)
+        td_errors = None
+        if weights is not None:
+            # Pondération d'importance, puis nouvelles priorités = |erreur TD|
+            losses = F.smooth_l1_loss(q_values, target_q, reduction='none')
+            loss = (weights * losses).mean()
+            td_errors = (target_q - q_values).detach().squeeze(1).cpu().numpy()
+        else:
+            loss = F.smooth_l1_loss(q_values, target_q)
 
         self.optimizer.zero_grad()
         loss.backward()
         nn.utils.clip_grad_norm_(self.q_net.parameters(), max_norm=1.0)
         self.optimizer.step()
+        if self.inference is not None:
+            self.inference.stale = True  # convolutions et BatchNorm ont changé
+        return td_errors
 
     
     def update_target(self):
         """ Met à jour le réseau cible avec les poids du réseau principal """
         self.target_net.load_state_dict(self.q_net.state_dict())
+
+    @torch.no_grad()
+    def soft_update_target(self, tau):
+        """Moyenne de Polyak : cible ← tau × q_net + (1 - tau) × cible (statistiques de BatchNorm comprises)."""
+        for target, source in zip(self.target_net.parameters(), self.q_net.parameters()):
+            target.lerp_(source, tau)
+        for target, source in zip(self.target_net.buffers(), self.q_net.buffers()):
+            if target.is_floating_point():
+                target.lerp_(source, tau)
+            else:
+                target.copy_(source)  # num_batches_tracked
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class RandomStream:
+    """Flux aléatoire d'un Env (cibles, actions aléatoires des serpents) sur un `numpy.random.Generator`.
+
+    Les tirages scalaires de la simulation passent par des flottants tirés par
+    blocs de `block` : même coût qu'un appel à `random`, sans état global.
+    Deux flux créés avec la même graine donnent exactement les mêmes tirages ;
+    les flux de `spawn` sont indépendants entre eux.
+    """
+
+    block = 1024
+
+    def __init__(self, seed=None):
+        self.generator = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        self._buffer = []
+
+    def random(self):
+        """Flottant uniforme dans [0, 1)."""
+        if not self._buffer:
+            self._buffer = self.generator.random(self.block).tolist()
+        return self._buffer.pop()
+
+    def randbelow(self, n):
+        """Entier uniforme dans [0, n)."""
+        return min(int(self.random() * n), n - 1)
+
+    def choice(self, seq):
+        return seq[self.randbelow(len(seq))]
+
+    def spawn(self, n):
+        """`n` flux indépendants, dérivés de la graine de celui-ci."""
+        return [RandomStream(generator) for generator in self.generator.spawn(n)]
+
+
+def as_stream(rng=None):
+    """RandomStream depuis une graine (int, SeedSequence, Generator) ; un RandomStream est partagé tel quel."""
+    return rng if isinstance(rng, RandomStream) else RandomStream(rng)
+
+
+def spawn_seeds(seed, n):
+    """`n` graines indépendantes dérivées de `seed` (SeedSequence racine)."""
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root.spawn(n)
@@ -1,8 +1,9 @@
 from collections import deque
-import random
-from config import GRID_HEIGHT, GRID_WIDTH
+from core.arena import DEFAULT_ARENA
 from core.point import Point
-import numpy as np
+from core.occupancy import OccupancyGrid
+from core.seeding import as_stream
+import math
 
 ACTION = {
             "UP": (0, -1),
@@ -12,8 +13,14 @@ ACTION = {
         }
 
 class Snake:
-    def __init__(self, start: Point, cell_size: int ,range_radius:int=10,fov_deg:int=90,etype='snake'):
+    def __init__(self, start: Point, cell_size: int ,range_radius:int=10,fov_deg:int=90,etype='snake', arena=None,
+                 occupancy=None, rng=None):
+        self.arena = arena or DEFAULT_ARENA
+        self.rng = as_stream(rng)  # RandomStream de l'Env : decide_action
         self.body = deque([start])
+        # Grille partagée par tous les serpents d'un Env (collisions entre serpents)
+        self.occupancy = occupancy if occupancy is not None else OccupancyGrid(self.arena.width, self.arena.height)
+        self.occupancy.add(start.x, start.y)
         # self.body = deque([start]+[Point(start.x +i, start.y) for i in range(10)])
         self.direction = "RIGHT"
         self.grow_next = False
@@ -22,7 +29,7 @@ class Snake:
         self.facing_angle = 0.0
         
         self.range = range_radius
-        self.fov = np.deg2rad(fov_deg)
+        self.fov = math.radians(fov_deg)
         self.alive = True
 
     def set_direction(self, dir):
@@ -35,12 +42,14 @@ class Snake:
         head = self.head()
         dx, dy = ACTION[self.direction]
         
-        self.facing_angle = np.arctan2(dy, dx)
+        self.facing_angle = math.atan2(dy, dx)
 
         new_head = Point(head.x + dx, head.y + dy)
         self.body.appendleft(new_head)
+        self.occupancy.add(new_head.x, new_head.y)
         if not self.grow_next:
-            self.body.pop()
+            tail = self.body.pop()
+            self.occupancy.remove(tail.x, tail.y)
         else:
             self.grow_next = False
 
@@ -48,13 +57,14 @@ class Snake:
         self.grow_next = True
 
     def is_collision(self):
-        return self.head() in list(self.body)[1:]
+        head = self.head()
+        return self.occupancy.count(head.x, head.y) > 1
 
     def to_dict(self):
         return [p.to_dict() for p in self.body]
 
     def _angle_diff(self, a, b):
-        diff = (a - b + np.pi) % (2 * np.pi) - np.pi
+        diff = (a - b + math.pi) % (2 * math.pi) - math.pi
         return diff
     
     def facing(self):
@@ -66,17 +76,22 @@ class Snake:
         
     def decide_action(self):
         directions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
-        action = random.choice(directions)
+        action = self.rng.choice(directions)
         return action
 
     
     def get_vision(self, objects):
+        """Objets vivants dans le cône de vision. `objects` est une liste ou un
+        SpatialIndex (seuls les seaux à portée sont alors parcourus)."""
         vision = []
         self.effective_range = self.range
         self.effective_fov = self.fov
         
         
-        vec_self = self.head()
+        head = self.head()
+        hx, hy = head.x, head.y
+        if hasattr(objects, "in_cone"):
+            return objects.in_cone(hx, hy, self.effective_range, self.facing_angle, self.effective_fov)
         # for body in self.body[1:]:
         #     vec = vec_self.direction_to(body)   
         #     dist = vec.length()
@@ -98,13 +113,15 @@ class Snake:
 
             vec_obj = obj.position
             
-            vec = vec_self.direction_to(vec_obj)   
-            dist = vec.length()
+            # vecteur cible -> tête, comme head.direction_to(vec_obj)
+            vx = hx - vec_obj.x
+            vy = hy - vec_obj.y
+            dist = math.hypot(vx, vy)
             
             if dist > self.effective_range:
                 continue         
 
-            direction = np.arctan2(vec.y, vec.x)
+            direction = math.atan2(vy, vx)
             delta = self._angle_diff(direction, self.facing_angle)
 
             if abs(delta) <= self.effective_fov / 2:
@@ -117,8 +134,7 @@ class Snake:
         me = self.head()
         dx = point.x - me.x
         dy = point.y - me.y
-        vec = np.array([dx, dy])
-        norm = np.linalg.norm(vec)
+        norm = math.hypot(dx, dy)
 
         if norm != 0:
             dx, dy = dx / norm, dy / norm
@@ -139,6 +155,6 @@ class Snake:
         me = self.head()
         dx = point.x - me.x
         dy = point.y - me.y
-        return np.arctan2(dy, dx)  # angle en radians entre -π et π
+        return math.atan2(dy, dx)  # angle en radians entre -π et π
 
 
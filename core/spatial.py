@@ -0,0 +1,176 @@
+import math
+
+from config import GRID_WIDTH, GRID_HEIGHT
+
+
+class SpatialIndex:
+    """Index spatial en seaux carrés de `bucket_size` cases sur les entités de l'arène.
+
+    Les entités (cibles, objets) ont une `position` (Point), un `alive` et un
+    `etype`. Chaque entité garde son rang d'insertion : les requêtes renvoient
+    leurs résultats dans cet ordre, comme un parcours de la liste d'origine.
+    Les entités mortes (`alive = False`) restent indexées mais ne sont jamais
+    renvoyées. Après un déplacement, appeler `update` (fait par `Target.respawn`).
+    """
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, bucket_size=8):
+        self.width = width
+        self.height = height
+        self.bucket_size = bucket_size
+        self.buckets_x = max(1, -(-width // bucket_size))
+        self.buckets_y = max(1, -(-height // bucket_size))
+        self.buckets = [[] for _ in range(self.buckets_x * self.buckets_y)]
+        self.cells = {}    # (x, y) -> entités sur la case
+        self._where = {}   # entité -> (x, y) indexé
+        self._rank = {}    # entité -> rang d'insertion
+        self._next_rank = 0
+        # En dessous, `nearest` parcourt toutes les entités plutôt que les anneaux de seaux
+        # (il faut en moyenne seaux / entités seaux pour trouver une entité)
+        self.linear_threshold = max(32, 2 * math.isqrt(len(self.buckets)))
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, item):
+        return item in self._where
+
+    def _bucket(self, x, y):
+        # Les positions hors de l'arène vont dans le seau du bord le plus proche
+        bx = min(max(x // self.bucket_size, 0), self.buckets_x - 1)
+        by = min(max(y // self.bucket_size, 0), self.buckets_y - 1)
+        return bx * self.buckets_y + by
+
+    def insert(self, item):
+        if item in self._where:
+            raise ValueError(f"{item!r} is already indexed")
+        x, y = item.position.x, item.position.y
+        self._where[item] = (x, y)
+        self._rank[item] = self._next_rank
+        self._next_rank += 1
+        self.buckets[self._bucket(x, y)].append(item)
+        self.cells.setdefault((x, y), []).append(item)
+
+    def remove(self, item):
+        x, y = self._where.pop(item)
+        del self._rank[item]
+        self.buckets[self._bucket(x, y)].remove(item)
+        cell = self.cells[(x, y)]
+        cell.remove(item)
+        if not cell:
+            del self.cells[(x, y)]
+
+    def update(self, item):
+        """Reporte dans l'index la nouvelle `position` de l'entité."""
+        old = self._where[item]
+        x, y = item.position.x, item.position.y
+        if old == (x, y):
+            return
+        self._where[item] = (x, y)
+        old_bucket, new_bucket = self._bucket(*old), self._bucket(x, y)
+        if old_bucket != new_bucket:
+            self.buckets[old_bucket].remove(item)
+            self.buckets[new_bucket].append(item)
+        cell = self.cells[old]
+        cell.remove(item)
+        if not cell:
+            del self.cells[old]
+        self.cells.setdefault((x, y), []).append(item)
+
+    def _select(self, items, etype):
+        items = [item for item in items if item.alive and (etype is None or item.etype == etype)]
+        items.sort(key=self._rank.__getitem__)
+        return items
+
+    def at(self, x, y, etype=None):
+        """Entités vivantes sur la case (x, y)."""
+        cell = self.cells.get((x, y))
+        if not cell:
+            return []
+        return self._select(cell, etype)
+
+    def _box(self, x, y, radius):
+        """Entités des seaux qui recouvrent le carré de demi-côté `radius` autour de (x, y)."""
+        size = self.bucket_size
+        r = math.floor(radius)
+        x0 = max((x - r) // size, 0)
+        x1 = min((x + r) // size, self.buckets_x - 1)
+        y0 = max((y - r) // size, 0)
+        y1 = min((y + r) // size, self.buckets_y - 1)
+        found = []
+        for bx in range(x0, x1 + 1):
+            row = bx * self.buckets_y
+            for by in range(y0, y1 + 1):
+                found.extend(self.buckets[row + by])
+        return found
+
+    def within_radius(self, x, y, radius, etype=None):
+        """Entités vivantes à une distance <= radius de (x, y)."""
+        found = [item for item in self._box(x, y, radius)
+                 if math.hypot(x - item.position.x, y - item.position.y) <= radius]
+        return self._select(found, etype)
+
+    def in_cone(self, x, y, radius, facing_angle, fov, etype=None):
+        """Entités vivantes dans le cône de vision, avec exactement le test de Snake.get_vision."""
+        found = []
+        half_fov = fov / 2
+        for item in self._box(x, y, radius):
+            # vecteur entité -> tête
+            vx = x - item.position.x
+            vy = y - item.position.y
+            if math.hypot(vx, vy) > radius:
+                continue
+            delta = (math.atan2(vy, vx) - facing_angle + math.pi) % (2 * math.pi) - math.pi
+            if abs(delta) <= half_fov:
+                found.append(item)
+        return self._select(found, etype)
+
+    def nearest(self, x, y, etype=None):
+        """(entité vivante la plus proche, distance), ou (None, inf) s'il n'y en a pas.
+
+        Parcourt les seaux en anneaux autour de (x, y) et s'arrête dès que la
+        meilleure distance est inférieure à celle de toute case non visitée.
+        À distance égale, l'entité de plus petit rang l'emporte.
+        """
+        if len(self._where) <= self.linear_threshold:
+            # Peu d'entités pour beaucoup de seaux : un parcours direct est plus rapide
+            return self._nearest_linear(x, y, etype)
+
+        size = self.bucket_size
+        cx = min(max(x // size, 0), self.buckets_x - 1)
+        cy = min(max(y // size, 0), self.buckets_y - 1)
+        rank = self._rank
+        best, best_key = None, (math.inf, 0)
+        max_ring = max(cx, self.buckets_x - 1 - cx, cy, self.buckets_y - 1 - cy)
+
+        for ring in range(max_ring + 1):
+            for bx in range(cx - ring, cx + ring + 1):
+                if not 0 <= bx < self.buckets_x:
+                    continue
+                edge = bx == cx - ring or bx == cx + ring
+                for by in (range(cy - ring, cy + ring + 1) if edge else (cy - ring, cy + ring)):
+                    if not 0 <= by < self.buckets_y:
+                        continue
+                    for item in self.buckets[bx * self.buckets_y + by]:
+                        if not item.alive or (etype is not None and item.etype != etype):
+                            continue
+                        key = (math.hypot(x - item.position.x, y - item.position.y), rank[item])
+                        if key < best_key:
+                            best, best_key = item, key
+
+            # Distance minimale de (x, y) à une case entière hors du carré de seaux visité
+            gap = min(x - (cx - ring) * size, (cx + ring + 1) * size - 1 - x,
+                      y - (cy - ring) * size, (cy + ring + 1) * size - 1 - y) + 1
+            if best is not None and best_key[0] < gap:
+                break
+        return best, best_key[0]
+
+    def _nearest_linear(self, x, y, etype):
+        best, best_distance = None, math.inf
+        # Ordre du dict = ordre d'insertion : le premier minimum a le plus petit rang
+        for item in self._where:
+            if not item.alive or (etype is not None and item.etype != etype):
+                continue
+            distance = math.hypot(x - item.position.x, y - item.position.y)
+            if distance < best_distance:
+                best, best_distance = item, distance
+        return best, best_distance
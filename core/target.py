@@ -1,19 +1,33 @@
-import random
 from core.point import Point
-from config import GRID_WIDTH, GRID_HEIGHT
+from core.arena import DEFAULT_ARENA
+from core.seeding import as_stream
 
 class Target:
-    def __init__(self,etype='target'):
-        self.position = self.generate()        
+    def __init__(self,etype='target', arena=None, occupancy=None, rng=None):
+        self.arena = arena or DEFAULT_ARENA
+        # RandomStream de l'Env (ou graine) : tous les tirages de position
+        self.rng = as_stream(rng)
+        self.position = self.generate(occupancy)        
         self.etype = etype
         
         self.alive = True
+        # SpatialIndex de l'Env qui possède la cible, tenu à jour à chaque réapparition
+        self.spatial_index = None
 
-    def generate(self):
-        return Point(random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
+    def generate(self, occupancy=None):
+        # Case libre tirée dans la liste de l'OccupancyGrid : O(1) même plateau presque plein
+        if occupancy is not None:
+            cell = occupancy.random_free_cell(self.rng)
+            if cell is not None:
+                return Point(*cell)
+        # Sans grille (ou plateau plein) : n'importe quelle case
+        width, height = self.arena.width, self.arena.height
+        return Point(self.rng.randbelow(width), self.rng.randbelow(height))
 
-    def respawn(self):
-        self.position = self.generate()
+    def respawn(self, occupancy=None):
+        self.position = self.generate(occupancy)
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
 
     def to_dict(self):
         return self.position.to_dict()
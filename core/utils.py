@@ -1,20 +1,10 @@
 import numpy as np
 import math
 
-from config import CELL_SIZE, GRID_HEIGHT, GRID_WIDTH
+from core.arena import DEFAULT_ARENA
 from core.point import Point
 from core.rl_snacke.RLSnake import RLSnacke
-
-channels = {
-    "agent": 0,
-    "target": 1,
-    "wall": 2,
-    "facing": 3,
-}
-
-channel_names = [
-    "Agent", "target", "wall", "facing"
-]
+from core.minimap import channels, channel_names, get_rasterizer
 
 def bresenham_line(x0, y0, x1, y1):
     """Trace une ligne continue entre deux points avec l'algorithme de Bresenham"""
@@ -39,7 +29,30 @@ def bresenham_line(x0, y0, x1, y1):
     
     return points
 
-def extract_minimap_tensor(agent, env, grid_size=64):
+def extract_minimap_tensor(agent, env, grid_size=64, out=None):
+    """Minimap (C, grid_size, grid_size) de l'agent ; `out` permet de réutiliser un buffer."""
+    return get_rasterizer(agent.range, agent.fov, grid_size, env.arena).render(agent, env, out)
+
+
+def extract_minimap_batch(agents, envs, grid_size=64, out=None):
+    """Minimaps (N, C, grid_size, grid_size) de plusieurs agents en une passe.
+
+    `envs` est soit une liste alignée sur `agents`, soit un seul Env partagé.
+    Les agents doivent avoir la même portée et le même fov, et les Env la même arène.
+    """
+    if not isinstance(envs, (list, tuple)):
+        envs = [envs] * len(agents)
+    if any(a.range != agents[0].range or a.fov != agents[0].fov for a in agents):
+        raise ValueError("extract_minimap_batch requires agents sharing range and fov")
+    arena = envs[0].arena
+    if any(env.arena.key != arena.key for env in envs):
+        raise ValueError("extract_minimap_batch requires envs sharing the same arena size")
+    rasterizer = get_rasterizer(agents[0].range, agents[0].fov, grid_size, arena)
+    return rasterizer.render_batch(agents, envs, out)
+
+
+def extract_minimap_tensor_reference(agent, env, grid_size=64):
+    """Implémentation d'origine en boucles Python, gardée comme référence pixel à pixel."""
     tensor = np.zeros((len(channel_names), grid_size, grid_size), dtype=np.float32)
 
     head = agent.head()
@@ -77,6 +90,16 @@ def extract_minimap_tensor(agent, env, grid_size=64):
             if 0 <= gx < grid_size and 0 <= gy < grid_size:
                 tensor[channels["agent"], gy, gx] = 1.0
 
+    # Autres serpents vivants de l'arène, tête comprise
+    for other in getattr(env, "snakes", [agent]):
+        if other is agent or not other.alive:
+            continue
+        for part in other.body:
+            if within_vision(part.x, part.y):
+                gx, gy = to_grid_coords(part.x, part.y)
+                if 0 <= gx < grid_size and 0 <= gy < grid_size:
+                    tensor[channels["agent"], gy, gx] = 1.0
+
     # === 2. Cibles ===
     for target in env.targets:
         if not target.alive:
@@ -88,7 +111,7 @@ def extract_minimap_tensor(agent, env, grid_size=64):
                 tensor[channels["target"], gy, gx] = 1.0
 
     # === 3. Murs (bordures visibles sans trous) ===
-    from config import GRID_WIDTH, GRID_HEIGHT
+    width, height = env.arena.width, env.arena.height
     
     def draw_border(border_points):
         prev_gx, prev_gy = None, None
@@ -106,11 +129,11 @@ def extract_minimap_tensor(agent, env, grid_size=64):
                     prev_gx, prev_gy = gx, gy
 
     # Bordures horizontales
-    top_border = [(x, 0) for x in range(GRID_WIDTH)]
-    bottom_border = [(x, GRID_HEIGHT-1) for x in range(GRID_WIDTH)]
+    top_border = [(x, 0) for x in range(width)]
+    bottom_border = [(x, height-1) for x in range(width)]
     # Bordures verticales
-    left_border = [(0, y) for y in range(GRID_HEIGHT)]
-    right_border = [(GRID_WIDTH-1, y) for y in range(GRID_HEIGHT)]
+    left_border = [(0, y) for y in range(height)]
+    right_border = [(width-1, y) for y in range(height)]
     
     draw_border(top_border)
     draw_border(bottom_border)
@@ -132,18 +155,19 @@ def extract_minimap_tensor(agent, env, grid_size=64):
     return tensor
 
 
-def danger_position(head:Point):
+def danger_position(head:Point, arena=DEFAULT_ARENA):
     up,down,right,left = False,False,False,False
+    cell_size = arena.cell_size
     
-    if head.x <= CELL_SIZE:
+    if head.x <= cell_size:
         left = True
     
-    if head.x >=GRID_WIDTH-CELL_SIZE:
+    if head.x >=arena.width-cell_size:
         right = True
         
-    if head.y <= CELL_SIZE:
+    if head.y <= cell_size:
         up = True
     
-    if head.y >=GRID_HEIGHT-CELL_SIZE:
+    if head.y >=arena.height-cell_size:
         down = True
     return up,down,right,left
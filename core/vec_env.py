@@ -0,0 +1,216 @@
+import math
+
+import numpy as np
+
+from core.arena import DEFAULT_ARENA
+from core.seeding import as_stream, spawn_seeds
+
+# Même ordre que RLSnacke.action_space : UP, DOWN, LEFT, RIGHT
+ACTION_DX = np.array([0, 0, -1, 1], dtype=np.int32)
+ACTION_DY = np.array([-1, 1, 0, 0], dtype=np.int32)
+ACTION_ANGLE = np.array([math.atan2(dy, dx) for dx, dy in zip(ACTION_DX, ACTION_DY)])
+
+
+class VecEnv:
+    """N environnements Snake simulés en parallèle sous forme de tableaux NumPy.
+
+    Reproduit exactement `Env.step` : l'environnement `e` fait les mêmes tirages
+    qu'une suite d'Env partageant le flux `seeds[e]` (`Env(rng=...)`). Sans
+    `seeds`, les flux sont dérivés de la graine racine `seed`.
+    Les cases libres sont tenues comme dans `OccupancyGrid` (liste indexable,
+    retrait par échange, dans le même ordre) : les cibles apparaissent sur une
+    case libre tirée en O(1).
+    Les actions sont des indices dans `RLSnacke.action_space`.
+    Tous les environnements partagent la même arène (`ArenaConfig`).
+    """
+
+    def __init__(self, num_envs, num_targets=None, seeds=None, auto_reset=True, arena=None, seed=None):
+        self.arena = arena = arena or DEFAULT_ARENA
+        self.width, self.height = arena.width, arena.height
+        self.num_envs = num_envs
+        self.num_targets = arena.num_targets if num_targets is None else num_targets
+        self.auto_reset = auto_reset
+
+        if seeds is None:
+            seeds = spawn_seeds(seed, num_envs)
+        self.rngs = [as_stream(s) for s in seeds]
+
+        # Longueur max du corps : toutes les cases + la tête au moment d'une collision
+        self.capacity = arena.area + 1
+
+        n = num_envs
+        self.body_x = np.zeros((n, self.capacity), dtype=np.int32)
+        self.body_y = np.zeros((n, self.capacity), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int64)  # index de la tête dans le ring buffer
+        self.length = np.ones(n, dtype=np.int64)
+        self.grow_next = np.zeros(n, dtype=bool)
+        self.grid = np.zeros((n, self.height, self.width), dtype=np.int16)
+        # Liste des cases libres par environnement, comme OccupancyGrid.free / free_pos
+        cell_dtype = np.int16 if arena.area < 2 ** 15 else np.int32
+        self.free = np.zeros((n, arena.area), dtype=cell_dtype)
+        self.free_pos = np.zeros((n, arena.area), dtype=cell_dtype)
+        self.num_free = np.zeros(n, dtype=np.int64)
+        self._cells = np.arange(arena.area, dtype=cell_dtype)
+
+        self.target_x = np.zeros((n, self.num_targets), dtype=np.int32)
+        self.target_y = np.zeros((n, self.num_targets), dtype=np.int32)
+
+        self.alive = np.ones(n, dtype=bool)
+        self.done = np.zeros(n, dtype=bool)
+        self.ate = np.zeros(n, dtype=bool)  # équivalent de Env.appelSignal
+        self.step_count = np.zeros(n, dtype=np.int64)
+        self.facing_angle = np.zeros(n, dtype=np.float64)
+
+        self._env_idx = np.arange(n)
+        self.reset(self._env_idx)
+
+    def reset(self, env_ids=None):
+        if env_ids is None:
+            env_ids = self._env_idx
+        env_ids = np.asarray(env_ids)
+        if env_ids.size == 0:
+            return
+
+        start_x, start_y = self.arena.center()
+        self.head_ptr[env_ids] = 0
+        self.body_x[env_ids, 0] = start_x
+        self.body_y[env_ids, 0] = start_y
+        self.length[env_ids] = 1
+        self.grow_next[env_ids] = False
+        self.grid[env_ids] = 0
+        self.grid[env_ids, start_y, start_x] = 1
+        self.free[env_ids] = self._cells
+        self.free_pos[env_ids] = self._cells
+        self.num_free[env_ids] = self.arena.area
+        self._take_cells(env_ids, np.full(env_ids.shape, start_y * self.width + start_x))
+
+        self.alive[env_ids] = True
+        self.done[env_ids] = False
+        self.ate[env_ids] = False
+        self.step_count[env_ids] = 0
+        self.facing_angle[env_ids] = 0.0
+
+        # Même ordre de tirage que `[Target(occupancy=...) for _ in range(10)]`
+        for e in env_ids.tolist():
+            for t in range(self.num_targets):
+                self.target_x[e, t], self.target_y[e, t] = self._draw_position(e)
+
+    def _take_cells(self, rows, cells):
+        """Retire `cells[k]` de la liste libre de `rows[k]` (au plus une case par environnement)."""
+        if rows.size == 0:
+            return
+        area = self.arena.area
+        free, free_pos = self.free.reshape(-1), self.free_pos.reshape(-1)
+        base = rows * area
+        pos = free_pos[base + cells]
+        last = free[base + self.num_free[rows] - 1]
+        free[base + pos] = last
+        free_pos[base + last] = pos
+        free_pos[base + cells] = -1
+        self.num_free[rows] -= 1
+
+    def _release_cells(self, rows, cells):
+        """Remet `cells[k]` à la fin de la liste libre de `rows[k]`."""
+        if rows.size == 0:
+            return
+        base = rows * self.arena.area
+        end = self.num_free[rows]
+        self.free.reshape(-1)[base + end] = cells
+        self.free_pos.reshape(-1)[base + cells] = end
+        self.num_free[rows] += 1
+
+    def _draw_position(self, e):
+        rng = self.rngs[e]
+        # Même tirage que Target.generate(occupancy) : une case de la liste libre
+        num_free = int(self.num_free[e])
+        if num_free:
+            i = int(self.free[e, rng.randbelow(num_free)])
+            return i % self.width, i // self.width
+        return rng.randbelow(self.width), rng.randbelow(self.height)
+
+    def heads(self):
+        return self.body_x[self._env_idx, self.head_ptr], self.body_y[self._env_idx, self.head_ptr]
+
+    def body(self, e):
+        """Corps de l'environnement `e`, tête en premier, sous forme de liste de (x, y)."""
+        idx = (self.head_ptr[e] + np.arange(self.length[e])) % self.capacity
+        return list(zip(self.body_x[e, idx].tolist(), self.body_y[e, idx].tolist()))
+
+    def targets(self, e):
+        return list(zip(self.target_x[e].tolist(), self.target_y[e].tolist()))
+
+    def step(self, actions):
+        """Avance tous les environnements actifs d'un pas.
+
+        Retourne `(ate, done)` pour ce pas. Avec `auto_reset`, les environnements
+        terminés sont réinitialisés après coup ; sinon ils restent figés comme `Env`.
+        """
+        actions = np.asarray(actions)
+        active = ~self.done
+        self.ate[:] = False
+
+        idx = self._env_idx[active]
+        act = actions[active]
+        cap = self.capacity
+
+        head_ptr = self.head_ptr[idx]
+        length = self.length[idx]
+        hx = self.body_x[idx, head_ptr] + ACTION_DX[act]
+        hy = self.body_y[idx, head_ptr] + ACTION_DY[act]
+        self.facing_angle[idx] = ACTION_ANGLE[act]
+
+        # appendleft de la nouvelle tête
+        tail_ptr = (head_ptr + length - 1) % cap
+        head_ptr = (head_ptr - 1) % cap
+        self.head_ptr[idx] = head_ptr
+        self.body_x[idx, head_ptr] = hx
+        self.body_y[idx, head_ptr] = hy
+
+        inside = (hx >= 0) & (hx < self.width) & (hy >= 0) & (hy < self.height)
+        # Indices à plat (env * aire + case) : grid, free et free_pos vus comme des vecteurs
+        area = self.arena.area
+        grid = self.grid.reshape(-1)
+        rows = idx[inside]
+        head_cell = hy[inside] * self.width + hx[inside]
+        head_flat = rows * area + head_cell
+        before = grid[head_flat]
+        grid[head_flat] = before + 1
+        entered = before == 0
+        self._take_cells(rows[entered], head_cell[entered])
+
+        # pop de la queue, sauf si le serpent doit grandir
+        grow = self.grow_next[idx]
+        pop = ~grow
+        popped = idx[pop]
+        tail_cell = self.body_y[popped, tail_ptr[pop]] * self.width + self.body_x[popped, tail_ptr[pop]]
+        tail_flat = popped * area + tail_cell
+        after = grid[tail_flat] - 1
+        grid[tail_flat] = after
+        left = after == 0
+        self._release_cells(popped[left], tail_cell[left])
+        self.length[idx] = length + grow
+        self.grow_next[idx] = False
+
+        collided = np.zeros(idx.shape, dtype=bool)
+        collided[inside] = grid[head_flat] > 1
+        dead = collided | ~inside
+        self.alive[idx[dead]] = False
+        self.done[idx[dead]] = True
+
+        # Cibles mangées (seulement pour les serpents encore en vie)
+        living = idx[~dead]
+        hit = (self.target_x[living] == hx[~dead, None]) & (self.target_y[living] == hy[~dead, None])
+        for row in np.flatnonzero(hit.any(axis=1)).tolist():
+            e = living[row]
+            self.ate[e] = True
+            self.grow_next[e] = True
+            for t in np.flatnonzero(hit[row]).tolist():
+                self.target_x[e, t], self.target_y[e, t] = self._draw_position(e)
+
+        self.step_count[idx] += 1
+
+        ate = self.ate.copy()
+        done = self.done.copy()
+        if self.auto_reset:
+            self.reset(self._env_idx[done])
+        return ate, done
@@ -1,24 +1,48 @@
+import argparse
 import sys
 import os
 
+import numpy as np
+
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
-from config import GRID_WIDTH
+from core.arena import ArenaConfig
+from core.dataset import MinimapDataset, MinimapDatasetWriter
 from core.env import Env
-from core.env_wrapper import ShooterEnvWrapper
-from core.rl_snacke.train_dqn import DQNTrainer
+from core.export_service import ExportService
+from core.observation import FLAT_DIM
+from core.recorder import StreamRecorder
+from core.seeding import RandomStream, spawn_seeds
+from core.env_wrapper import MultiEnvWrapper, ShooterEnvWrapper
+from core.rl_snacke.train_dqn import TARGET_UPDATES, DQNTrainer, LearnerSchedule
+from core.rl_snacke.distributed import actor_epsilons, train_distributed
+from core.rl_snacke.inference import configure_threads
 
 
-def train_dqn():
+def train_dqn(log_dataset=None, pretrain=None, arena=None, seed=None, inference=None, schedule=None):
 
-    trainer = DQNTrainer(state_dim=5*8 +12, action_dim=4)
+    # Graine racine -> un flux pour le trainer, un pour les épisodes successifs
+    trainer_seed, env_seed = spawn_seeds(seed, 2)
+    env_rng = RandomStream(env_seed)
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=4, rng=trainer_seed, schedule=schedule)
+    if inference:
+        trainer.enable_inference(compile=None if inference == "folded" else inference)
+    if pretrain:
+        # Pré-entraînement hors ligne sur des transitions déjà journalisées
+        steps = trainer.pretrain(MinimapDataset(pretrain))
+        print(f"📚 Pré-entraînement : {steps} batchs depuis {pretrain}")
+    dataset = MinimapDatasetWriter(log_dataset) if log_dataset else None
     episodes_to_export = 50  # Épisodes à exporter
+    # L'épisode est enregistré en flux, puis converti hors de la boucle au format
+    # découpé du viewer (view.html?episode=episode_N)
+    exporter = ExportService(max_pending=4, chunk_size=1000)
 
     for episode in range(1000):
-        env = Env()
-        wrapper = ShooterEnvWrapper(env, env.snake)
+        episode_id = f"episode_{episode + 1}"
+        env = Env(recorder=StreamRecorder(f"data/recordings/{episode_id}.snkrec"), arena=arena, rng=env_rng)
+        wrapper = ShooterEnvWrapper(env, env.snake, dataset=dataset)
         flat_state,minimap = wrapper.reset()
 
         for _ in range(5000):
@@ -26,23 +50,123 @@ def train_dqn():
             action = trainer.select_action(flat_state,minimap,epoche =episode)
             next_state, next_minimap, reward, done = wrapper.step(action)
             trainer.replay_buffer.push(flat_state, minimap,action, reward, next_state,next_minimap, done)
-            trainer.train_step()
+            trainer.observe()
             flat_state = next_state
             minimap= next_minimap
             if done:
                 break
-            
+        wrapper.close_episode()
             
         print(f"✅ Episode {episode + 1} done len : ", len(env.snake.body))
         # Sauvegarde les épisodes intéressants
         if (len(env.snake.body)>=5):
-            episode_id = f"episode_{episode + 1}"
-            print(f"viewer/{episode_id}.json")
-            env.export(path=f"viewer/{episode_id}.json")
+            print(f"viewer/{episode_id}/")
+            exporter.submit(env, path=f"viewer/{episode_id}")
+        else:
+            env.close()
+            os.remove(env.recorder.path)
+
+    exporter.close()
+    if dataset is not None:
+        dataset.close()
+    print("📦 Export :", exporter.stats())
+    print("🏁 Entraînement DQN terminé.")
+
+
+def train_dqn_multi_env(num_envs=16, num_episodes=1000, arena=None, seed=None, inference=None, schedule=None):
+    """Même boucle que train_dqn, mais N environnements avancent ensemble
+    et leurs actions sont choisies par un seul forward (select_actions).
+
+    Sans `schedule`, un pas de gradient par pas des N environnements
+    (replay_ratio = 1 / N)."""
+
+    if schedule is None:
+        schedule = LearnerSchedule(replay_ratio=1.0 / num_envs)
+    trainer_seed, *env_seeds = spawn_seeds(seed, num_envs + 1)
+    trainer = DQNTrainer(state_dim=FLAT_DIM, action_dim=4, rng=trainer_seed, schedule=schedule)
+    if inference:
+        trainer.enable_inference(compile=None if inference == "folded" else inference)
+    epsilons = np.array(actor_epsilons(num_envs))
+
+    # Un flux par emplacement, repris par l'Env qui remplace celui qui se termine
+    env_rngs = [RandomStream(s) for s in env_seeds]
+    batch = MultiEnvWrapper(Env(record=False, arena=arena, rng=rng) for rng in env_rngs)
+    states = batch.reset()
+    episode = 0
+
+    while episode < num_episodes:
+        actions = trainer.select_actions(
+            np.stack([flat for flat, _ in states]),
+            np.stack([minimap for _, minimap in states]),
+            epsilons,
+        )
+        # Récompenses des N Env en une passe (RewardKernel sur les N paires Env / serpent)
+        next_states, rewards, dones = batch.step(actions)
+        for i, action in enumerate(actions.tolist()):
+            flat_state, minimap = states[i]
+            next_state, next_minimap = next_states[i]
+            done = bool(dones[i])
+            trainer.replay_buffer.push(flat_state, minimap, action, float(rewards[i]), next_state, next_minimap, done)
+            states[i] = next_states[i]
+
+            if done or batch.envs[i].step_count >= 5000:
+                episode += 1
+                print(f"✅ Episode {episode} (env {i}) done len : ", len(batch.envs[i].snake.body))
+                states[i] = batch.replace(i, Env(record=False, arena=arena, rng=env_rngs[i]))
+        trainer.observe(num_envs)
 
-    
     print("🏁 Entraînement DQN terminé.")
 
 
 if __name__ == "__main__":
-    train_dqn()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actors", type=int, default=0,
+                        help="nombre de processus acteurs (0 = boucle mono-processus)")
+    parser.add_argument("--envs", type=int, default=1,
+                        help="nombre d'environnements avancés ensemble dans la boucle mono-processus")
+    parser.add_argument("--log-dataset", default=None,
+                        help="dossier où journaliser les transitions (minimaps, états, actions, récompenses)")
+    parser.add_argument("--pretrain", default=None,
+                        help="dossier d'un dataset journalisé pour pré-entraîner le DQN hors ligne")
+    parser.add_argument("--arena", type=ArenaConfig.parse, default=None,
+                        help="taille de l'arène, LARGEURxHAUTEUR (par défaut celle de config.py)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="graine racine : environnements, exploration, replay buffer et poids initiaux "
+                             "du réseau reproductibles")
+    parser.add_argument("--inference", choices=("folded", "trace", "compile"), default=None,
+                        help="choix des actions par DQNInference (BatchNorm fondue, channels_last), "
+                             "graphe tracé ou compilé en option ; par défaut forward eager")
+    parser.add_argument("--policy-server", action="store_true",
+                        help="avec --actors : actions calculées par batchs dans un serveur d'inférence partagé")
+    parser.add_argument("--replay-ratio", type=float, default=None,
+                        help="pas de gradient par pas d'environnement, reçus des acteurs avec --actors "
+                             "(défaut : 1, ou 1/N avec --envs N)")
+    parser.add_argument("--updates-per-sample", type=int, default=1,
+                        help="K pas de gradient sur un seul tirage de K × batch transitions")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="transitions dans le replay buffer avant le premier pas de gradient")
+    parser.add_argument("--target-update", choices=TARGET_UPDATES, default="hard",
+                        help="réseau cible : copie périodique (hard) ou moyenne de Polyak (soft)")
+    parser.add_argument("--target-period", type=int, default=1000,
+                        help="pas de gradient entre deux copies du réseau cible (hard)")
+    parser.add_argument("--tau", type=float, default=0.005, help="coefficient de la moyenne de Polyak (soft)")
+    parser.add_argument("--threads", type=int, default=None, help="threads intra-op de torch")
+    parser.add_argument("--interop-threads", type=int, default=None, help="threads inter-op de torch")
+    args = parser.parse_args()
+    configure_threads(args.threads, args.interop_threads)
+    replay_ratio = args.replay_ratio
+    if replay_ratio is None:
+        replay_ratio = 1.0 / args.envs
+    schedule = LearnerSchedule(replay_ratio=replay_ratio, updates_per_sample=args.updates_per_sample,
+                               warmup=args.warmup, target_update=args.target_update,
+                               target_period=args.target_period, tau=args.tau)
+
+    if args.actors:
+        train_distributed(num_actors=args.actors, arena=args.arena, seed=0 if args.seed is None else args.seed,
+                          policy_server=args.policy_server, schedule=schedule)
+    elif args.envs > 1:
+        train_dqn_multi_env(num_envs=args.envs, arena=args.arena, seed=args.seed, inference=args.inference,
+                            schedule=schedule)
+    else:
+        train_dqn(log_dataset=args.log_dataset, pretrain=args.pretrain, arena=args.arena, seed=args.seed,
+                  inference=args.inference, schedule=schedule)
@@ -2,18 +2,17 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import random
 from core.env import Env
 
 
-def simulate(filename="viewer/episode_001.json"):
-    env = Env()
+def simulate(filename="viewer/episode_001.json", seed=None):
+    env = Env(rng=seed)
     directions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
 
     for _ in range(20):
         if env.done:
             break
-        direction = random.choice(directions)
+        direction = env.rng.choice(directions)
         env.step(direction)
 
     env.export(filename)
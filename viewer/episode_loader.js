@@ -0,0 +1,130 @@
+// Chargement paresseux d'un épisode découpé en blocs (format écrit par core/chunked_episode.py).
+// Seuls les blocs autour de la frame courante sont téléchargés et gardés en mémoire.
+class EpisodeLoader {
+    constructor(baseUrl, index, options = {}) {
+        this.baseUrl = baseUrl;
+        this.index = index;
+        this.length = index.num_frames;
+        this.starts = index.chunks.map(chunk => chunk.start);
+        this.maxChunks = options.maxChunks || 12;
+        this.prefetchAhead = options.prefetchAhead !== undefined ? options.prefetchAhead : 2;
+
+        this.chunks = new Map();  // numéro de bloc -> frames décodées
+        this.pending = new Map(); // numéro de bloc -> chargement en cours
+        this.fetchCount = 0;
+    }
+
+    // Renvoie null si `baseUrl` ne contient pas d'épisode découpé
+    static async open(baseUrl, options) {
+        const response = await fetch(baseUrl + "index.json");
+        if (!response.ok) return null;
+        const index = await response.json();
+        if (index.format !== "snake-chunked") return null;
+        return new EpisodeLoader(baseUrl, index, options);
+    }
+
+    chunkOf(frame) {
+        // Recherche dichotomique dans la table des premières frames
+        let lo = 0;
+        let hi = this.starts.length - 1;
+        while (lo < hi) {
+            const mid = (lo + hi + 1) >> 1;
+            if (this.starts[mid] <= frame) lo = mid;
+            else hi = mid - 1;
+        }
+        return lo;
+    }
+
+    // Frame déjà chargée, sinon undefined (voir ensure)
+    getFrame(frame) {
+        if (frame < 0 || frame >= this.length) return undefined;
+        const chunk = this.chunkOf(frame);
+        const frames = this.chunks.get(chunk);
+        return frames ? frames[frame - this.starts[chunk]] : undefined;
+    }
+
+    loadChunk(chunk) {
+        if (this.chunks.has(chunk)) return Promise.resolve(this.chunks.get(chunk));
+        if (this.pending.has(chunk)) return this.pending.get(chunk);
+
+        const promise = fetch(this.baseUrl + this.index.chunks[chunk].file)
+            .then(response => {
+                if (!response.ok) throw new Error(`chunk ${chunk}: HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                const frames = EpisodeLoader.decodeChunk(data);
+                this.chunks.set(chunk, frames);
+                this.pending.delete(chunk);
+                this.fetchCount++;
+                return frames;
+            })
+            .catch(error => {
+                this.pending.delete(chunk);
+                throw error;
+            });
+        this.pending.set(chunk, promise);
+        return promise;
+    }
+
+    // Charge le bloc de `frame`, précharge les suivants et le précédent, libère les plus éloignés
+    async ensure(frame) {
+        const chunk = this.chunkOf(Math.max(0, Math.min(this.length - 1, frame)));
+        const last = this.starts.length - 1;
+        for (let i = 1; i <= this.prefetchAhead && chunk + i <= last; i++) {
+            this.loadChunk(chunk + i).catch(error => console.error("Erreur de préchargement:", error));
+        }
+        if (chunk > 0) {
+            this.loadChunk(chunk - 1).catch(error => console.error("Erreur de préchargement:", error));
+        }
+        await this.loadChunk(chunk);
+        this.evict(chunk);
+    }
+
+    evict(current) {
+        if (this.chunks.size <= this.maxChunks) return;
+        const loaded = [...this.chunks.keys()].sort((a, b) => Math.abs(b - current) - Math.abs(a - current));
+        for (const chunk of loaded.slice(0, this.chunks.size - this.maxChunks)) {
+            this.chunks.delete(chunk);
+        }
+    }
+
+    // Toutes les frames (pour l'export) ; télécharge tout l'épisode
+    async loadAll() {
+        const frames = [];
+        for (let chunk = 0; chunk < this.starts.length; chunk++) {
+            const data = await (await fetch(this.baseUrl + this.index.chunks[chunk].file)).json();
+            frames.push(...EpisodeLoader.decodeChunk(data));
+        }
+        return frames;
+    }
+
+    // Keyframe puis deltas : même décodage que core/chunked_episode.decode_chunk
+    static decodeChunk(data) {
+        const frames = [data.keyframe];
+        for (const delta of data.deltas) {
+            const prev = frames[frames.length - 1];
+            if (delta.k) {
+                frames.push(delta.k);
+                continue;
+            }
+            const targets = prev.targets.map(t => ({ x: t.x, y: t.y }));
+            if (delta.t) {
+                for (const [i, x, y] of delta.t) targets[i] = { x, y };
+            }
+            frames.push({
+                snake: [{ x: delta.h[0], y: delta.h[1] }].concat(prev.snake.slice(0, delta.l - 1)),
+                facing: delta.f !== undefined ? { ...prev.facing, facing_angle: delta.f } : prev.facing,
+                targets: targets,
+                objects: prev.objects,
+                done: delta.d === true,
+                action: delta.a
+            });
+        }
+        return frames;
+    }
+}
+
+if (typeof module !== "undefined") {
+    module.exports = { EpisodeLoader };
+}
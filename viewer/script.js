@@ -10,6 +10,7 @@ class SnakeSimulator {
 
         // État de la simulation
         this.data = [];
+        this.episode = null; // EpisodeLoader quand l'épisode est découpé en blocs
         this.frame = 0;
         this.playing = false;
         this.interval = null;
@@ -27,9 +28,22 @@ class SnakeSimulator {
     }
 
     async loadSimulationData() {
+        // ?episode=episode_12 : dossier découpé (episode_12/index.json) ou fichier episode_12.json
+        const name = new URLSearchParams(window.location.search).get("episode") || "episode_001";
+        try {
+            this.episode = await EpisodeLoader.open(name + "/");
+        } catch (error) {
+            this.episode = null;
+        }
+        if (this.episode) {
+            this.frame = 0;
+            this.renderFrame();
+            return;
+        }
+
         try {
             // Chargement des données depuis le fichier JSON
-            const response = await fetch("episode_001.json");
+            const response = await fetch(name + ".json");
             this.data = await response.json();
 
             // Données de démo si le fichier n'existe pas
@@ -94,6 +108,24 @@ class SnakeSimulator {
         ];
     }
 
+    frameCount() {
+        return this.episode ? this.episode.length : this.data.length;
+    }
+
+    getFrame(frame) {
+        return this.episode ? this.episode.getFrame(frame) : this.data[frame];
+    }
+
+    // Charge le bloc de la frame demandée puis redessine si on y est toujours
+    requestFrame(frame) {
+        if (!this.episode) return;
+        this.episode.ensure(frame)
+            .then(() => {
+                if (this.frame === frame) this.renderFrame();
+            })
+            .catch(error => console.error("Erreur de chargement:", error));
+    }
+
     initControls() {
         // Boutons de contrôle
         document.getElementById("playPauseBtn").addEventListener("click", () => this.togglePlayPause());
@@ -103,6 +135,12 @@ class SnakeSimulator {
         document.getElementById("jumpBtn").addEventListener("click", () => this.jumpToFrame());
         document.getElementById("exportBtn").addEventListener("click", () => this.exportData());
 
+        // Barre de lecture : déplacement direct vers n'importe quelle frame
+        document.getElementById("frameSlider").addEventListener("input", (e) => {
+            this.frame = parseInt(e.target.value);
+            this.renderFrame();
+        });
+
         // Contrôles de vitesse
         const speedControl = document.getElementById("speedControl");
         speedControl.addEventListener("input", () => {
@@ -142,9 +180,15 @@ class SnakeSimulator {
     }
 
     renderFrame() {
-        if (!this.data[this.frame]) return;
-
-        const frameData = this.data[this.frame];
+        const frameData = this.getFrame(this.frame);
+        if (!frameData) {
+            this.requestFrame(this.frame);
+            return;
+        }
+        if (this.episode) {
+            // Précharge les blocs voisins de la frame affichée
+            this.episode.ensure(this.frame).catch(error => console.error("Erreur de préchargement:", error));
+        }
         const ctx = this.ctx;
 
         // Effacer le canvas
@@ -329,8 +373,9 @@ class SnakeSimulator {
                 ctx.fillRect(x, y, this.cellSize, this.cellSize);
 
                 // Dessiner les yeux pour indiquer la direction
-                if (this.data[this.frame].facing) {
-                    const angle = this.data[this.frame].facing.facing_angle;
+                const currentFrame = this.getFrame(this.frame);
+                if (currentFrame && currentFrame.facing) {
+                    const angle = currentFrame.facing.facing_angle;
                     const dx = Math.sin(angle);
                     const dy = Math.cos(angle);
 
@@ -371,9 +416,10 @@ class SnakeSimulator {
 
         for (let i = 0; i < maxFrames; i++) {
             const frameIndex = this.frame - i - 1;
-            if (frameIndex < 0 || !this.data[frameIndex]) continue;
+            const trailFrame = frameIndex >= 0 ? this.getFrame(frameIndex) : undefined;
+            if (!trailFrame) continue;
 
-            const head = this.data[frameIndex].snake[0];
+            const head = trailFrame.snake[0];
             const x = head.x * this.cellSize;
             const y = head.y * this.cellSize;
             const size = this.cellSize * (0.5 + 0.5 * (i / maxFrames));
@@ -463,11 +509,14 @@ class SnakeSimulator {
     }
 
     updateUI(frameData) {
-        if (!frameData) frameData = this.data[this.frame] || {};
+        if (!frameData) frameData = this.getFrame(this.frame) || {};
 
         // Mettre à jour les informations de frame
         document.getElementById("currentFrame").textContent =
-            `Frame: ${this.frame + 1}/${this.data.length}`;
+            `Frame: ${this.frame + 1}/${this.frameCount()}`;
+        const slider = document.getElementById("frameSlider");
+        slider.max = Math.max(0, this.frameCount() - 1);
+        slider.value = this.frame;
 
         // Mettre à jour la longueur du serpent
         document.getElementById("snakeLength").textContent =
@@ -670,7 +719,12 @@ class SnakeSimulator {
     }
 
     nextFrame() {
-        if (this.frame < this.data.length - 1) {
+        if (this.frame < this.frameCount() - 1) {
+            if (this.episode && !this.episode.getFrame(this.frame + 1)) {
+                // Bloc suivant pas encore arrivé : on attend au lieu d'afficher une frame vide
+                this.requestFrame(this.frame + 1);
+                return;
+            }
             this.frame++;
             this.renderFrame();
         } else {
@@ -697,13 +751,14 @@ class SnakeSimulator {
     jumpToFrame() {
         const frameNum = parseInt(document.getElementById("frameJump").value) - 1;
         if (!isNaN(frameNum)) {
-            this.frame = Math.max(0, Math.min(this.data.length - 1, frameNum));
+            this.frame = Math.max(0, Math.min(this.frameCount() - 1, frameNum));
             this.renderFrame();
         }
     }
 
-    exportData() {
-        const dataStr = JSON.stringify(this.data, null, 2);
+    async exportData() {
+        const data = this.episode ? await this.episode.loadAll() : this.data;
+        const dataStr = JSON.stringify(data, null, 2);
         const blob = new Blob([dataStr], { type: 'application/json' });
         const url = URL.createObjectURL(blob);
 